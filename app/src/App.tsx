@@ -53,10 +53,9 @@ function AppContent() {
     const loadUserRank = async () => {
       if (user && !user.is_guest) {
         try {
-          const { fetchRankings } = await import('./lib/api');
-          const rankings = await fetchRankings();
-          const rank = rankings.findIndex(r => r.nickname === user.username) + 1;
-          setUserRank(rank > 0 ? rank : null);
+          const { fetchRankingPosition } = await import('./lib/api');
+          const position = await fetchRankingPosition(user.username);
+          setUserRank(position ? position.rank : null);
         } catch (error) {
           console.error('Failed to load user rank:', error);
         }
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import type { Difficulty, GameResult, GameMode, Question } from '../types';
 import { fetchQuestions, verifyAnswer, fetchDailyQuestions } from '../lib/api';
 import { Heart } from 'lucide-react';
@@ -33,6 +33,9 @@ export default function GameScreen({ difficulty, gameMode, domain, onGameEnd, on
 
   const { playSound } = useSound();
 
+  // 게임 세션 ID (같은 게임 안에서 문제 중복 출제 방지)
+  const sessionIdRef = useRef(`${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`);
+
   // 일일 모드는 5문제, 도전 모드는 무제한
   const totalRounds = gameMode === 'daily' ? 5 : 999;
 
@@ -51,7 +54,7 @@ export default function GameScreen({ difficulty, gameMode, domain, onGameEnd, on
           // 도전 모드: 기존 로직
           // 도전 모드는 DB 질문 소진 시 종료 (새 질문 생성 안 함)
           const allowGeneration = gameMode !== 'challenge';
-          fetchedQuestions = await fetchQuestions(difficulty, 'random', 10, allowGeneration);
+          fetchedQuestions = await fetchQuestions(difficulty, 'random', 10, allowGeneration, sessionIdRef.current);
         }
 
         if (fetchedQuestions.length === 0) {
@@ -92,7 +95,7 @@ export default function GameScreen({ difficulty, gameMode, domain, onGameEnd, on
         if (gameMode === 'challenge') {
           try {
             // 새 문제 생성 없이 DB에서만 가져옴
-            const moreQuestions = await fetchQuestions(difficulty, 'random', 10, false);
+            const moreQuestions = await fetchQuestions(difficulty, 'random', 10, false, sessionIdRef.current);
 
             // 더 이상 가져올 문제가 없으면 게임 종료 (클리어)
             if (moreQuestions.length === 0) {
@@ -38,6 +38,8 @@ export default function WrongAnswerNoteScreen({ onBack }: WrongAnswerNoteScreenP
     const [notes, setNotes] = useState<Note[]>([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     // 오답노트 데이터 불러오기
     useEffect(() => {
@@ -50,7 +52,8 @@ export default function WrongAnswerNoteScreen({ onBack }: WrongAnswerNoteScreenP
                     return;
                 }
                 const data = await getNotes(token);
-                setNotes(data);
+                setNotes(data.notes);
+                setNextCursor(data.nextCursor);
             } catch (err) {
                 setError('오답노트를 불러오는데 실패했습니다.');
             } finally {
@@ -61,6 +64,22 @@ export default function WrongAnswerNoteScreen({ onBack }: WrongAnswerNoteScreenP
         fetchNotes();
     }, []);
 
+    // 다음 페이지 불러오기
+    const loadMore = async () => {
+        const token = localStorage.getItem('token');
+        if (!token || !nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const data = await getNotes(token, nextCursor);
+            setNotes(prev => [...prev, ...data.notes]);
+            setNextCursor(data.nextCursor);
+        } catch (err) {
+            setError('오답노트를 불러오는데 실패했습니다.');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     if (loading) {
         return <div className="text-center p-8">로딩 중...</div>;
     }
@@ -124,6 +143,15 @@ export default function WrongAnswerNoteScreen({ onBack }: WrongAnswerNoteScreenP
                             </div>
                         );
                     })}
+                    {nextCursor && (
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className="w-full py-3 text-primary hover:text-primary/80 font-bold transition-colors duration-200 disabled:opacity-50"
+                        >
+                            {loadingMore ? '불러오는 중...' : '더 보기'}
+                        </button>
+                    )}
                 </div>
             )}
         </div>
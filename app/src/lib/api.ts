@@ -5,11 +5,15 @@ import type { Question, VerifyResponse } from '../types';
 export const API_BASE_URL = '/api';
 
 // 난이도별/분야별 문제 목록 가져오기
-export const fetchQuestions = async (difficulty: number, category?: string, limit: number = 10, allowGeneration: boolean = true): Promise<Question[]> => {
+// sessionId를 넘기면 같은 게임에서 이미 받은 문제는 다시 나오지 않음
+export const fetchQuestions = async (difficulty: number, category?: string, limit: number = 10, allowGeneration: boolean = true, sessionId?: string): Promise<Question[]> => {
   let url = `${API_BASE_URL}/questions?difficulty=${difficulty}&limit=${limit}&allow_generation=${allowGeneration}`;
   if (category) {
     url += `&category=${encodeURIComponent(category)}`;
   }
+  if (sessionId) {
+    url += `&session_id=${encodeURIComponent(sessionId)}`;
+  }
   const response = await fetch(url);
   if (!response.ok) throw new Error('Failed to fetch questions');
   const data = await response.json();
@@ -105,8 +109,10 @@ export const createNote = async (questionId: string, userAnswer: string, token:
 };
 
 // 내 오답 노트 조회 (인증 필요)
-export const getNotes = async (token: string) => {
-  const response = await fetch(`${API_BASE_URL}/notes`, {
+// 최신순으로 한 페이지씩 조회 (nextCursor가 null이면 마지막 페이지)
+export const getNotes = async (token: string, cursor?: string | null) => {
+  const url = cursor ? `${API_BASE_URL}/notes?cursor=${encodeURIComponent(cursor)}` : `${API_BASE_URL}/notes`;
+  const response = await fetch(url, {
     headers: {
       'Authorization': `Bearer ${token}`,
     },
@@ -114,7 +120,10 @@ export const getNotes = async (token: string) => {
   if (!response.ok) {
     throw new Error('Failed to fetch notes');
   }
-  return response.json();
+  return {
+    notes: await response.json(),
+    nextCursor: response.headers.get('X-Next-Cursor'),
+  };
 };
 
 export interface RankingEntry {
@@ -125,6 +134,11 @@ export interface RankingEntry {
   timestamp: string;
 }
 
+export interface RankingPosition extends RankingEntry {
+  rank: number;
+  total: number;
+}
+
 // 방명록(랭킹) 저장
 export const saveGuestbook = async (entry: { nickname: string; score: number; max_streak: number; difficulty: number }) => {
   const response = await fetch(`${API_BASE_URL}/guestbook`, {
@@ -145,6 +159,14 @@ export const fetchRankings = async (): Promise<RankingEntry[]> => {
   return response.json();
 };
 
+// 닉네임의 순위 조회 (랭킹에 없으면 null)
+export const fetchRankingPosition = async (nickname: string): Promise<RankingPosition | null> => {
+  const response = await fetch(`${API_BASE_URL}/rankings/${encodeURIComponent(nickname)}`);
+  if (response.status === 404) return null;
+  if (!response.ok) throw new Error('Failed to fetch ranking position');
+  return response.json();
+};
+
 // 일일 보상 수령
 export const claimDailyReward = async (token: string) => {
   const response = await fetch(`${API_BASE_URL}/daily/claim-reward`, {
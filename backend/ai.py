@@ -1,30 +1,174 @@
 import os
 import json
-from typing import Dict, Any, Optional
-from typing import Dict, Any, Optional
-from openai import OpenAI
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
+import asyncio
+import re
+import threading
+import time
 import random
 
-# 환경 변수 로드 (main.py에서 load_dotenv가 호출되므로 여기서는 os.getenv 사용 가능)
-# 하지만 안전을 위해 여기서도 호출하거나, main.py가 먼저 실행됨을 가정합니다.
-# 독립적 테스트를 위해 load_dotenv를 여기서도 사용하는 것이 좋습니다.
-from dotenv import load_dotenv
-load_dotenv()
+# 환경 변수(.env)는 database.py에서 한 번 로드 (models/crud를 통해 이 모듈보다 먼저 import됨)
+
+from quality_gate import question_gate
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    연속 실패(또는 느린 호출)가 failure_threshold에 도달하면 열려서 reset_timeout 동안 모델 호출을 즉시 거부합니다.
+    reset_timeout이 지나면 한 번의 시험 호출(half-open)을 허용하고, 성공하면 다시 닫힙니다.
+    동기 클라이언트(스레드)와 비동기 클라이언트가 함께 사용하므로 Lock으로 보호합니다.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.opened_count = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, duration: float, slow_threshold: float = None):
+        if slow_threshold is not None and duration > slow_threshold:
+            with self._lock:
+                self.slow_calls += 1
+            self._on_failure()
+            return
+        with self._lock:
+            self.consecutive_failures = 0
+            self.state = "closed"
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+        self._on_failure()
+
+    def release(self):
+        # 결과 없이 끝난 호출 (취소, 스트림 연결 끊김): 성공/실패로 기록하지 않고 시험 호출 자리만 반환
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _on_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened_count += 1
+                    print(f"WARNING: AI circuit breaker opened after {self.consecutive_failures} consecutive failures.")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": "open" if self.is_open else self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "rejected": self.rejected,
+            "opened_count": self.opened_count,
+        }
+
+# 모델 호출 제한 시간 (초). 시간의 AI_SLOW_CALL_RATIO 배를 넘긴 호출은 성공해도 느린 호출로 보고 차단기에 반영
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "20"))
+AI_GENERATION_TIMEOUT_SECONDS = float(os.getenv("AI_GENERATION_TIMEOUT_SECONDS", "60"))
+AI_SLOW_CALL_RATIO = float(os.getenv("AI_SLOW_CALL_RATIO", "0.8"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "1"))
+# 묶음 판별은 항목 수만큼 응답이 길어지므로 제한 시간(과 느린 호출 기준)을 항목당 이만큼 늘림
+AI_BATCH_ITEM_TIMEOUT_SECONDS = float(os.getenv("AI_BATCH_ITEM_TIMEOUT_SECONDS", "5"))
+
+def batch_timeout(size: int) -> float:
+    return AI_TIMEOUT_SECONDS + AI_BATCH_ITEM_TIMEOUT_SECONDS * max(0, size - 1)
+# 서버 시작 시 모델 warm-up 요청 (Ollama가 첫 요청에서 모델을 올리는 대기를 미리 처리)
+AI_WARMUP = os.getenv("AI_WARMUP", "false").lower() in ("1", "true", "yes", "on")
+
+# 동기/비동기 클라이언트가 공유하는 차단기
+ai_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("AI_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("AI_BREAKER_RESET_SECONDS", "30")),
+)
 
 class AIClient:
     def __init__(self):
+        self._load_config()
+        self._client = None
+
+    def _new_client(self):
+        # openai 패키지는 import 비용이 커서 (수백 ms) 클라이언트를 만들 때 import
+        from openai import OpenAI
+        return OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            max_retries=AI_MAX_RETRIES
+        )
+
+    @property
+    def client(self):
+        # 첫 사용 시 생성 (import/워커 시작 시점에 HTTP 클라이언트를 만들지 않도록)
+        # 서버에서는 lifespan이 시작 직후 스레드에서 prepare()로 미리 생성
+        if self._client is None:
+            self._client = self._new_client()
+        return self._client
+
+    def prepare(self):
+        return self.client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    def _load_config(self):
         self.api_key = os.getenv("AI_API_KEY")
         self.base_url = os.getenv("AI_BASE_URL")
         self.model_name = os.getenv("AI_MODEL_NAME", "gemma2") # Default to gemma2
+        self.breaker = ai_breaker
         
         if not self.api_key:
             print("WARNING: AI_API_KEY not found. Defaulting to 'ollama' for local usage.")
             self.api_key = "ollama"
-            
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
-        )
+
+    def _create(self, timeout: float, **kwargs):
+        """
+        제한 시간과 차단기를 적용하여 모델을 호출합니다. 차단기가 열려 있으면 CircuitOpenError.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("AI circuit breaker is open")
+        started = time.monotonic()
+        try:
+            response = self.client.chat.completions.create(timeout=timeout, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # 취소(CancelledError) 등으로 끝나도 half-open 시험 호출이 계속 잡혀 있지 않도록
+            self.breaker.release()
+            raise
+        self.breaker.record_success(time.monotonic() - started, timeout * AI_SLOW_CALL_RATIO)
+        return response
 
     # 사전에 정의된 고난이도 어휘 데이터베이스 (다양성 확보용)
     WORD_DATABASE = {
@@ -76,14 +220,10 @@ class AIClient:
         }
         return roles.get(category, "Writer")
 
-    def generate_question(self, category: str, difficulty: int = 1) -> Dict[str, Any]:
+    def _question_messages(self, category: str, difficulty: int) -> list:
         """
-        Llama 3.1 8b / Gemma2를 사용하여 특정 주제의 문제를 생성합니다.
-        context 없이 AI가 스스로 문장을 창작하고 암호화합니다.
+        문제 생성 프롬프트를 구성합니다. (동기/비동기 클라이언트 공용)
         """
-        if not self.client:
-            return {"error": "AI client not initialized"}
-
         # 난이도에 따른 가이드 강화
         difficulty_guide = ""
         
@@ -208,51 +348,51 @@ class AIClient:
         }}
         """
 
+        return [
+            {"role": "system", "content": "You are a professional Korean writer and puzzle generator. You always verify that your Korean sentences are grammatically perfect and natural. Output JSON only."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def generate_question(self, category: str, difficulty: int = 1) -> Dict[str, Any]:
+        """
+        Llama 3.1 8b / Gemma2를 사용하여 특정 주제의 문제를 생성합니다.
+        context 없이 AI가 스스로 문장을 창작하고 암호화합니다.
+        """
+        if not self.client:
+            return {"error": "AI client not initialized"}
+
         try:
-            response = self.client.chat.completions.create(
+            response = self._create(
+                AI_GENERATION_TIMEOUT_SECONDS,
                 model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are a professional Korean writer and puzzle generator. You always verify that your Korean sentences are grammatically perfect and natural. Output JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._question_messages(category, difficulty),
                 temperature=0.7, # 안정성을 위해 0.8 -> 0.7로 하향
                 response_format={"type": "json_object"}
             )
             
-            content = response.choices[0].message.content
-            content = response.choices[0].message.content
-            content = self._sanitize_string(content)
-            
-            # Robustness: Remove Markdown code blocks if present
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-            
-            data = json.loads(content)
-            data = self._recursive_sanitize(data)
+            data = self._parse_json_content(response.choices[0].message.content)
             
             # Apply Self-Correction / Verification Loop
-            data = self._verify_and_fix_question(data)
+            # 로컬 검사를 통과한 문제는 표본만 편집자 단계를 거침
+            if question_gate.needs_editor(data):
+                data = self._verify_and_fix_question(data)
+                question_gate.record_editor_result(data)
             
             return data
         except Exception as e:
             print(f"Error generating question: {e}")
             return {"error": str(e)}
 
-    def check_similarity(self, user_answer: str, source_text: str) -> Dict[str, Any]:
+    def _precheck_similarity(self, user_answer: str) -> Optional[Dict[str, Any]]:
         """
-        Llama 3.1 8b / Gemma2를 사용하여 의미적 유사도를 판별합니다.
-        Compares User Answer against the difficult Source Text (Correct & Encoded Sentence) to verify paraphrasing.
+        AI 호출 없이 판정 가능한 경우 결과를 반환합니다. (그 외에는 None)
         """
         if not self.client:
             return {
                 "similarity_score": 0,
                 "is_correct": False,
-                "feedback": "AI 클라이언트 초기화 실패"
+                "feedback": "AI 클라이언트 초기화 실패",
+                "source": "local"
             }
 
         # Check for meaningless input BEFORE calling AI to save resources and ensure strictness
@@ -260,19 +400,13 @@ class AIClient:
              return {
                 "similarity_score": 0,
                 "is_correct": False,
-                "feedback": "의미 있는 답변을 입력해주세요."
+                "feedback": "의미 있는 답변을 입력해주세요.",
+                "source": "local"
             }
+        return None
 
-        prompt = f"""
-        You are a strict Evaluator for a Korean literacy game.
-        
-        [Task]
-        Determine if the **User Answer** is a valid Simplification/Paraphrase of the **Source Text**.
-        
-        1. **Source Text (Difficult)**: "{source_text}"
-        2. **User Answer (Easy)**: "{user_answer}"
-        
-        [Evaluation Criteria]
+    # 단건/일괄 판별 프롬프트가 공유하는 채점 기준
+    SIMILARITY_RUBRIC = """        [Evaluation Criteria]
         - **Core Meaning**: Does the user understand the sophisticated words in the Source Text?
         - **Simplification**: The user is trying to explain the difficult text in easier words.
         - **Accuracy**: The user message must convey the SAME intent as the Source Text.
@@ -287,7 +421,19 @@ class AIClient:
         [Decision Rule]
         - is_correct: true if similarity_score >= 50
         - is_correct: false if similarity_score < 50
+"""
+
+    def _similarity_messages(self, user_answer: str, source_text: str) -> list:
+        prompt = f"""
+        You are a strict Evaluator for a Korean literacy game.
         
+        [Task]
+        Determine if the **User Answer** is a valid Simplification/Paraphrase of the **Source Text**.
+        
+        1. **Source Text (Difficult)**: "{source_text}"
+        2. **User Answer (Easy)**: "{user_answer}"
+        
+{self.SIMILARITY_RUBRIC}        
         [Output Format]
         Return JSON only:
         {{
@@ -300,44 +446,140 @@ class AIClient:
         - Do NOT round to the nearest 5 or 10. Use precise numbers like 87, 92, 73, 64.
         """
 
+        return [
+            {"role": "system", "content": "You are a strict evaluator. Output JSON only."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _parse_similarity_content(self, content: str) -> Dict[str, Any]:
+        data = self._parse_json_content(content)
+        
+        # Force consistency: If score >= 50, is_correct MUST be True
+        if "similarity_score" in data:
+            score = int(data["similarity_score"])
+            data["is_correct"] = score >= 50
+            
+        return data
+
+    def _batch_similarity_messages(self, items: List[Tuple[str, str]]) -> list:
+        """
+        items: [(user_answer, source_text), ...] 를 하나의 프롬프트로 묶어 판별을 요청합니다.
+        """
+        entries = "\n".join(
+            f'        {{"index": {i}, "source_text": {json.dumps(source_text, ensure_ascii=False)}, "user_answer": {json.dumps(user_answer, ensure_ascii=False)}}}'
+            for i, (user_answer, source_text) in enumerate(items)
+        )
+        prompt = f"""
+        You are a strict Evaluator for a Korean literacy game.
+        
+        [Task]
+        For EACH item below, determine if the **user_answer** (Easy) is a valid Simplification/Paraphrase of the **source_text** (Difficult).
+        Evaluate every item independently. Do not let one item influence another.
+        
+        [Items]
+{entries}
+        
+{self.SIMILARITY_RUBRIC}
+        [Output Format]
+        Return JSON only, with exactly {len(items)} results in the same order as the items:
+        {{
+            "results": [
+                {{
+                    "index": integer,
+                    "is_correct": boolean,
+                    "similarity_score": integer (0-100),
+                    "feedback": "Short feedback in Korean (1 sentence) explaining why it is correct/incorrect."
+                }}
+            ]
+        }}
+
+        **IMPORTANT SCORING RULE**:
+        - Do NOT round to the nearest 5 or 10. Use precise numbers like 87, 92, 73, 64.
+        """
+
+        return [
+            {"role": "system", "content": "You are a strict evaluator. Output JSON only."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _parse_batch_similarity_content(self, content: str, count: int) -> List[Dict[str, Any]]:
+        data = self._parse_json_content(content)
+        results = data.get("results", []) if isinstance(data, dict) else data
+
+        by_index = {}
+        for position, item in enumerate(results):
+            if not isinstance(item, dict) or "similarity_score" not in item:
+                continue
+            index = item.get("index", position)
+            score = int(item["similarity_score"])
+            by_index[int(index)] = {
+                "similarity_score": score,
+                "is_correct": score >= 50,
+                "feedback": item.get("feedback"),
+            }
+
+        # 누락된 항목은 실패로 처리 (캐시되지 않도록 error 포함)
+        return [
+            by_index.get(i) or self._similarity_failure(ValueError(f"missing result for item {i}"))
+            for i in range(count)
+        ]
+
+    def _similarity_failure(self, e: Exception) -> Dict[str, Any]:
+        print(f"Error checking similarity: {e}")
+        return {
+            "similarity_score": 0,
+            "is_correct": False,
+            "feedback": f"AI Check Failed. Error Details: {str(e)}",
+            "error": str(e)
+        }
+
+    def check_similarity(self, user_answer: str, source_text: str) -> Dict[str, Any]:
+        """
+        Llama 3.1 8b / Gemma2를 사용하여 의미적 유사도를 판별합니다.
+        Compares User Answer against the difficult Source Text (Correct & Encoded Sentence) to verify paraphrasing.
+        """
+        precheck = self._precheck_similarity(user_answer)
+        if precheck is not None:
+            return precheck
+
         try:
-            response = self.client.chat.completions.create(
+            response = self._create(
+                AI_TIMEOUT_SECONDS,
                 model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are a strict evaluator. Output JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._similarity_messages(user_answer, source_text),
                 temperature=0.1,
                 response_format={"type": "json_object"}
             )
-            
-            content = response.choices[0].message.content
-            # Pre-sanitize raw string
-            content = self._sanitize_string(content)
-            data = json.loads(content)
-            data = self._recursive_sanitize(data)
-            
-            # Force consistency: If score >= 50, is_correct MUST be True
-            if "similarity_score" in data:
-                score = int(data["similarity_score"])
-                data["is_correct"] = score >= 50
-                
-            return data
+            return self._parse_similarity_content(response.choices[0].message.content)
         except Exception as e:
-            print(f"Error checking similarity: {e}")
-            return {
-                "similarity_score": 0,
-                "is_correct": False,
-                "feedback": f"AI Check Failed. Error Details: {str(e)}"
-            }
+            return self._similarity_failure(e)
 
-    def _verify_and_fix_question(self, question_data: Dict[str, Any]) -> Dict[str, Any]:
+    def check_similarity_batch(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
         """
-        Generated question utilizes a self-correction loop to verify quality.
+        여러 (user_answer, source_text) 쌍을 한 번의 모델 호출로 판별합니다.
         """
-        if not self.client:
-            return question_data
+        results = [self._precheck_similarity(user_answer) for user_answer, _ in items]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
 
+        try:
+            response = self._create(
+                batch_timeout(len(pending)),
+                model=self.model_name,
+                messages=self._batch_similarity_messages([items[i] for i in pending]),
+                temperature=0.1,
+                response_format={"type": "json_object"}
+            )
+            parsed = self._parse_batch_similarity_content(response.choices[0].message.content, len(pending))
+        except Exception as e:
+            parsed = [self._similarity_failure(e) for _ in pending]
+
+        for i, result in zip(pending, parsed):
+            results[i] = result
+        return results
+
+    def _editor_messages(self, question_data: Dict[str, Any]) -> list:
         prompt = f"""
         You are a generic "Senior Editor" for a Korean educational game.
         Your job is to REVIEW and FIX the following generated content.
@@ -389,40 +631,57 @@ class AIClient:
         }}
         """
 
+        return [
+            {"role": "system", "content": "You are a strict editor. Output JSON only."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _verify_and_fix_question(self, question_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generated question utilizes a self-correction loop to verify quality.
+        """
+        if not self.client:
+            return question_data
+
         try:
-            response = self.client.chat.completions.create(
+            response = self._create(
+                AI_GENERATION_TIMEOUT_SECONDS,
                 model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are a strict editor. Output JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._editor_messages(question_data),
                 temperature=0.1, # Low temperature for strict verification
                 response_format={"type": "json_object"}
             )
-            
-            content = response.choices[0].message.content
-            content = response.choices[0].message.content
-            content = self._sanitize_string(content)
-             # Robustness: Remove Markdown code blocks if present
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
-            
-            data = json.loads(content)
-            return self._recursive_sanitize(data)
+            return self._parse_json_content(response.choices[0].message.content)
         except Exception as e:
             print(f"Verification failed: {e}")
             return question_data # Fallback to original if check fails
 
+    def _parse_json_content(self, content: str) -> Dict[str, Any]:
+        """
+        모델 응답 문자열을 JSON으로 파싱한 뒤 값들을 정제합니다.
+        원문 그대로 파싱할 수 없을 때만 문자열 전체를 먼저 정제합니다.
+        (한 줄 JSON에서 "is_correct", "similarity_score" 같은 키의 밑줄이 기울임 표시로 제거되는 것을 방지)
+        """
+        try:
+            data = json.loads(self._strip_code_fence(content.strip()))
+        except ValueError:
+            data = json.loads(self._strip_code_fence(self._sanitize_string(content)))
+        return self._recursive_sanitize(data)
+
+    def _strip_code_fence(self, content: str) -> str:
+        # Robustness: Remove Markdown code blocks if present
+        if content.startswith("```json"):
+            content = content[7:]
+        if content.startswith("```"):
+            content = content[3:]
+        if content.endswith("```"):
+            content = content[:-3]
+        return content.strip()
+
     def _sanitize_string(self, content: str) -> str:
         """
         Removes markdown syntax (bold, italic, code blocks) and invalid unicode.
         """
-        import re
         try:
             # 1. Decode to UTF-8 to handle encoding issues
             text = content.encode('utf-8', 'replace').decode('utf-8')
@@ -466,7 +725,6 @@ class AIClient:
         """
         Check if the input is trivial (too short or just punctuation/symbols).
         """
-        import re
         if not text:
             return True
         # remove spaces
@@ -478,8 +736,314 @@ class AIClient:
              return True
         return False
 
+class StreamingVerdictParser:
+    """
+    스트리밍으로 도착하는 판별 JSON을 조금씩 읽어, 완성되는 즉시 이벤트를 만듭니다.
+    - ("score", int): "similarity_score" 숫자가 끝났을 때 한 번
+    - ("feedback", str): "feedback" 문자열이 도착하는 만큼씩
+    """
+    SCORE_PATTERN = re.compile(r'"similarity_score"\s*:\s*(\d+)\s*[,}\s]')
+    FEEDBACK_PATTERN = re.compile(r'"feedback"\s*:\s*"')
+
+    def __init__(self):
+        self.buffer = ""
+        self.score = None
+        self._feedback_pos = None
+        self._feedback_closed = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.buffer += chunk
+        events = []
+
+        if self.score is None:
+            match = self.SCORE_PATTERN.search(self.buffer)
+            if match:
+                self.score = int(match.group(1))
+                events.append(("score", self.score))
+
+        if self._feedback_pos is None:
+            match = self.FEEDBACK_PATTERN.search(self.buffer)
+            if match:
+                self._feedback_pos = match.end()
+
+        if self._feedback_pos is not None and not self._feedback_closed:
+            text, consumed, closed = self._decode_partial_string(self.buffer, self._feedback_pos)
+            self._feedback_pos += consumed
+            self._feedback_closed = closed
+            # 마크다운 강조 기호는 최종 결과에서처럼 제거
+            text = text.replace("*", "").replace("`", "")
+            if text:
+                events.append(("feedback", text))
+
+        return events
+
+    @staticmethod
+    def _decode_partial_string(buffer: str, start: int) -> Tuple[str, int, bool]:
+        """
+        JSON 문자열 본문을 start부터 읽을 수 있는 만큼 디코딩합니다.
+        끝이 잘린 이스케이프 시퀀스는 다음 청크가 올 때까지 남겨둡니다.
+        """
+        out = []
+        i = start
+        while i < len(buffer):
+            c = buffer[i]
+            if c == '"':
+                return "".join(out), i + 1 - start, True
+            if c == "\\":
+                length = 6 if buffer[i + 1:i + 2] == "u" else 2
+                if i + length > len(buffer):
+                    break
+                out.append(json.loads('"' + buffer[i:i + length] + '"'))
+                i += length
+                continue
+            out.append(c)
+            i += 1
+        return "".join(out), i - start, False
+
+
+class AsyncAIClient(AIClient):
+    """
+    AsyncOpenAI 기반 비동기 클라이언트.
+    프롬프트와 응답 파싱은 AIClient와 공유하고, 모델 호출만 await로 처리하여
+    느린 LLM 호출이 스레드풀 워커를 점유하지 않도록 합니다.
+    """
+    def _new_client(self):
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            max_retries=AI_MAX_RETRIES
+        )
+
+    async def warm_up(self, timeout: float = AI_GENERATION_TIMEOUT_SECONDS):
+        """
+        짧은 요청을 한 번 보내 Ollama가 모델을 미리 메모리에 올리게 합니다. (첫 사용자 요청의 모델 로딩 대기 제거)
+        차단기는 거치지 않습니다. (시작 시 모델 서버가 아직 준비되지 않았어도 차단기가 열리지 않도록)
+        """
+        await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": "ping"}],
+            max_tokens=1,
+            timeout=timeout
+        )
+
+    async def _create(self, timeout: float, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError("AI circuit breaker is open")
+        started = time.monotonic()
+        try:
+            response = await self.client.chat.completions.create(timeout=timeout, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # 취소(CancelledError) 등으로 끝나도 half-open 시험 호출이 계속 잡혀 있지 않도록
+            self.breaker.release()
+            raise
+        self.breaker.record_success(time.monotonic() - started, timeout * AI_SLOW_CALL_RATIO)
+        return response
+
+    async def generate_question(self, category: str, difficulty: int = 1) -> Dict[str, Any]:
+        if not self.client:
+            return {"error": "AI client not initialized"}
+
+        try:
+            response = await self._create(
+                AI_GENERATION_TIMEOUT_SECONDS,
+                model=self.model_name,
+                messages=self._question_messages(category, difficulty),
+                temperature=0.7,
+                response_format={"type": "json_object"}
+            )
+            
+            data = self._parse_json_content(response.choices[0].message.content)
+            if question_gate.needs_editor(data):
+                data = await self._verify_and_fix_question(data)
+                question_gate.record_editor_result(data)
+            return data
+        except Exception as e:
+            print(f"Error generating question: {e}")
+            return {"error": str(e)}
+
+    async def check_similarity(self, user_answer: str, source_text: str) -> Dict[str, Any]:
+        precheck = self._precheck_similarity(user_answer)
+        if precheck is not None:
+            return precheck
+
+        try:
+            response = await self._create(
+                AI_TIMEOUT_SECONDS,
+                model=self.model_name,
+                messages=self._similarity_messages(user_answer, source_text),
+                temperature=0.1,
+                response_format={"type": "json_object"}
+            )
+            return self._parse_similarity_content(response.choices[0].message.content)
+        except Exception as e:
+            return self._similarity_failure(e)
+
+    async def stream_similarity(self, user_answer: str, source_text: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        stream=True로 판별을 요청하고, 점수와 피드백을 도착하는 대로 내보냅니다.
+        마지막에는 ("result", 전체 판정 dict)를 내보냅니다.
+        """
+        precheck = self._precheck_similarity(user_answer)
+        if precheck is not None:
+            yield ("result", precheck)
+            return
+
+        parser = StreamingVerdictParser()
+        if not self.breaker.allow():
+            yield ("result", self._similarity_failure(CircuitOpenError("AI circuit breaker is open")))
+            return
+        started = time.monotonic()
+        try:
+            # 스트리밍에서는 timeout이 청크 사이의 대기 시간에 적용됨
+            stream = await self.client.chat.completions.create(
+                model=self.model_name,
+                messages=self._similarity_messages(user_answer, source_text),
+                temperature=0.1,
+                response_format={"type": "json_object"},
+                stream=True,
+                timeout=AI_TIMEOUT_SECONDS
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    for event in parser.feed(delta):
+                        yield event
+            result = self._parse_similarity_content(parser.buffer)
+            self.breaker.record_success(time.monotonic() - started, AI_TIMEOUT_SECONDS * AI_SLOW_CALL_RATIO)
+        except Exception as e:
+            self.breaker.record_failure()
+            result = self._similarity_failure(e)
+        except BaseException:
+            # 클라이언트 연결이 끊겨 스트림이 닫힌 경우 (GeneratorExit, CancelledError)
+            self.breaker.release()
+            raise
+        yield ("result", result)
+
+    async def check_similarity_batch(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        results = [self._precheck_similarity(user_answer) for user_answer, _ in items]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        try:
+            response = await self._create(
+                batch_timeout(len(pending)),
+                model=self.model_name,
+                messages=self._batch_similarity_messages([items[i] for i in pending]),
+                temperature=0.1,
+                response_format={"type": "json_object"}
+            )
+            parsed = self._parse_batch_similarity_content(response.choices[0].message.content, len(pending))
+        except Exception as e:
+            parsed = [self._similarity_failure(e) for _ in pending]
+
+        for i, result in zip(pending, parsed):
+            results[i] = result
+        return results
+
+    async def _verify_and_fix_question(self, question_data: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.client:
+            return question_data
+
+        try:
+            response = await self._create(
+                AI_GENERATION_TIMEOUT_SECONDS,
+                model=self.model_name,
+                messages=self._editor_messages(question_data),
+                temperature=0.1,
+                response_format={"type": "json_object"}
+            )
+            return self._parse_json_content(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Verification failed: {e}")
+            return question_data
+
+class SimilarityMicroBatcher:
+    """
+    짧은 시간(window_ms) 안에 동시에 들어온 단건 판별 요청을 모아 한 번의 모델 호출로 처리합니다.
+    요청이 하나뿐이면 기존 단건 프롬프트를 그대로 사용합니다.
+    실행 중인 묶음 Task는 _tasks에 보관합니다. (이벤트 루프는 Task를 약하게 참조하므로, 참조가 없으면
+    실행 도중 수거되어 submit한 요청들이 끝나지 않음) 종료 시 shutdown()으로 남은 묶음까지 처리합니다.
+    """
+    def __init__(self, client: AsyncAIClient, window_ms: float = 5.0, max_batch: int = 8):
+        self.client = client
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+        self.requests = 0
+        self.batches = 0
+
+    async def submit(self, user_answer: str, source_text: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((user_answer, source_text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batches += 1
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            if len(batch) == 1:
+                user_answer, source_text, _ = batch[0]
+                results = [await self.client.check_similarity(user_answer, source_text)]
+            else:
+                results = await self.client.check_similarity_batch([(a, s) for a, s, _ in batch])
+        except Exception as e:
+            results = [self.client._similarity_failure(e) for _ in batch]
+
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def shutdown(self):
+        # 모으는 중인 요청도 바로 보내고, 실행 중인 묶음이 끝날 때까지 대기
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000.0,
+            "inflight": len(self._tasks),
+            "max_batch": self.max_batch,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+        }
+
 # 싱글톤 인스턴스 생성
 ai_client = AIClient()
+async_ai_client = AsyncAIClient()
+
+# 동시 단건 판별 묶음 처리 (기본 비활성화, AI_MICROBATCH_WINDOW_MS > 0 이면 그 시간 동안 모아서 호출)
+# 묶으면 모델 호출 수는 줄지만 각 요청의 응답은 묶음 전체가 끝날 때까지 늦어지므로 모델 서버가 병목일 때만 켬
+AI_MICROBATCH_WINDOW_MS = float(os.getenv("AI_MICROBATCH_WINDOW_MS", "0"))
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "8"))
+similarity_batcher = SimilarityMicroBatcher(async_ai_client, AI_MICROBATCH_WINDOW_MS, AI_BATCH_SIZE)
 
 def generate_question(category: str, difficulty: int = 1) -> Dict[str, Any]:
     return ai_client.generate_question(category, difficulty)
@@ -487,3 +1051,22 @@ def generate_question(category: str, difficulty: int = 1) -> Dict[str, Any]:
 def check_similarity(user_answer: str, correct_answer: str) -> Dict[str, Any]:
     return ai_client.check_similarity(user_answer, correct_answer)
 
+async def generate_question_async(category: str, difficulty: int = 1) -> Dict[str, Any]:
+    return await async_ai_client.generate_question(category, difficulty)
+
+async def check_similarity_async(user_answer: str, correct_answer: str) -> Dict[str, Any]:
+    if AI_MICROBATCH_WINDOW_MS > 0:
+        return await similarity_batcher.submit(user_answer, correct_answer)
+    return await async_ai_client.check_similarity(user_answer, correct_answer)
+
+def stream_similarity_async(user_answer: str, correct_answer: str) -> AsyncIterator[Tuple[str, Any]]:
+    return async_ai_client.stream_similarity(user_answer, correct_answer)
+
+async def check_similarity_batch_async(items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    items를 AI_BATCH_SIZE 단위로 나누어 병렬로 판별합니다.
+    """
+    chunks = [items[i:i + AI_BATCH_SIZE] for i in range(0, len(items), AI_BATCH_SIZE)]
+    results = await asyncio.gather(*[async_ai_client.check_similarity_batch(chunk) for chunk in chunks])
+    return [result for chunk_results in results for result in chunk_results]
+
@@ -0,0 +1,322 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import database
+import models
+from user_cache import user_cache
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def write_attempts(db: Session, attempts, question_deltas, user_deltas):
+    """
+    시도 기록과 통계 증가분을 한 트랜잭션으로 기록합니다.
+    attempts: [{question_id, user_answer, similarity_score, is_correct, timestamp}, ...]
+    question_deltas: {question_id: (total, correct)}, user_deltas: {user_id: solved}
+    통계는 DB에서 col = col + n 으로 증가시키며, 교착 상태 방지를 위해 id 순서로 갱신합니다.
+    """
+    try:
+        if attempts:
+            db.execute(insert(models.Attempt), attempts)
+
+        if question_deltas:
+            questions = models.Question.__table__
+            db.execute(
+                questions.update()
+                .where(questions.c.id == bindparam("question_id"))
+                .values(
+                    total_attempts=questions.c.total_attempts + bindparam("total_delta"),
+                    correct_count=questions.c.correct_count + bindparam("correct_delta")
+                ),
+                [
+                    {"question_id": question_id, "total_delta": total, "correct_delta": correct}
+                    for question_id, (total, correct) in sorted(question_deltas.items())
+                ]
+            )
+
+        user_deltas = {user_id: solved for user_id, solved in user_deltas.items() if solved}
+        if user_deltas:
+            users = models.User.__table__
+            db.execute(
+                users.update()
+                .where(users.c.id == bindparam("user_id"))
+                .values(total_solved=users.c.total_solved + bindparam("solved_delta")),
+                [{"user_id": user_id, "solved_delta": solved} for user_id, solved in sorted(user_deltas.items())]
+            )
+        db.commit()
+        for user_id in user_deltas:
+            user_cache.invalidate(user_id)
+    except Exception:
+        db.rollback()
+        raise
+
+
+def attempt_rows(records, user_id: int):
+    """
+    records: [(question, user_answer, ai_result), ...] -> (attempts, question_deltas, user_deltas)
+    """
+    now = datetime.utcnow()
+    attempts = []
+    question_deltas = {}
+    solved = 0
+    for question, user_answer, ai_result in records:
+        is_correct = bool(ai_result["is_correct"])
+        attempts.append({
+            "question_id": question.id,
+            "user_answer": user_answer,
+            "similarity_score": ai_result["similarity_score"],
+            "is_correct": is_correct,
+            "timestamp": now,
+            # 판정 주체 표시가 없는 결과는 AI 판정 (verdict_cache에 저장된 AI 판정 포함)
+            "verdict_source": ai_result.get("source", "llm"),
+        })
+        total, correct = question_deltas.get(question.id, (0, 0))
+        question_deltas[question.id] = (total + 1, correct + int(is_correct))
+        solved += int(is_correct)
+
+    # 게스트(-1)는 사용자 통계 없음
+    user_deltas = {user_id: solved} if solved and user_id != -1 else {}
+    return attempts, question_deltas, user_deltas
+
+
+class AttemptWriter:
+    """
+    Attempt 기록과 통계 증가분을 메모리에 모았다가 한 번에 기록하는 write-behind 큐.
+    - batch_size개가 쌓이거나 flush_interval초가 지나면 executemany로 일괄 기록
+    - 기록 실패 시 버퍼에 되돌리고 점점 긴 간격으로 재시도
+    - 대기 중인 기록이 max_pending을 넘으면 submit이 기록될 때까지 기다림 (DB가 느릴 때 메모리 상한)
+    - 종료 시 남은 기록을 모두 기록하고, 그래도 실패하면 spill_path.<pid>-<ms> 파일에 남겼다가 다음 시작 시 다시 기록
+      (파일은 임시 파일에 쓴 뒤 os.replace로 만들고, 시작 시 os.replace로 이름을 바꿔 가져가므로
+       여러 워커가 같은 경로를 써도 한 워커만 다시 기록)
+    """
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0, max_pending: int = 20000, spill_path: str = None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+
+        self._attempts = []
+        self._question_deltas = {}
+        self._user_deltas = {}
+        self._task = None
+        self._wakeup = None
+        self._space = None
+        self._stopping = False
+        self._claimed = []
+
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.backpressure_waits = 0
+        self.spilled = 0
+        self.last_flush_ms = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return len(self._attempts)
+
+    async def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._stopping = False
+        self._load_spill()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Attempt writer started (batch_size={self.batch_size}, flush_interval={self.flush_interval}s)")
+
+    async def stop(self, retries: int = 3):
+        if not self._task:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+        for attempt in range(retries):
+            if await self.flush():
+                break
+            await asyncio.sleep(0.5 * (attempt + 1))
+        if self.pending or self._user_deltas:
+            self._spill()
+
+    async def submit(self, attempts, question_deltas, user_deltas):
+        # DB가 느려 버퍼가 가득 차면 기록될 때까지 대기 (요청 처리 속도를 DB 처리량에 맞춤)
+        while len(self._attempts) >= self.max_pending and self.running:
+            self.backpressure_waits += 1
+            self._space.clear()
+            self._wakeup.set()
+            await self._space.wait()
+
+        self._merge(attempts, question_deltas, user_deltas)
+        self.submitted += len(attempts)
+        if len(self._attempts) >= self.batch_size:
+            self._wakeup.set()
+
+    def _merge(self, attempts, question_deltas, user_deltas):
+        self._attempts.extend(attempts)
+        for question_id, (total, correct) in question_deltas.items():
+            old_total, old_correct = self._question_deltas.get(question_id, (0, 0))
+            self._question_deltas[question_id] = (old_total + total, old_correct + correct)
+        for user_id, solved in user_deltas.items():
+            self._user_deltas[user_id] = self._user_deltas.get(user_id, 0) + solved
+
+    async def flush(self) -> bool:
+        """
+        버퍼를 비우고 한 트랜잭션으로 기록합니다. 실패하면 버퍼에 되돌리고 False를 반환합니다.
+        """
+        if not self._attempts and not self._question_deltas and not self._user_deltas:
+            return True
+
+        attempts, question_deltas, user_deltas = self._attempts, self._question_deltas, self._user_deltas
+        self._attempts, self._question_deltas, self._user_deltas = [], {}, {}
+
+        started = time.monotonic()
+        try:
+            if database.DB_ASYNC:
+                async with database.AsyncSessionLocal() as db:
+                    await db.run_sync(write_attempts, attempts, question_deltas, user_deltas)
+            else:
+                await run_in_threadpool(self._write, attempts, question_deltas, user_deltas)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Failed to write {len(attempts)} attempts: {e}")
+            # 실패한 기록을 앞에 두고 그 사이 들어온 기록을 이어 붙임
+            pending = (self._attempts, self._question_deltas, self._user_deltas)
+            self._attempts, self._question_deltas, self._user_deltas = attempts, question_deltas, user_deltas
+            self._merge(*pending)
+            return False
+
+        self.last_flush_ms = round((time.monotonic() - started) * 1000, 2)
+        self.written += len(attempts)
+        self.batches += 1
+        if self._space is not None:
+            self._space.set()
+        # 가져온 spill 기록은 버퍼에 합쳐 두었으므로 첫 기록 성공 시 함께 기록됨
+        self._remove_claimed()
+        return True
+
+    def _write(self, attempts, question_deltas, user_deltas):
+        db = database.SessionLocal()
+        try:
+            # 실패 시 버퍼 전체를 재시도하므로 한 트랜잭션으로 기록 (일부만 기록되어 중복되는 일이 없도록)
+            write_attempts(db, attempts, question_deltas, user_deltas)
+        finally:
+            db.close()
+
+    async def _run(self):
+        backoff = self.flush_interval
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if await self.flush():
+                backoff = self.flush_interval
+            else:
+                backoff = min(backoff * 2, 30.0)
+        await self.flush()
+
+    def _spill(self):
+        if not self.spill_path:
+            logger.error(f"Dropping {self.pending} unwritten attempts (no spill path configured)")
+            return
+        record = {
+            "attempts": [dict(a, timestamp=a["timestamp"].isoformat()) for a in self._attempts],
+            "question_deltas": self._question_deltas,
+            "user_deltas": {str(k): v for k, v in self._user_deltas.items()},
+        }
+        # 다른 워커의 spill 파일을 덮어쓰지 않도록 프로세스별 새 파일로, 다 쓴 뒤에 이름을 바꿔 공개
+        path = f"{self.spill_path}.{os.getpid()}-{int(time.time() * 1000)}"
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        # 가져온 spill 기록은 버퍼에 포함되어 새 파일에 다시 남았으므로 원래 파일은 삭제 (다음 시작 시 중복 방지)
+        self._remove_claimed()
+        self.spilled += len(self._attempts)
+        logger.warning(f"Spilled {len(self._attempts)} unwritten attempts to {path}")
+        self._attempts, self._question_deltas, self._user_deltas = [], {}, {}
+
+    def _spill_files(self):
+        # spill_path (이전 버전이 남긴 파일)와 spill_path.<pid>-<ms> (쓰는 중인 .tmp, 다른 워커가 가져간 .claimed 제외)
+        files = [path for path in glob.glob(glob.escape(self.spill_path) + ".*") if not path.endswith((".tmp", ".claimed"))]
+        if os.path.exists(self.spill_path):
+            files.append(self.spill_path)
+        return sorted(files)
+
+    def _load_spill(self):
+        if not self.spill_path:
+            return
+        for path in self._spill_files():
+            # 이름 바꾸기에 성공한 워커 하나만 가져감 (동시에 시작한 다른 워커는 FileNotFoundError)
+            claimed = f"{path}.{os.getpid()}.claimed"
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+            self._claimed.append(claimed)
+            loaded = self.pending
+            with open(claimed, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    self._merge(
+                        [
+                            dict(a, timestamp=datetime.fromisoformat(a["timestamp"]), verdict_source=a.get("verdict_source"))
+                            for a in record["attempts"]
+                        ],
+                        {k: tuple(v) for k, v in record["question_deltas"].items()},
+                        {int(k): v for k, v in record["user_deltas"].items()},
+                    )
+            logger.info(f"Loaded {self.pending - loaded} spilled attempts from {path}")
+
+    def _remove_claimed(self):
+        for path in self._claimed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._claimed = []
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "backpressure_waits": self.backpressure_waits,
+            "spilled": self.spilled,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+# 싱글톤 인스턴스 생성 (main.py의 lifespan에서 시작/종료)
+attempt_writer = AttemptWriter(
+    batch_size=int(os.getenv("ATTEMPT_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("ATTEMPT_FLUSH_INTERVAL", "1.0")),
+    max_pending=int(os.getenv("ATTEMPT_MAX_PENDING", "20000")),
+    spill_path=os.getenv("ATTEMPT_SPILL_PATH", "attempts_spill.jsonl"),
+)
+ATTEMPT_WRITE_BEHIND = os.getenv("ATTEMPT_WRITE_BEHIND", "true").lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,324 @@
+"""
+성능 측정 스크립트 (운영 코드에서는 사용하지 않음)
+
+    python bench.py sampling --rows 1000000
+    python bench.py auth --workers 2 --concurrency 32   (httpx 필요)
+    python bench.py questions --limit 100
+    python bench.py startup --repeat 5   (httpx 필요)
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+
+def _summary(timings):
+    timings = sorted(timings)
+    return {
+        "count": len(timings),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        "max_ms": round(timings[-1], 2),
+    }
+
+
+def _timeit(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "max_ms": round(max(timings), 2),
+    }
+
+
+def bench_sampling(args):
+    """
+    ORDER BY RANDOM() 방식과 random_key 인덱스 범위 조회 방식의 문제 추출 시간을 비교합니다.
+    --database-url 을 지정하지 않으면 임시 SQLite 파일에 --rows 개의 문제를 채워서 측정합니다.
+    """
+    if not args.database_url:
+        args.database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import func
+    import crud
+    import database
+    import migrations
+    import models
+
+    models.Base.metadata.create_all(bind=database.engine)
+    migrations.run_migrations(database.engine)
+
+    db = database.SessionLocal()
+    try:
+        existing = db.query(func.count(models.Question.id)).scalar()
+        categories = ["General", "Politics", "Economy", "Society", "Life/Culture", "IT/Science", "World"]
+        if existing < args.rows:
+            print(f"Inserting {args.rows - existing} questions...")
+            table = models.Question.__table__
+            with database.engine.begin() as conn:
+                for start in range(existing, args.rows, 10000):
+                    conn.execute(table.insert(), [
+                        {
+                            "id": str(uuid.uuid4()),
+                            "encoded_text": f"문제 문장 {i}",
+                            "original_text": "단어",
+                            "correct_meaning": f"모범 답안 {i}",
+                            "difficulty": random.randint(1, 3),
+                            "category": random.choice(categories),
+                            "correct_count": 0,
+                            "total_attempts": 0,
+                            "random_key": random.random(),
+                        }
+                        for i in range(start, min(start + 10000, args.rows))
+                    ])
+
+        def order_by_random(category):
+            query = db.query(models.Question)
+            if category:
+                query = query.filter(models.Question.category == category)
+            return query.order_by(func.random()).limit(args.limit).all()
+
+        seen = set()
+        def indexed_session():
+            # 같은 세션에서 연속으로 받는 경우 (제외 목록이 점점 커짐)
+            picked = crud._fetch_random_questions(db, "Politics", args.limit, seen)
+            seen.update(q.id for q in picked)
+
+        results = {
+            "order_by_random(all)": _timeit(lambda: order_by_random(None), args.repeat),
+            "order_by_random(category)": _timeit(lambda: order_by_random("Politics"), args.repeat),
+            "random_key(all)": _timeit(lambda: crud._fetch_random_questions(db, None, args.limit), args.repeat),
+            "random_key(category)": _timeit(lambda: crud._fetch_random_questions(db, "Politics", args.limit), args.repeat),
+            "random_key(category, session)": _timeit(indexed_session, args.repeat),
+        }
+    finally:
+        db.close()
+
+    print(f"rows={args.rows} limit={args.limit} repeat={args.repeat} url={args.database_url}")
+    for name, result in results.items():
+        print(f"{name:32s} p50={result['p50_ms']:>9.2f}ms max={result['max_ms']:>9.2f}ms")
+
+
+def bench_questions(args):
+    """
+    문제 목록 응답 생성 속도(rows/s)를 비교합니다. (DB 조회 + dict 변환 + 직렬화)
+    - orm+pydantic: 전체 컬럼 ORM 객체 -> dict -> response_model 검증 -> JSON 인코딩 (기존 FastAPI 경로)
+    - columns+orjson: 필요한 컬럼만 조회한 행 -> dict -> orjson 한 번
+    """
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+    from pydantic import TypeAdapter
+    import crud
+    import database
+    import models
+    import schemas
+
+    models.Base.metadata.create_all(bind=database.engine)
+    with database.engine.begin() as conn:
+        conn.execute(models.Question.__table__.insert(), [
+            {
+                "id": str(uuid.uuid4()),
+                "encoded_text": f"노사 간의 협상이 오랜 기간 이어졌지만 끝내 교착 상태에 빠졌다. {i}" * 2,
+                "original_text": "교착",
+                "correct_meaning": f"어떤 상황이 조금도 변동이나 진전이 없이 머묾 {i}",
+                "category": "Politics",
+                "correct_count": random.randint(0, 50),
+                "total_attempts": random.randint(50, 100),
+                "random_key": random.random(),
+            }
+            for i in range(args.limit)
+        ])
+
+    adapter = TypeAdapter(schemas.QuestionsResponse)
+    db = database.SessionLocal()
+    try:
+        ids = [row[0] for row in db.query(models.Question.id).limit(args.limit)]
+
+        def orm_pydantic():
+            db.expunge_all()
+            questions = db.query(models.Question).filter(models.Question.id.in_(ids)).all()
+            value = adapter.validate_python({"questions": [crud._question_to_dict(q) for q in questions]})
+            content = adapter.dump_python(value, mode="json")
+            return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+        def columns_orjson():
+            rows = db.query(*crud.QUESTION_PAYLOAD_COLUMNS).filter(models.Question.id.in_(ids)).all()
+            return crud.questions_response_json([crud._question_to_dict(q) for q in rows])
+
+        assert json.loads(orm_pydantic()) == json.loads(columns_orjson())
+        results = {
+            "orm+pydantic": _timeit(orm_pydantic, args.repeat),
+            "columns+orjson": _timeit(columns_orjson, args.repeat),
+        }
+    finally:
+        db.close()
+
+    print(f"limit={args.limit} repeat={args.repeat}")
+    for name, result in results.items():
+        rows_per_second = args.limit / (result["p50_ms"] / 1000)
+        print(f"{name:16s} p50={result['p50_ms']:>8.2f}ms max={result['max_ms']:>8.2f}ms rows/s={rows_per_second:>10.0f}")
+
+
+# 새 프로세스에서 main import -> lifespan 시작 -> 첫 요청까지의 시간을 JSON으로 출력
+_STARTUP_SCRIPT = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - started) * 1000
+import httpx
+
+async def run():
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.get(sys.argv[1])
+    return dict(main.startup_metrics.stats(), import_ms=round(import_ms, 2))
+
+print(json.dumps(asyncio.run(run())))
+"""
+
+
+def bench_startup(args):
+    """
+    워커 콜드 스타트 비용을 측정합니다. (새 프로세스에서 import, lifespan 시작, 첫 요청)
+    스키마는 미리 python migrations.py로 적용하고, 워커는 DB_AUTO_MIGRATE=false로 버전만 확인합니다.
+    """
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url or f"sqlite:///{tmp}/bench.db",
+        DB_AUTO_MIGRATE="false",
+        QUESTION_REPLENISHER_ENABLED="false",
+        ATTEMPT_COMPACTION_ENABLED="false",
+        ATTEMPT_SPILL_PATH=f"{tmp}/attempts_spill.jsonl",
+    )
+    subprocess.run([sys.executable, "migrations.py"], cwd=backend_dir, env=env, check=True, capture_output=True)
+
+    runs = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT, args.path],
+            cwd=backend_dir, env=env, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result["process_ms"] = (time.perf_counter() - started) * 1000
+        runs.append(result)
+
+    print(f"repeat={args.repeat} first request={args.path}")
+    for name in ("import_ms", "schema_check_ms", "startup_ms", "first_request_ms", "process_ms"):
+        result = _summary([run[name] for run in runs])
+        print(f"{name:18s} p50={result['p50_ms']:>9.2f}ms max={result['max_ms']:>9.2f}ms")
+
+
+def bench_auth(args):
+    """
+    로그인이 몰리는 동안의 로그인 처리량과 다른 API(/api/rankings) 응답 시간을 측정합니다.
+    앱을 같은 프로세스에서 실행하므로 해시가 GIL을 잡는 영향이 그대로 드러납니다.
+    --workers 0 은 기존처럼 스레드풀에서 해시 (비교용)
+    """
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.db"
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ["PASSWORD_HASH_MAX_PENDING"] = str(args.concurrency * 2)
+    os.environ["QUESTION_REPLENISHER_ENABLED"] = "false"
+    os.environ["ATTEMPT_COMPACTION_ENABLED"] = "false"
+    os.environ["ATTEMPT_SPILL_PATH"] = f"{tmp}/attempts_spill.jsonl"
+    if args.rounds:
+        os.environ["PASSWORD_HASH_ROUNDS"] = str(args.rounds)
+
+    import httpx
+    import main
+
+    async def probe(client, until):
+        timings = []
+        while time.perf_counter() < until:
+            started = time.perf_counter()
+            await client.get("/api/rankings")
+            timings.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(args.probe_interval)
+        return timings
+
+    async def login_storm(client, until):
+        logins = 0
+        async def worker(n):
+            nonlocal logins
+            while time.perf_counter() < until:
+                response = await client.post("/api/auth/login", data={"username": f"bench{n % args.users}", "password": "bench-password"})
+                if response.status_code == 200:
+                    logins += 1
+        await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+        return logins
+
+    async def run():
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                for n in range(args.users):
+                    await client.post("/api/auth/register", json={"username": f"bench{n}", "password": "bench-password"})
+
+                baseline = await probe(client, time.perf_counter() + args.seconds)
+                until = time.perf_counter() + args.seconds
+                started = time.perf_counter()
+                logins, storm = await asyncio.gather(login_storm(client, until), probe(client, until))
+                elapsed = time.perf_counter() - started
+        return baseline, storm, logins, elapsed
+
+    baseline, storm, logins, elapsed = asyncio.run(run())
+    print(f"workers={args.workers} concurrency={args.concurrency} rounds={os.environ.get('PASSWORD_HASH_ROUNDS', 'default')} seconds={args.seconds}")
+    print(f"logins: {logins} ({logins / elapsed:.1f}/s)")
+    for name, timings in (("rankings(idle)", baseline), ("rankings(login storm)", storm)):
+        result = _summary(timings)
+        print(f"{name:24s} n={result['count']:>5d} p50={result['p50_ms']:>8.2f}ms p95={result['p95_ms']:>8.2f}ms max={result['max_ms']:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Context Hunter backend benchmarks")
+    sub = parser.add_subparsers(dest="command")
+
+    sampling = sub.add_parser("sampling", help="무작위 문제 추출 (ORDER BY RANDOM() vs random_key)")
+    sampling.add_argument("--rows", type=int, default=1000000)
+    sampling.add_argument("--limit", type=int, default=10)
+    sampling.add_argument("--repeat", type=int, default=20)
+    sampling.add_argument("--database-url", default=None)
+    sampling.set_defaults(func=bench_sampling)
+
+    auth = sub.add_parser("auth", help="로그인 폭주 중 로그인 처리량과 다른 API 응답 시간")
+    auth.add_argument("--workers", type=int, default=2, help="비밀번호 해시 프로세스 수 (0이면 스레드풀)")
+    auth.add_argument("--concurrency", type=int, default=32)
+    auth.add_argument("--users", type=int, default=20)
+    auth.add_argument("--rounds", type=int, default=None)
+    auth.add_argument("--seconds", type=float, default=5.0)
+    auth.add_argument("--probe-interval", type=float, default=0.01)
+    auth.add_argument("--database-url", default=None)
+    auth.set_defaults(func=bench_auth)
+
+    questions = sub.add_parser("questions", help="문제 목록 응답 직렬화 (ORM+Pydantic vs 컬럼+orjson)")
+    questions.add_argument("--limit", type=int, default=100)
+    questions.add_argument("--repeat", type=int, default=200)
+    questions.add_argument("--database-url", default=None)
+    questions.set_defaults(func=bench_questions)
+
+    startup = sub.add_parser("startup", help="워커 콜드 스타트 (import, lifespan 시작, 첫 요청)")
+    startup.add_argument("--repeat", type=int, default=5)
+    startup.add_argument("--path", default="/api/rankings")
+    startup.add_argument("--database-url", default=None)
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    if not getattr(args, "func", None):
+        parser.print_help()
+    else:
+        args.func(args)
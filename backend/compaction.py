@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import database
+import models
+from singleflight import try_acquire_lease, release_lease
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+COMPACTION_LEASE_KEY = "attempt-compaction"
+
+
+def rollup_rows(rows):
+    """
+    rows: [(question_id, similarity_score, is_correct, timestamp), ...]
+    -> {(question_id, day): {"attempts", "correct_count", "hist_0", ..., "hist_9"}}
+    """
+    rollups = {}
+    for question_id, score, is_correct, timestamp in rows:
+        key = (question_id, timestamp.strftime("%Y-%m-%d"))
+        stat = rollups.get(key)
+        if stat is None:
+            stat = rollups[key] = dict(
+                {"attempts": 0, "correct_count": 0},
+                **{f"hist_{i}": 0 for i in range(models.HISTOGRAM_BUCKETS)}
+            )
+        stat["attempts"] += 1
+        stat["correct_count"] += int(bool(is_correct))
+        stat[f"hist_{models.score_bucket(score)}"] += 1
+    return rollups
+
+
+def compact_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """
+    cutoff 이전의 가장 오래된 시도 기록 batch_size개를 한 트랜잭션으로
+    1. question_daily_stats에 더하고 2. attempts_archive로 옮긴 뒤 3. attempts에서 삭제합니다.
+    보관 테이블의 기본키가 원래 id이므로, 여러 워커가 같은 기록을 옮기려 해도 한 번만 성공합니다.
+    옮긴 행 수를 반환합니다.
+    """
+    attempts = models.Attempt.__table__
+    archive = models.AttemptArchive.__table__
+    stats = models.QuestionDailyStat.__table__
+    try:
+        rows = db.execute(
+            select(attempts.c.id, attempts.c.question_id, attempts.c.similarity_score, attempts.c.is_correct, attempts.c.timestamp)
+            .where(attempts.c.timestamp < cutoff)
+            .order_by(attempts.c.timestamp, attempts.c.id)
+            .limit(batch_size)
+        ).fetchall()
+        if not rows:
+            return 0
+        in_batch = attempts.c.id.in_([row.id for row in rows])
+
+        for (question_id, day), values in rollup_rows(
+            (row.question_id, row.similarity_score, row.is_correct, row.timestamp) for row in rows
+        ).items():
+            database.upsert(
+                db, stats,
+                values=dict(values, question_id=question_id, day=day),
+                conflict_columns=["question_id", "day"],
+                update={column: stats.c[column] + value for column, value in values.items()}
+            )
+
+        columns = [c.name for c in archive.columns]
+        db.execute(archive.insert().from_select(columns, select(*[attempts.c[name] for name in columns]).where(in_batch)))
+        db.execute(attempts.delete().where(in_batch))
+        db.commit()
+        return len(rows)
+    except Exception:
+        db.rollback()
+        raise
+
+
+class AttemptCompactor:
+    """
+    attempts 테이블이 계속 커지지 않도록 주기적으로 실행되는 압축 작업.
+    retention_days가 지난 시도 기록은 문제/일별 롤업(question_daily_stats)에 더한 뒤
+    attempts_archive로 옮겨, attempts에는 최근 기록만 남습니다.
+    여러 워커 중 generation_leases 리스를 얻은 한 곳에서만 실행됩니다.
+    """
+    def __init__(self, retention_days: float = 30, interval: float = 3600.0, batch_size: int = 5000):
+        self.retention_days = retention_days
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._task = None
+        self.compacted = 0
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at = None
+        self.last_run_ms = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Attempt compactor started (retention_days={self.retention_days}, interval={self.interval}s)")
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.compact_once()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Attempt compaction failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def compact_once(self) -> int:
+        self.last_run_at = time.time()
+        started = time.monotonic()
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        db = database.SessionLocal()
+        try:
+            if not await run_in_threadpool(try_acquire_lease, db, COMPACTION_LEASE_KEY, max(self.interval, 600)):
+                return 0
+            moved = 0
+            try:
+                # 배치마다 트랜잭션을 끝내고 이벤트 루프에 양보 (잠금을 오래 잡지 않도록)
+                while True:
+                    count = await run_in_threadpool(compact_batch, db, cutoff, self.batch_size)
+                    moved += count
+                    if count < self.batch_size:
+                        break
+                    await asyncio.sleep(0)
+            finally:
+                await run_in_threadpool(release_lease, db, COMPACTION_LEASE_KEY)
+        finally:
+            db.close()
+
+        self.runs += 1
+        self.compacted += moved
+        self.last_run_ms = round((time.monotonic() - started) * 1000, 2)
+        if moved:
+            logger.info(f"Compacted {moved} attempts older than {cutoff:%Y-%m-%d}")
+        return moved
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "retention_days": self.retention_days,
+            "runs": self.runs,
+            "compacted": self.compacted,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at,
+            "last_run_ms": self.last_run_ms,
+        }
+
+
+# 싱글톤 인스턴스 생성 (main.py의 lifespan에서 시작/종료)
+attempt_compactor = AttemptCompactor(
+    retention_days=float(os.getenv("ATTEMPT_RETENTION_DAYS", "30")),
+    interval=float(os.getenv("ATTEMPT_COMPACTION_INTERVAL", "3600")),
+    batch_size=int(os.getenv("ATTEMPT_COMPACTION_BATCH", "5000")),
+)
+COMPACTION_ENABLED = os.getenv("ATTEMPT_COMPACTION_ENABLED", "true").lower() in ("1", "true", "yes", "on")
@@ -1,15 +1,51 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-import models, schemas
+from sqlalchemy.orm import Session, contains_eager, load_only
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, case, literal, String
+import models, schemas, database
 import difflib
 import logging
-from ai import generate_question, check_similarity
+import traceback
+import asyncio
+import base64
+import os
+import orjson
+from ai import generate_question_async, check_similarity_async, check_similarity_batch_async, stream_similarity_async, ai_breaker
 from datetime import datetime, timedelta
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from verdict_cache import verdict_cache
+from cache import TTLCache
+from prescore import prescorer
+from singleflight import daily_generation_flight, try_acquire_lease, release_lease
+from attempt_log import attempt_writer, attempt_rows, write_attempts
+from leaderboard import leaderboard
+from response_cache import response_cache
 
 # 로거 설정
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# async 함수는 동기 Session과 AsyncSession(DB_ASYNC=true)을 모두 받습니다.
+# 쿼리는 동기 함수 fn(db, ...) 하나로 작성하고, 세션 종류에 따라 실행 방식만 다름
+async def run_db(db, fn, *args):
+    """
+    AsyncSession: run_sync로 이벤트 루프에서 실행 (비동기 드라이버, 스레드 전환 없음)
+    Session: 스레드풀에서 실행
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+def open_session():
+    # 요청과 분리된 작업(스트리밍 응답, 일일 문제 생성)용 세션
+    return database.AsyncSessionLocal() if database.DB_ASYNC else database.SessionLocal()
+
+async def close_session(db):
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        db.close()
+
 # 초기 시드 데이터 (DB가 비었을 때 AI에게 던져줄 주제들)
 SEED_CONTEXTS = [
     "The early bird catches the worm.",
@@ -27,80 +63,187 @@ import random
 
 import uuid
 
-# 문제 조회 함수 (분야별/난이도별)
-def get_questions(db: Session, category: str = None, limit: int = 5, allow_generation: bool = True):
-    query = db.query(models.Question)
-    
+# 세션별로 이미 출제한 문제 ID (같은 세션에 같은 문제를 다시 내지 않기 위함)
+QUESTION_SESSION_TTL = float(os.getenv("QUESTION_SESSION_TTL", "7200"))
+_session_seen = TTLCache(maxsize=int(os.getenv("QUESTION_SESSION_CACHE_SIZE", "10000")), ttl=QUESTION_SESSION_TTL)
+
+def _seen_question_ids(session_id: str = None):
+    if not session_id:
+        return set()
+    return _session_seen.get(session_id) or set()
+
+def _mark_questions_seen(session_id: str, question_ids):
+    if not session_id:
+        return
+    seen = _seen_question_ids(session_id) | set(question_ids)
+    _session_seen.set(session_id, seen)
+
+def _random_ids_query(db: Session, category: str, start: float, window: int, wrap: bool = False):
+    # wrap=False: start 이상 구간, wrap=True: 처음부터 start 미만 구간
+    query = db.query(models.Question.id)
     if category and category != "random":
         query = query.filter(models.Question.category == category)
-    
-    # 랜덤으로 가져오기 (MySQL/MariaDB: func.rand(), SQLite: func.random())
-    # 여기서는 SQLite 호환을 위해 func.random() 사용
-    questions = query.order_by(func.random()).limit(limit).all()
+    bound = models.Question.random_key < start if wrap else models.Question.random_key >= start
+    return query.filter(bound).order_by(models.Question.random_key).limit(window)
+
+def _fetch_random_questions(db: Session, category: str = None, limit: int = 5, exclude=frozenset()):
+    """
+    random_key 인덱스에서 임의의 시작점부터 (limit + 제외할 문제 수) 개의 ID를 범위 조회하고 (모자라면 처음부터 이어서)
+    제외 대상이 아닌 것 중 limit개를 무작위로 고릅니다.
+    ORDER BY RAND()와 달리 테이블 전체를 정렬하지 않으며, 제외 대상을 뺀 문제가 limit개 이상 있으면 항상 limit개를 반환합니다.
+    """
+    window = limit + len(exclude)
+    start = random.random()
+    ids = [row[0] for row in _random_ids_query(db, category, start, window)]
+    if len(ids) < window:
+        ids += [row[0] for row in _random_ids_query(db, category, start, window - len(ids), wrap=True)]
+
+    candidates = [qid for qid in ids if qid not in exclude]
+    picked = random.sample(candidates, min(limit, len(candidates)))
+    if not picked:
+        return []
+
+    by_id = {q.id: q for q in db.query(*QUESTION_PAYLOAD_COLUMNS).filter(models.Question.id.in_(picked))}
+    return [by_id[qid] for qid in picked if qid in by_id]
+
+# 동시에 진행할 수 있는 AI 문제 생성 수 (프로세스 전체 공유, Ollama 서버 부하 상한)
+AI_GENERATION_CONCURRENCY = int(os.getenv("AI_GENERATION_CONCURRENCY", "4"))
+_generation_semaphore = None
+
+def _get_generation_semaphore():
+    # 실행 중인 이벤트 루프에 묶이도록 첫 사용 시점에 생성
+    global _generation_semaphore
+    if _generation_semaphore is None:
+        _generation_semaphore = asyncio.Semaphore(AI_GENERATION_CONCURRENCY)
+    return _generation_semaphore
+
+async def generate_questions_concurrently(specs):
+    """
+    specs: [(category, difficulty), ...]
+    세마포어로 동시 실행 수를 제한하여 병렬 생성하고, 성공한 결과만 [(ai_data, category, difficulty), ...] 로 반환합니다.
+    """
+    # AI 서버 장애로 차단기가 열려 있으면 생성을 잠시 중단 (기존 재고/DB 문제로 응답)
+    if ai_breaker.is_open:
+        logger.warning(f"AI circuit breaker is open. Skipping generation of {len(specs)} questions.")
+        return []
+
+    semaphore = _get_generation_semaphore()
+
+    async def _generate(category, difficulty):
+        async with semaphore:
+            return await generate_question_async(category=category, difficulty=difficulty)
+
+    results = await asyncio.gather(*[_generate(c, d) for c, d in specs])
+
+    generated = []
+    for (category, difficulty), ai_data in zip(specs, results):
+        if "error" in ai_data:
+            logger.error(f"AI Generation Error for {category}: {ai_data['error']}")
+            continue
+        generated.append((ai_data, category, difficulty))
+    return generated
+
+def _new_question(ai_data: dict, category: str, default_difficulty: int):
+    return models.Question(
+        id=str(uuid.uuid4()),  # Generate explicit ID
+        encoded_text=ai_data.get("encoded_sentence", "Error"),
+        original_text=ai_data.get("target_word", "Unknown"),
+        correct_meaning=ai_data.get("original_meaning", "Error"),
+        category=category,
+        difficulty=ai_data.get("difficulty_level", default_difficulty),
+        correct_count=0,
+        total_attempts=0
+    )
+
+def save_generated_questions(db: Session, generated):
+    """
+    생성된 문제들을 한 번의 커밋으로 저장하고, server_default 값(created_at)을 포함해 한 번의 쿼리로 다시 읽어옵니다.
+    """
+    if not generated:
+        return []
+    new_questions = [_new_question(ai_data, category, difficulty) for ai_data, category, difficulty in generated]
+    ids = [q.id for q in new_questions]
+    db.add_all(new_questions)
+    db.commit()
+    # 오늘 생성된 문제는 분야 없는 일일 문제 응답에 포함됨
+    response_cache.invalidate(DAILY_RESPONSE_KEY)
+    return db.query(models.Question).filter(models.Question.id.in_(ids)).all()
+
+# 문제 응답(schemas.Question)에 필요한 컬럼 (조회 시 ORM 객체 대신 이 컬럼만 담은 행을 사용)
+QUESTION_PAYLOAD_COLUMNS = (
+    models.Question.id,
+    models.Question.encoded_text,
+    models.Question.correct_meaning,
+    models.Question.category,
+    models.Question.correct_count,
+    models.Question.total_attempts,
+    models.Question.created_at,
+)
+
+def _question_to_dict(q):
+    # q: Question 객체 또는 QUESTION_PAYLOAD_COLUMNS 행
+    return {
+        "id": str(q.id), # UUID to string
+        "encoded": q.encoded_text, 
+        "correct_meaning": q.correct_meaning,
+        "category": q.category,
+        "correct_count": q.correct_count, 
+        "total_attempts": q.total_attempts, 
+        "success_rate": models.success_rate(q.correct_count, q.total_attempts),
+        "created_at": q.created_at
+    }
+
+def questions_response_json(questions) -> bytes:
+    """
+    _question_to_dict 결과를 schemas.QuestionsResponse 형태로 한 번에 직렬화합니다.
+    (response_model 재검증과 jsonable_encoder 변환을 거치지 않음)
+    """
+    return orjson.dumps({"questions": questions})
+
+# 문제 조회 함수 (분야별/난이도별)
+# DB 작업은 run_db(스레드풀 또는 비동기 드라이버)로, AI 호출은 이벤트 루프에서 await 하여 스레드를 점유하지 않음
+async def get_questions(db: Session, category: str = None, limit: int = 5, allow_generation: bool = True, session_id: str = None, max_generated: int = None):
+    questions = await run_db(db, _fetch_random_questions, category, limit, _seen_question_ids(session_id))
     
     logger.info(f"Fetched {len(questions)} questions for category {category}")
 
     # 문제가 부족하면 AI로 생성 (자동 채우기) - allow_generation이 True일 때만
     if allow_generation and len(questions) < limit:
         needed = limit - len(questions)
+        if max_generated is not None:
+            needed = min(needed, max_generated)
         logger.info(f"Not enough questions. Generating {needed} new questions using AI...")
         
-        for _ in range(needed):
-            # 카테고리가 없으면 'general' 또는 랜덤 선택
-            target_category = category if category else "General"
-            
-            # AI 호출
-            # 난이도를 다양화 (1: 20%, 2: 50%, 3: 30%)
-            rand_diff = random.choices([1, 2, 3], weights=[0.2, 0.5, 0.3])[0]
-            
-            ai_data = generate_question(category=target_category, difficulty=rand_diff)
-            
-            if "error" in ai_data:
-                logger.error(f"AI Generation Error: {ai_data['error']}")
-                continue
-                
-            # DB 저장
-            try:
-                new_question = models.Question(
-                    id=str(uuid.uuid4()),  # Generate explicit ID
-                    encoded_text=ai_data.get("encoded_sentence", "Error"),
-                    original_text=ai_data.get("target_word", "Unknown"),
-                    correct_meaning=ai_data.get("original_meaning", "Error"),
-                    category=ai_data.get("category", target_category),
-                    difficulty=ai_data.get("difficulty_level", 1),
-                    correct_count=0,
-                    total_attempts=0
-                )
-                db.add(new_question)
-                db.commit()
-                db.refresh(new_question)
-                
-                questions.append(new_question)
-            except Exception as e:
-                 logger.error(f"Failed to save AI question: {e}")
-                 db.rollback()
-
-    return [
-        {
-            "id": str(q.id), # UUID to string
-            "encoded": q.encoded_text, 
-            "correct_meaning": q.correct_meaning,
-            "category": q.category,
-            "correct_count": q.correct_count, 
-            "total_attempts": q.total_attempts, 
-            "success_rate": q.success_rate,
-            "created_at": q.created_at
-        } 
-        for q in questions
-    ]
+        # 카테고리가 없으면 'general' 또는 랜덤 선택
+        target_category = category if category else "General"
+        
+        # AI 호출 (병렬)
+        # 난이도를 다양화 (1: 20%, 2: 50%, 3: 30%)
+        rand_diffs = random.choices([1, 2, 3], weights=[0.2, 0.5, 0.3], k=needed)
+        generated = await generate_questions_concurrently([(target_category, d) for d in rand_diffs])
+        
+        # DB 저장 (일괄)
+        # 기존 동작과 같이 AI가 돌려준 분야를 우선 사용하고, 난이도 기본값은 1
+        generated = [(ai_data, ai_data.get("category", target_category), 1) for ai_data, _, _ in generated]
+        try:
+            questions.extend(await run_db(db, save_generated_questions, generated))
+        except Exception as e:
+             logger.error(f"Failed to save AI questions: {e}")
+             await run_db(db, Session.rollback)
 
+    _mark_questions_seen(session_id, [q.id for q in questions])
+    return [_question_to_dict(q) for q in questions]
 
-def get_daily_questions(db: Session, category: str = None, limit: int = 5):
-    # 1. 오늘 날짜 (KST 기준) 확인
+
+def _kst_today():
     # KST = UTC + 9
     now_utc = datetime.utcnow()
     now_kst = now_utc + timedelta(hours=9)
-    today_date_kst = now_kst.date()
+    return now_kst.date()
+
+def _daily_questions_query(db: Session, category: str = None):
+    # 1. 오늘 날짜 (KST 기준) 확인
+    today_date_kst = _kst_today()
     
     # 오늘의 시작과 끝 (KST 기준 00:00 ~ 24:00)을 UTC로 변환하여 쿼리
     # KST 00:00 = 전날 UTC 15:00
@@ -123,201 +266,436 @@ def get_daily_questions(db: Session, category: str = None, limit: int = 5):
         # 카테고리가 없으면 모든 일일 문제 대상
         query = query.filter(models.Question.category.in_(ALL_CATEGORIES))
         
-    questions = query.all()
+    return query
+
+# 분야 없는 일일 문제 응답 캐시 키 (KST 날짜를 버전으로 사용)
+DAILY_RESPONSE_KEY = "questions-daily"
+
+def daily_response_version():
+    return _kst_today().isoformat()
+
+def _fetch_daily_questions(db: Session, category: str = None):
+    return _daily_questions_query(db, category).with_entities(*QUESTION_PAYLOAD_COLUMNS).all()
+
+# 일일 문제 생성 리스 유지 시간 (이 시간 안에 생성이 끝나지 않으면 다른 워커가 이어받음)
+DAILY_GENERATION_LEASE_SECONDS = float(os.getenv("DAILY_GENERATION_LEASE_SECONDS", "120"))
+DAILY_GENERATION_POLL_SECONDS = 1.0
+
+async def _fill_daily_questions(category: str, limit: int, date_key: str):
+    """
+    (날짜, 분야)별로 단 하나의 생성 작업만 수행합니다.
+    - 프로세스 내: daily_generation_flight가 동시 요청을 이 코루틴 하나로 합침
+    - 워커 간: generation_leases 리스를 얻은 워커만 생성하고, 나머지는 생성 완료를 기다렸다가 DB에서 읽음
+    요청 세션과 분리된 세션을 사용합니다. (기다리던 요청이 끊겨도 생성은 계속됨)
+    """
+    lease_key = f"daily:{date_key}:{category}"
+    deadline = asyncio.get_running_loop().time() + DAILY_GENERATION_LEASE_SECONDS
+    db = open_session()
+    try:
+        while True:
+            questions = await run_db(db, _fetch_daily_questions, category)
+            if len(questions) >= limit:
+                return [_question_to_dict(q) for q in questions]
+
+            if await run_db(db, try_acquire_lease, lease_key, DAILY_GENERATION_LEASE_SECONDS):
+                try:
+                    # 리스를 얻은 뒤 다시 세어, 다른 워커가 이미 채운 만큼은 생성하지 않음
+                    questions = await run_db(db, _fetch_daily_questions, category)
+                    result = [_question_to_dict(q) for q in questions]
+                    needed = limit - len(result)
+                    if needed > 0:
+                        logger.info(f"Daily questions for {category} incomplete ({len(result)}/{limit}). Generating {needed} more...")
+                        generated = await generate_questions_concurrently([(category, 2)] * needed)
+                        try:
+                            saved = await run_db(db, save_generated_questions, generated)
+                            result.extend(_question_to_dict(q) for q in saved)
+                        except Exception as e:
+                            logger.error(f"Failed to save Daily Questions ({category}): {e}")
+                            await run_db(db, Session.rollback)
+                    return result
+                finally:
+                    await run_db(db, release_lease, lease_key)
+
+            # 다른 워커가 생성 중: 완료될 때까지 대기 (시간 초과 시 현재 있는 문제만 반환)
+            if asyncio.get_running_loop().time() > deadline:
+                logger.error(f"Timed out waiting for daily generation lease {lease_key}")
+                return [_question_to_dict(q) for q in questions]
+            await asyncio.sleep(DAILY_GENERATION_POLL_SECONDS)
+    finally:
+        await close_session(db)
+
+async def get_daily_questions(db: Session, category: str = None, limit: int = 5):
+    questions = await run_db(db, _fetch_daily_questions, category)
     
     # 2. 문제 생성 로직 (카테고리가 지정된 경우에만 수행)
-    if category:
-        # 요청된 카테고리의 현재 문제 수 확인
-        current_count = len(questions)
-        needed = limit - current_count
-        
-        if needed > 0:
-            logger.info(f"Daily questions for {category} incomplete ({current_count}/{limit}). Generating {needed} more...")
-            
-            for _ in range(needed):
-                logger.info(f"Generating Daily Question for category: {category}")
-                ai_data = generate_question(category=category, difficulty=2)
-                
-                if "error" in ai_data:
-                    logger.error(f"AI Generation Error for {category}: {ai_data['error']}")
-                    continue
-                
-                try:
-                    new_question = models.Question(
-                        id=str(uuid.uuid4()),
-                        encoded_text=ai_data.get("encoded_sentence", "Error"),
-                        original_text=ai_data.get("target_word", "Unknown"),
-                        correct_meaning=ai_data.get("original_meaning", "Error"),
-                        category=category,
-                        difficulty=ai_data.get("difficulty_level", 2),
-                        correct_count=0,
-                        total_attempts=0
-                    )
-                    db.add(new_question)
-                    db.commit()
-                    db.refresh(new_question)
-                    questions.append(new_question)
-                except Exception as e:
-                    logger.error(f"Failed to save Daily Question ({category}): {e}")
-                    db.rollback()
+    # KST 자정 직후 몰리는 요청들이 각자 생성하지 않도록 (날짜, 분야)별 단일 생성 작업으로 합침
+    if category and len(questions) < limit:
+        date_key = _kst_today().isoformat()
+        return await daily_generation_flight.do(
+            (date_key, category),
+            lambda: _fill_daily_questions(category, limit, date_key)
+        )
     
     # 카테고리가 없는 경우(대시보드 조회 등)는 생성하지 않고 있는 그대로 반환
     
     # 3. 반환
-    return [
-        {
-            "id": str(q.id),
-            "encoded": q.encoded_text, 
-            "correct_meaning": q.correct_meaning,
-            "category": q.category,
-            "correct_count": q.correct_count, 
-            "total_attempts": q.total_attempts, 
-            "success_rate": q.success_rate,
-            "created_at": q.created_at
-        } 
-        for q in questions
-    ]
+    return [_question_to_dict(q) for q in questions]
 
 
 # 정답 확인 및 결과 저장 함수
-def verify_answer(db: Session, question_id: str, user_answer: str, user_id: int = -1):
+def _get_question_query(db: Session, question_id: str):
+    return db.query(models.Question).filter(models.Question.id == question_id)
+
+def end_read_transaction(db: Session, objects=(), reattach: bool = False):
+    # AI 판별을 기다리는 동안 트랜잭션(스냅샷/커넥션)을 잡고 있지 않도록 조회 직후 종료
+    # 조회한 객체는 세션에서 분리하여 만료되지 않게 함 (reattach=True면 다시 붙여서 이후 수정/커밋 가능)
+    for obj in objects:
+        db.expunge(obj)
+    db.rollback()
+    if reattach:
+        db.add_all(objects)
+
+def _get_question(db: Session, question_id: str):
+    question = _get_question_query(db, question_id).first()
+    end_read_transaction(db, [question] if question else [])
+    return question
+
+def _get_questions_by_ids(db: Session, question_ids):
+    questions = db.query(models.Question).filter(models.Question.id.in_(set(question_ids))).all()
+    end_read_transaction(db, questions)
+    return {q.id: q for q in questions}
+
+def _copy_paste_check(question: models.Question, user_answer: str):
+    # 1. 보여지는 문장(문제)과 동일한 경우 정답 처리 금지 (Copy & Paste 방지)
+    # 띄어쓰기 무시하고 비교
+    # 1. Check if it matches the Correct Meaning (Model Answer) first.
+    # If the user found the exact Model Answer (or very close), we accept it regardless of its similarity to the Encoded Text.
+    # This solves the "Model Answer is too similar to Question" conflict.
+    meaning_matcher = difflib.SequenceMatcher(None, user_answer, question.correct_meaning)
+    if meaning_matcher.ratio() >= 0.9:
+        return None # Bypass the copy-paste check below
+
+    # 2. 보여지는 문장(문제)과 동일한 경우 정답 처리 금지 (Copy & Paste 방지)
+    # difflib를 사용해 유사도 90% 이상이면 반려
+    matcher = difflib.SequenceMatcher(None, user_answer, question.encoded_text)
+    if matcher.ratio() >= 0.9:
+        return schemas.VerifyAnswerResponse(
+            isCorrect=False,
+            similarity=0.0,
+            correctAnswer=question.correct_meaning, 
+            feedback="원문에 있는 단어들을 너무 많이 사용했습니다. 자신의 말로 풀어서 설명해주세요."
+        )
+    return None
+
+def _record_attempts(db: Session, records, user_id: int):
+    """
+    records: [(question, user_answer, ai_result), ...] 를 채점이 끝난 뒤 한 트랜잭션으로 기록합니다.
+    통계는 읽고-더하고-쓰는 대신 DB에서 col = col + n 으로 증가시키므로 동시 요청에도 누락되지 않습니다.
+    """
+    write_attempts(db, *attempt_rows(records, user_id))
+
+async def _log_attempts(db: Session, records, user_id: int):
+    # write-behind 큐가 실행 중이면 큐에 넣고 바로 반환 (응답이 분석용 기록을 기다리지 않음)
+    if attempt_writer.running:
+        await attempt_writer.submit(*attempt_rows(records, user_id))
+    else:
+        await run_db(db, _record_attempts, records, user_id)
+
+async def _resolve_cached_verdicts(db: Session, items):
+    """
+    items: [(question, user_answer), ...]
+    로컬 사전 판정 -> 메모리 캐시 -> DB 캐시 순으로 판정을 찾고, 없으면 None (AI 판별 필요)
+    """
+    # 명확한 정답/오답은 로컬 어휘 유사도로 바로 판정 (경계 구간만 AI로 넘김)
+    results = [
+        prescorer.evaluate(user_answer, question.correct_meaning, question.encoded_text, question.original_text)
+        for question, user_answer in items
+    ]
+    
+    # 같은 문제에 같은 답안이 들어온 적이 있으면 AI 호출 없이 캐시된 판정 사용 (메모리 -> DB 순)
+    for i, (question, user_answer) in enumerate(items):
+        if results[i] is None:
+            results[i] = verdict_cache.get(question.id, user_answer)
+    
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        def _load(db):
+            try:
+                return [verdict_cache.load(db, items[i][0].id, items[i][1]) for i in misses]
+            finally:
+                end_read_transaction(db)
+        loaded = await run_db(db, _load)
+        for i, result in zip(misses, loaded):
+            results[i] = result
+    return results
+
+def _degrade_if_failed(question: models.Question, user_answer: str, ai_result: dict):
+    # AI 판별 실패(타임아웃, 차단기 열림 등) 시 0점 처리 대신 로컬 간이 채점으로 대체
+    if "error" not in ai_result:
+        return ai_result
+    logger.warning(f"AI similarity check failed ({ai_result['error']}). Using degraded grading for {question.id}")
+    return prescorer.degraded_verdict(user_answer, question.correct_meaning, question.encoded_text, question.original_text)
+
+def _store_verdicts(db: Session, records):
+    # AI 판정 결과만 캐시 (로컬 판정/AI 호출 실패/간이 채점 결과는 제외)
+    for question, user_answer, ai_result in records:
+        if "error" not in ai_result and ai_result.get("source", "llm") == "llm":
+            verdict_cache.store(db, question.id, user_answer, ai_result)
+
+def _build_verify_response(question: models.Question, ai_result: dict):
+    # Calculate Grade
+    grade = "미흡"
+    if ai_result["similarity_score"] >= 90:
+        grade = "최상"
+    elif ai_result["similarity_score"] >= 70:
+        grade = "우수"
+    elif ai_result["similarity_score"] >= 50:
+        grade = "보통"
+
+    return schemas.VerifyAnswerResponse(
+        isCorrect=ai_result["is_correct"],
+        feedback=ai_result.get("feedback"),
+        correctAnswer=question.correct_meaning, # 정답 공개
+        similarity=float(ai_result["similarity_score"]),
+        grade=grade,
+        degraded=ai_result.get("degraded", False)
+    )
+
+# DB 조회/저장은 run_db로 짧게 처리하고, 수 초가 걸리는 AI 판별은 await로 대기
+async def verify_answer(db: Session, question_id: str, user_answer: str, user_id: int = -1):
     try:
-        question = db.query(models.Question).filter(models.Question.id == question_id).first()
+        question = await run_db(db, _get_question, question_id)
         if not question:
             logger.error(f"verify_answer: Question {question_id} not found")
             return None
             
-        # 1. 보여지는 문장(문제)과 동일한 경우 정답 처리 금지 (Copy & Paste 방지)
-        # 띄어쓰기 무시하고 비교
-        # 1. Check if it matches the Correct Meaning (Model Answer) first.
-        # If the user found the exact Model Answer (or very close), we accept it regardless of its similarity to the Encoded Text.
-        # This solves the "Model Answer is too similar to Question" conflict.
-        meaning_matcher = difflib.SequenceMatcher(None, user_answer, question.correct_meaning)
-        if meaning_matcher.ratio() >= 0.9:
-            pass # Bypass the copy-paste check below
-        else:
-            # 2. 보여지는 문장(문제)과 동일한 경우 정답 처리 금지 (Copy & Paste 방지)
-            # difflib를 사용해 유사도 90% 이상이면 반려
-            matcher = difflib.SequenceMatcher(None, user_answer, question.encoded_text)
-            if matcher.ratio() >= 0.9:
-                return schemas.VerifyAnswerResponse(
-                    isCorrect=False,
-                    similarity=0.0,
-                    correctAnswer=question.correct_meaning, 
-                    feedback="원문에 있는 단어들을 너무 많이 사용했습니다. 자신의 말로 풀어서 설명해주세요."
-                )
+        rejected = _copy_paste_check(question, user_answer)
+        if rejected:
+            return rejected
         
-        # AI를 이용한 유사도 판별 호출
-        # check_similarity 함수 내부에서 모델 로드 실패 시 적절한 에러 메시지를 반환하도록 처리되어 있음
-        # Compare against the original encoded text (the difficult sentence) directly
-        ai_result = check_similarity(user_answer, question.encoded_text)
+        ai_result = (await _resolve_cached_verdicts(db, [(question, user_answer)]))[0]
         
-        similarity = ai_result['similarity_score']
-        is_correct = ai_result['is_correct']
-        feedback = ai_result['feedback']
+        cache_miss = ai_result is None
+        if cache_miss:
+            # AI를 이용한 유사도 판별 호출 (동시에 들어온 요청은 한 번의 호출로 묶일 수 있음)
+            # check_similarity 함수 내부에서 모델 로드 실패 시 적절한 에러 메시지를 반환하도록 처리되어 있음
+            # Compare against the original encoded text (the difficult sentence) directly
+            ai_result = _degrade_if_failed(question, user_answer, await check_similarity_async(user_answer, question.encoded_text))
         
-        # 통계 업데이트
-        question.total_attempts += 1
-        if is_correct:
-            question.correct_count += 1
-            # 유저 총 정답 수 증가 (게스트 제외)
-            if user_id != -1:
-                user = db.query(models.User).filter(models.User.id == user_id).first()
-                if user:
-                    user.total_solved += 1
+        await _log_attempts(db, [(question, user_answer, ai_result)], user_id)
         
-        # 시도 기록 저장
-        attempt = models.Attempt(
-            question_id=question_id,
-            user_answer=user_answer,
-            similarity_score=similarity,
-            is_correct=is_correct
-        )
-        db.add(attempt)
-        db.commit()
+        if cache_miss:
+            await run_db(db, _store_verdicts, [(question, user_answer, ai_result)])
         
-        # Calculate Grade
-        grade = "미흡"
-        if ai_result["similarity_score"] >= 90:
-            grade = "최상"
-        elif ai_result["similarity_score"] >= 70:
-            grade = "우수"
-        elif ai_result["similarity_score"] >= 50:
-            grade = "보통"
+        return _build_verify_response(question, ai_result)
+    except Exception as e:
+        logger.error(f"verify_answer FAILED: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
-        return schemas.VerifyAnswerResponse(
-            isCorrect=ai_result["is_correct"],
-            feedback=ai_result.get("feedback"),
-            correctAnswer=question.correct_meaning, # 정답 공개
-            similarity=float(ai_result["similarity_score"]),
-            grade=grade
+# 정답 확인 스트리밍 함수
+# 문제가 없으면 None, 있으면 (이벤트, 데이터) 를 내보내는 비동기 제너레이터를 반환
+async def verify_answer_stream(db: Session, question_id: str, user_answer: str, user_id: int = -1):
+    question = await run_db(db, _get_question, question_id)
+    if not question:
+        logger.error(f"verify_answer_stream: Question {question_id} not found")
+        return None
+    return _stream_verdict(question_id, user_answer, user_id)
+
+async def _stream_verdict(question_id: str, user_answer: str, user_id: int):
+    # 응답 스트리밍 중에는 요청 의존성(get_db) 세션이 이미 닫혀 있으므로 별도 세션 사용
+    db = open_session()
+    try:
+        question = await run_db(db, _get_question, question_id)
+        
+        rejected = _copy_paste_check(question, user_answer)
+        if rejected:
+            yield ("result", rejected.model_dump())
+            return
+        
+        ai_result = (await _resolve_cached_verdicts(db, [(question, user_answer)]))[0]
+        cache_miss = ai_result is None
+        early = None
+        if cache_miss:
+            async for event, data in stream_similarity_async(user_answer, question.encoded_text):
+                if event == "score":
+                    early = {"similarity": float(data), "isCorrect": data >= 50}
+                    yield ("score", early)
+                elif event == "feedback":
+                    yield ("feedback", {"delta": data})
+                else:
+                    ai_result = _degrade_if_failed(question, user_answer, data)
+        
+        await _log_attempts(db, [(question, user_answer, ai_result)], user_id)
+        if cache_miss:
+            await run_db(db, _store_verdicts, [(question, user_answer, ai_result)])
+        
+        result = _build_verify_response(question, ai_result).model_dump()
+        # 먼저 보낸 score와 최종 판정이 다르면 (스트림 실패 후 간이 채점 등) 클라이언트가 덮어쓰도록 표시
+        result["revised"] = early is not None and (
+            result["degraded"] or (early["similarity"], early["isCorrect"]) != (result["similarity"], result["isCorrect"])
         )
+        yield ("result", result)
     except Exception as e:
-        logger.error(f"verify_answer FAILED: {str(e)}")
-        import traceback
+        logger.error(f"verify_answer_stream FAILED: {str(e)}")
+        yield ("error", {"detail": f"Internal Server Error: {str(e)}"})
+    finally:
+        await close_session(db)
+
+# 여러 답안 일괄 확인 함수
+# 문제 조회/기록 저장은 각각 한 번의 쿼리/트랜잭션으로, AI 판별은 묶음 프롬프트로 처리
+async def verify_answers_batch(db: Session, items, user_id: int = -1):
+    try:
+        questions = await run_db(db, _get_questions_by_ids, [item.questionId for item in items])
+        
+        responses = [None] * len(items)
+        graded = []
+        for i, item in enumerate(items):
+            question = questions.get(item.questionId)
+            if not question:
+                responses[i] = schemas.VerifyBatchItemResponse(
+                    questionId=item.questionId, isCorrect=False, similarity=0.0, error="Question not found"
+                )
+                continue
+            rejected = _copy_paste_check(question, item.userAnswer)
+            if rejected:
+                responses[i] = schemas.VerifyBatchItemResponse(questionId=item.questionId, **rejected.model_dump())
+                continue
+            graded.append(i)
+        
+        pairs = [(questions[items[i].questionId], items[i].userAnswer) for i in graded]
+        results = await _resolve_cached_verdicts(db, pairs)
+        
+        misses = [k for k, result in enumerate(results) if result is None]
+        if misses:
+            ai_results = await check_similarity_batch_async(
+                [(pairs[k][1], pairs[k][0].encoded_text) for k in misses]
+            )
+            for k, ai_result in zip(misses, ai_results):
+                results[k] = _degrade_if_failed(pairs[k][0], pairs[k][1], ai_result)
+        
+        records = [(question, user_answer, result) for (question, user_answer), result in zip(pairs, results)]
+        await _log_attempts(db, records, user_id)
+        if misses:
+            await run_db(db, _store_verdicts, [records[k] for k in misses])
+        
+        for i, (question, _, result) in zip(graded, records):
+            response = _build_verify_response(question, result)
+            responses[i] = schemas.VerifyBatchItemResponse(questionId=question.id, **response.model_dump())
+        return responses
+    except Exception as e:
+        logger.error(f"verify_answers_batch FAILED: {str(e)}")
         traceback.print_exc()
-        from fastapi import HTTPException
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
+# 문제 통계 (일별 시도/정답 수, 점수 히스토그램)
+# 보존 기간이 지난 기록은 question_daily_stats 롤업에서, 최근 기록은 attempts에서 집계하여 합침
+def _hot_daily_stats_query(db: Session, question_id: str):
+    attempt = models.Attempt
+    buckets = [
+        func.sum(case(
+            (attempt.similarity_score >= i * 10, 1) if i == models.HISTOGRAM_BUCKETS - 1
+            else ((attempt.similarity_score >= i * 10) & (attempt.similarity_score < (i + 1) * 10), 1),
+            else_=0
+        ))
+        for i in range(models.HISTOGRAM_BUCKETS)
+    ]
+    day = func.date(attempt.timestamp)
+    return db.query(
+        day, func.count(attempt.id), func.sum(case((attempt.is_correct, 1), else_=0)), *buckets
+    ).filter(attempt.question_id == question_id).group_by(day)
+
+def get_question_stats(db: Session, question_id: str):
+    # 없는 문제면 None (시도 기록이 없는 문제와 구분)
+    if db.query(models.Question.id).filter(models.Question.id == question_id).first() is None:
+        return None
+    daily = {}
+    for stat in db.query(models.QuestionDailyStat).filter(models.QuestionDailyStat.question_id == question_id):
+        daily[stat.day] = [stat.attempts, stat.correct_count] + stat.histogram
+    for day, *values in _hot_daily_stats_query(db, question_id):
+        day = str(day)
+        values = [int(v or 0) for v in values]
+        daily[day] = [a + b for a, b in zip(daily.get(day, [0] * len(values)), values)]
+
+    days = [
+        {"day": day, "attempts": v[0], "correct_count": v[1], "histogram": v[2:]}
+        for day, v in sorted(daily.items())
+    ]
+    attempts = sum(d["attempts"] for d in days)
+    correct = sum(d["correct_count"] for d in days)
+    return {
+        "question_id": question_id,
+        "attempts": attempts,
+        "correct_count": correct,
+        "success_rate": round(correct / attempts * 100, 1) if attempts else 0.0,
+        "histogram": [sum(d["histogram"][i] for d in days) for i in range(models.HISTOGRAM_BUCKETS)],
+        "daily": days,
+    }
+
 # 방명록(랭킹) 저장 함수 (전체 난이도 통합 최고 기록만 유지)
 def create_guestbook_entry(db: Session, entry: schemas.GuestbookCreate):
-    # 기존 기록 조회 (닉네임으로만 조회)
-    existing_entry = db.query(models.Guestbook).filter(
-        models.Guestbook.nickname == entry.nickname
-    ).first()
-
-    if existing_entry:
-        # 기존 기록이 있으면 점수 비교
-        # 새 점수가 더 높거나, 점수가 같고 스트릭이 더 높을 때만 업데이트
-        should_update = False
-        if entry.score > existing_entry.score:
-            should_update = True
-        elif entry.score == existing_entry.score and entry.max_streak > existing_entry.max_streak:
-            should_update = True
-            
-        if should_update:
-            existing_entry.score = entry.score
-            existing_entry.max_streak = entry.max_streak
-            # existing_entry.difficulty = entry.difficulty # 난이도 개념 약화로 주석 처리 또는 유지
-            existing_entry.timestamp = func.now() # 시간 갱신
-            db.commit()
-            db.refresh(existing_entry)
-            return existing_entry
-        else:
-            # 기존 기록이 더 좋으면 업데이트 하지 않음
-            return existing_entry
-    else:
-        # 새 기록 생성
-        db_entry = models.Guestbook(
-            nickname=entry.nickname,
-            score=entry.score,
-            max_streak=entry.max_streak,
-            difficulty=entry.difficulty
+    leaderboard.ensure_loaded(db)
+
+    # 메모리 랭킹 기준으로 기존 기록이 같거나 더 좋으면 DB를 건드리지 않음
+    current = leaderboard.get(entry.nickname)
+    if current and (current["score"], current["max_streak"]) >= (entry.score, entry.max_streak):
+        return current
+
+    table = models.Guestbook.__table__
+    # 새 닉네임이면 삽입, 이미 있으면 아래의 조건부 UPDATE로 처리
+    inserted = database.insert_ignore(db, table, {
+        "nickname": entry.nickname,
+        "score": entry.score,
+        "max_streak": entry.max_streak,
+        "difficulty": entry.difficulty,
+    }, ["nickname"]).rowcount == 1
+
+    if not inserted:
+        # 새 점수가 더 높거나, 점수가 같고 스트릭이 더 높을 때만 업데이트 (비교와 갱신을 한 문장으로)
+        db.execute(
+            table.update()
+            .where(
+                table.c.nickname == entry.nickname,
+                (table.c.score < entry.score)
+                | ((table.c.score == entry.score) & (table.c.max_streak < entry.max_streak))
+            )
+            # difficulty는 난이도 개념 약화로 갱신하지 않음
+            .values(score=entry.score, max_streak=entry.max_streak, timestamp=func.now())
         )
-        db.add(db_entry)
-        db.commit()
-        db.refresh(db_entry)
-        return db_entry
+    db.commit()
 
-# 랭킹 조회 함수 (전체 통합 랭킹)
+    db_entry = db.query(models.Guestbook).filter(models.Guestbook.nickname == entry.nickname).first()
+    leaderboard.upsert(db_entry)
+    return db_entry
+
+# 랭킹 조회 함수 (전체 통합 랭킹, 메모리 랭킹에서 제공)
 def get_rankings(db: Session, limit: int = 100):
-    return db.query(models.Guestbook)\
-        .order_by(desc(models.Guestbook.score), desc(models.Guestbook.max_streak))\
-        .limit(limit)\
-        .all()
+    leaderboard.ensure_loaded(db)
+    return leaderboard.top(limit)
 
-# 인증 관련 CRUD (Auth CRUD)
-from passlib.context import CryptContext
+def get_ranking_position(db: Session, nickname: str):
+    leaderboard.ensure_loaded(db)
+    found = leaderboard.rank(nickname)
+    if found is None:
+        return None
+    rank, entry = found
+    return dict(entry, rank=rank, total=len(leaderboard))
 
-# Windows에서 바이너리 의존성 문제를 피하기 위해 pbkdf2_sha256 사용
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# 인증 관련 CRUD (Auth CRUD)
+# 비밀번호 해시/검증은 passwords.password_hasher(프로세스 풀)에서 처리하고, 여기서는 해시만 저장
 
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
+def get_authenticated_user(db: Session, username: str):
+    user = get_user_by_username(db, username)
+    if user is not None:
+        # 조회 트랜잭션은 바로 종료 (정답 확인 중 AI 대기 동안 커넥션을 점유하지 않음)
+        end_read_transaction(db, [user], reattach=True)
+    return user
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
     try:
-        hashed_password = pwd_context.hash(user.password)
         db_user = models.User(
             username=user.username, 
             hashed_password=hashed_password,
@@ -334,74 +712,187 @@ def create_user(db: Session, user: schemas.UserCreate):
 def create_guest_user(db: Session):
     # 게스트 사용자 생성 (DB 저장 X, 토큰 발급용 임시 객체)
     # 1회성 휘발유저이므로 DB에 남기지 않음
-    import uuid
     guest_username = f"guest_{uuid.uuid4().hex[:8]}"
     # ID는 -1로 설정하여 DB에 없는 유저임을 표시
     db_user = models.User(id=-1, username=guest_username, is_guest=True)
     return db_user
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    # 해시 정책(라운드 수)이 바뀐 경우 로그인 시 새 해시로 교체
+    users = models.User.__table__
+    db.execute(users.update().where(users.c.id == user_id).values(hashed_password=hashed_password))
+    db.commit()
 
 # 오답 노트 CRUD (Note CRUD)
-def create_note_entry(db: Session, note: schemas.WrongAnswerNoteCreate, user_id: int):
-    # 이미 존재하는 오답노트인지 확인
-    existing_note = db.query(models.WrongAnswerNote).filter(
+def _note_query(db: Session, user_id: int, question_id: str):
+    return db.query(models.WrongAnswerNote).filter(
         models.WrongAnswerNote.user_id == user_id,
-        models.WrongAnswerNote.question_id == note.question_id
-    ).first()
-    
-    if existing_note:
-        # 이미 존재하면 답안만 업데이트
-        existing_note.user_answer = note.user_answer
-        db.commit()
-        db.refresh(existing_note)
-        return existing_note
-
-    # 새 오답노트 생성
-    db_note = models.WrongAnswerNote(
-        user_id=user_id,
-        question_id=note.question_id,
-        user_answer=note.user_answer
+        models.WrongAnswerNote.question_id == question_id
+    )
+
+def create_note_entry(db: Session, note: schemas.WrongAnswerNoteCreate, user_id: int):
+    # (user_id, question_id) 유니크 키 기준 upsert: 이미 존재하면 답안만 업데이트
+    database.upsert(
+        db, models.WrongAnswerNote.__table__,
+        values={"user_id": user_id, "question_id": note.question_id, "user_answer": note.user_answer},
+        conflict_columns=["user_id", "question_id"],
+        update={"user_answer": note.user_answer}
     )
-    db.add(db_note)
     db.commit()
-    db.refresh(db_note)
-    return db_note
+    return _note_query(db, user_id, note.question_id).first()
+
+# 오답노트 목록: 최신순 (created_at DESC, id DESC) 키셋 페이지네이션
+NOTES_PAGE_SIZE = int(os.getenv("NOTES_PAGE_SIZE", "50"))
+NOTES_MAX_PAGE_SIZE = 200
 
-def get_user_notes(db: Session, user_id: int):
-    return db.query(models.WrongAnswerNote).filter(models.WrongAnswerNote.user_id == user_id).all()
+def encode_note_cursor(note: models.WrongAnswerNote) -> str:
+    raw = f"{note.created_at.isoformat(sep=' ')}|{note.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_note_cursor(cursor: str):
+    """
+    잘못된 커서는 ValueError
+    """
+    try:
+        created_at, note_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(note_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def _timestamp_param(db: Session, value: datetime):
+    # SQLite는 server_default(CURRENT_TIMESTAMP)를 'YYYY-MM-DD HH:MM:SS' 문자열로 저장하므로
+    # 같은 형식의 문자열로 비교해야 같은 시각의 행이 정확히 일치함
+    if db.get_bind().dialect.name == "sqlite":
+        return literal(value.isoformat(sep=" "), String)
+    return value
+
+def _user_notes_query(db: Session, user_id: int, cursor=None):
+    note = models.WrongAnswerNote
+    query = db.query(note).join(note.question).options(
+        # 응답 스키마에 필요한 컬럼만, 문제는 같은 쿼리에서 함께 로드 (N+1 방지)
+        load_only(note.id, note.question_id, note.user_answer, note.created_at),
+        contains_eager(note.question).load_only(
+            models.Question.id, models.Question.encoded_text, models.Question.correct_meaning,
+            models.Question.category, models.Question.correct_count, models.Question.total_attempts,
+            models.Question.created_at
+        )
+    ).filter(note.user_id == user_id)
+    if cursor:
+        created_at, note_id = cursor
+        created_at = _timestamp_param(db, created_at)
+        # created_at <= 조건을 앞에 두어 인덱스에서 커서 위치부터 바로 탐색
+        query = query.filter(
+            note.created_at <= created_at,
+            (note.created_at < created_at) | (note.id < note_id)
+        )
+    return query.order_by(note.created_at.desc(), note.id.desc())
+
+def get_user_notes(db: Session, user_id: int, cursor: str = None, limit: int = None):
+    """
+    (notes, next_cursor)를 반환합니다. 마지막 페이지면 next_cursor는 None입니다.
+    """
+    limit = max(1, min(limit or NOTES_PAGE_SIZE, NOTES_MAX_PAGE_SIZE))
+    position = decode_note_cursor(cursor) if cursor else None
+    notes = _user_notes_query(db, user_id, position).limit(limit + 1).all()
+    next_cursor = encode_note_cursor(notes[limit - 1]) if len(notes) > limit else None
+    return notes[:limit], next_cursor
 
 # 일일 진행 상황 CRUD
-def get_daily_progress(db: Session, user_id: int, date: str):
-    progress = db.query(models.DailyProgress).filter(
+def _daily_progress_query(db: Session, user_id: int, date: str):
+    return db.query(models.DailyProgress).filter(
         models.DailyProgress.user_id == user_id,
         models.DailyProgress.date == date
-    ).first()
-    return progress
+    )
+
+def get_daily_progress(db: Session, user_id: int, date: str):
+    return _daily_progress_query(db, user_id, date).first()
 
 def update_daily_progress(db: Session, user_id: int, date: str, domain: str):
-    progress = get_daily_progress(db, user_id, date)
-    
-    is_new = False
-    if not progress:
-        progress = models.DailyProgress(
-            user_id=user_id,
-            date=date,
-            cleared_domains=domain
-        )
-        db.add(progress)
+    """
+    (user_id, date) 유니크 키를 이용해 조회 없이 갱신합니다.
+    1. 행이 없으면 삽입 (INSERT IGNORE / ON CONFLICT DO NOTHING)
+    2. 이미 있으면 해당 분야 비트가 꺼져 있을 때만 켬 (조건부 UPDATE)
+    각 문장의 영향받은 행 수로 새로 클리어했는지(is_new) 판단하므로, 동시 요청에도 보상이 한 번만 지급됩니다.
+    알 수 없는 분야면 ValueError
+    """
+    bit = models.domain_bit(domain)
+    if not bit:
+        raise ValueError(f"Unknown domain: {domain}")
+
+    table = models.DailyProgress.__table__
+    inserted = database.insert_ignore(
+        db, table,
+        values={"user_id": user_id, "date": date, "cleared_mask": bit, "reward_claimed": False},
+        conflict_columns=["user_id", "date"]
+    ).rowcount == 1
+
+    is_new = inserted
+    if not inserted:
+        is_new = db.execute(
+            table.update()
+            .where(
+                table.c.user_id == user_id,
+                table.c.date == date,
+                table.c.cleared_mask.op("&")(bit) == 0
+            )
+            .values(cleared_mask=table.c.cleared_mask.op("|")(bit))
+        ).rowcount == 1
+    db.commit()
+
+    return get_daily_progress(db, user_id, date), is_new
+
+# 테마 CRUD (기본 테마 "default"는 모든 사용자가 보유)
+DEFAULT_THEME = "default"
+
+def _owned_theme_query(db: Session, user_id: int, theme_id: str):
+    return db.query(models.UserTheme.theme_id).filter(
+        models.UserTheme.user_id == user_id,
+        models.UserTheme.theme_id == theme_id
+    )
+
+def get_owned_themes(db: Session, user_id: int):
+    rows = db.query(models.UserTheme.theme_id).filter(models.UserTheme.user_id == user_id)\
+        .order_by(models.UserTheme.acquired_at).all()
+    return [DEFAULT_THEME] + [theme_id for theme_id, in rows]
+
+def owns_theme(db: Session, user_id: int, theme_id: str) -> bool:
+    return theme_id == DEFAULT_THEME or _owned_theme_query(db, user_id, theme_id).first() is not None
+
+def add_credits(db: Session, user_id: int, amount: int):
+    # 캐시된(오래된) User 객체 값으로 덮어쓰지 않도록 DB에서 증가
+    users = models.User.__table__
+    db.execute(users.update().where(users.c.id == user_id).values(credits=users.c.credits + amount))
+    db.commit()
+
+def purchase_theme(db: Session, user_id: int, theme_id: str, price: int):
+    """
+    크레딧 차감과 테마 추가를 한 트랜잭션으로 처리합니다.
+    반환: "ok" | "already_owned" | "not_enough_credits"
+    """
+    if theme_id == DEFAULT_THEME:
+        return "already_owned"
+    try:
+        added = database.insert_ignore(
+            db, models.UserTheme.__table__,
+            values={"user_id": user_id, "theme_id": theme_id},
+            conflict_columns=["user_id", "theme_id"]
+        ).rowcount == 1
+        if not added:
+            db.rollback()
+            return "already_owned"
+
+        users = models.User.__table__
+        charged = db.execute(
+            users.update()
+            .where(users.c.id == user_id, users.c.credits >= price)
+            .values(credits=users.c.credits - price)
+        ).rowcount == 1
+        if not charged:
+            db.rollback()
+            return "not_enough_credits"
         db.commit()
-        db.refresh(progress)
-        is_new = True
-    else:
-        domains = progress.cleared_domains.split(",") if progress.cleared_domains else []
-        if domain not in domains:
-            domains.append(domain)
-            progress.cleared_domains = ",".join(domains)
-            db.commit()
-            db.refresh(progress)
-            is_new = True
-            
-    return progress, is_new
+        return "ok"
+    except Exception:
+        db.rollback()
+        raise
 
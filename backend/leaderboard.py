@@ -0,0 +1,116 @@
+import bisect
+import logging
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy.orm import Session
+
+import models
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def _entry_from_row(row: models.Guestbook) -> dict:
+    return {
+        "id": row.id,
+        "nickname": row.nickname,
+        "score": row.score or 0,
+        "max_streak": row.max_streak or 0,
+        "difficulty": row.difficulty,
+        "timestamp": row.timestamp,
+    }
+
+
+def _sort_key(entry: dict):
+    # score DESC, max_streak DESC, 동점이면 닉네임 순
+    return (-entry["score"], -entry["max_streak"], entry["nickname"])
+
+
+class Leaderboard:
+    """
+    guestbook 테이블의 랭킹을 메모리에 정렬된 상태로 유지합니다.
+    - 시작 시 DB에서 한 번 구성하고, 방명록 저장 시 해당 닉네임만 갱신
+    - 상위 N명은 O(N), 닉네임의 순위는 이분 탐색으로 O(log n)
+    - 변경될 때마다 version이 증가하며, etag로 응답 캐시 검증에 사용
+    refresh_interval(초)을 지정하면 그 주기로 DB에서 다시 구성합니다. (여러 워커로 실행할 때)
+    """
+    def __init__(self, refresh_interval: float = 0.0):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._keys = []
+        self._entries = {}
+        self._generation = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.loaded_at = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    @property
+    def etag(self) -> str:
+        return f'"rankings-{self._generation}-{self.version}"'
+
+    def load(self, db: Session):
+        rows = db.query(models.Guestbook).all()
+        entries = {row.nickname: _entry_from_row(row) for row in rows}
+        keys = sorted(_sort_key(entry) for entry in entries.values())
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self.version += 1
+            self.loaded_at = time.monotonic()
+        logger.info(f"Leaderboard loaded ({len(entries)} entries)")
+
+    def ensure_loaded(self, db: Session):
+        stale = self.refresh_interval and self.loaded and time.monotonic() - self.loaded_at > self.refresh_interval
+        if not self.loaded or stale:
+            self.load(db)
+
+    def get(self, nickname: str):
+        return self._entries.get(nickname)
+
+    def upsert(self, row: models.Guestbook):
+        entry = _entry_from_row(row)
+        with self._lock:
+            old = self._entries.get(entry["nickname"])
+            if old is not None:
+                if _sort_key(old) == _sort_key(entry) and old == entry:
+                    return
+                index = bisect.bisect_left(self._keys, _sort_key(old))
+                del self._keys[index]
+            bisect.insort(self._keys, _sort_key(entry))
+            self._entries[entry["nickname"]] = entry
+            self.version += 1
+
+    def top(self, limit: int = 100):
+        with self._lock:
+            return [self._entries[key[2]] for key in self._keys[:limit]]
+
+    def rank(self, nickname: str):
+        """
+        (순위, 항목)을 반환합니다. 없으면 None. 순위는 1부터 시작합니다.
+        """
+        with self._lock:
+            entry = self._entries.get(nickname)
+            if entry is None:
+                return None
+            return bisect.bisect_left(self._keys, _sort_key(entry)) + 1, entry
+
+    def __len__(self):
+        return len(self._keys)
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "entries": len(self._keys),
+            "version": self.version,
+        }
+
+
+# 싱글톤 인스턴스 생성 (main.py의 lifespan에서 DB로부터 구성)
+leaderboard = Leaderboard(refresh_interval=float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "0")))
@@ -1,27 +1,103 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Depends, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-import models, schemas, crud, database
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
+import models, schemas, crud, database, migrations
+from replenisher import question_replenisher, REPLENISHER_ENABLED
+from verdict_cache import verdict_cache
+from prescore import prescorer
+from singleflight import daily_generation_flight
+from ai import similarity_batcher, ai_breaker, async_ai_client, AI_WARMUP
+from quality_gate import question_gate
+from attempt_log import attempt_writer, ATTEMPT_WRITE_BEHIND
+from leaderboard import leaderboard
+from compaction import attempt_compactor, COMPACTION_ENABLED
+from user_cache import user_cache
+from passwords import password_hasher, PasswordHasherBusy
+from response_cache import response_cache
+from startup import startup_metrics, FirstRequestTimer, elapsed_ms
+from pydantic import TypeAdapter
+import asyncio
+import json
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import traceback
+
+# 스키마 확인: import 시점이 아니라 lifespan에서 버전만 조회
+# (테이블 생성/마이그레이션은 python migrations.py, 또는 DB_AUTO_MIGRATE=true일 때만 여기서 적용)
+def _check_schema():
+    version = migrations.applied_version(database.engine)
+    if version >= migrations.LATEST_VERSION:
+        return
+    if not database.DB_AUTO_MIGRATE:
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected {migrations.LATEST_VERSION}. "
+            "Run `python migrations.py` before starting the server."
+        )
+    migrations.init_schema(database.engine)
 
-# 데이터베이스 테이블 생성
-models.Base.metadata.create_all(bind=database.engine)
+def _load_leaderboard():
+    db = database.SessionLocal()
+    try:
+        leaderboard.load(db)
+    finally:
+        db.close()
 
-app = FastAPI()
+async def _warm_up_ai():
+    # AI 클라이언트 생성(openai import 포함)은 스레드에서, AI_WARMUP=true면 모델도 미리 올림
+    started = time.perf_counter()
+    try:
+        await run_in_threadpool(async_ai_client.prepare)
+        if AI_WARMUP:
+            await async_ai_client.warm_up()
+        startup_metrics.warmup_ms = elapsed_ms(started)
+    except Exception as e:
+        startup_metrics.warmup_error = str(e)
+        print(f"AI warm-up failed: {e}")
+
+# 앱 수명 주기: 스키마 확인, 메모리 랭킹 구성, 문제 재고 보충 작업, 시도 기록 write-behind 큐와 압축 작업 시작/종료
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await run_in_threadpool(_check_schema)
+    startup_metrics.schema_check_ms = elapsed_ms(started)
+    await run_in_threadpool(_load_leaderboard)
+    if ATTEMPT_WRITE_BEHIND:
+        await attempt_writer.start()
+    if REPLENISHER_ENABLED:
+        await question_replenisher.start()
+    if COMPACTION_ENABLED:
+        await attempt_compactor.start()
+    # AI 클라이언트 준비/모델 warm-up은 시작을 막지 않도록 백그라운드로 실행
+    warmup = asyncio.create_task(_warm_up_ai())
+    startup_metrics.startup_ms = elapsed_ms(started)
+    yield
+    warmup.cancel()
+    # 묶음 판별 중인 요청을 마저 처리 (결과가 시도 기록으로 남도록 attempt_writer보다 먼저)
+    await similarity_batcher.shutdown()
+    await attempt_compactor.stop()
+    await question_replenisher.stop()
+    # 남은 시도 기록을 모두 기록한 뒤 종료
+    await attempt_writer.stop()
+    await run_in_threadpool(password_hasher.shutdown)
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    import traceback
     error_msg = f"Global Error: {str(exc)}\n{traceback.format_exc()}"
     print(error_msg)
     return JSONResponse(
@@ -29,6 +105,15 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": error_msg},
     )
 
+# 비밀번호 해시 대기열이 가득 찬 경우 (로그인 폭주) 잠시 후 재시도하도록 안내
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many login attempts, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 # JWT 설정
 # 실제 배포 시에는 SECRET_KEY를 환경 변수로 관리해야 합니다.
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-keep-it-secret") 
@@ -47,15 +132,15 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# 시작 후 첫 요청 처리 시간 기록 (/api/metrics의 startup)
+app.add_middleware(FirstRequestTimer, metrics=startup_metrics)
 
 # 데이터베이스 세션 의존성 주입
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+get_db = database.get_db
+# 코루틴 엔드포인트용 세션: DB_ASYNC=true면 AsyncSession (crud의 async 함수는 두 세션을 모두 지원)
+get_request_db = database.get_async_db if database.DB_ASYNC else database.get_db
 
 # 인증 유틸리티 함수 (Auth Utils)
 # JWT 액세스 토큰 생성
@@ -69,13 +154,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# 현재 로그인한 사용자 가져오기 (토큰 검증)
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+# 토큰에서 사용자 이름 추출 (유효하지 않으면 401, 검증된 토큰은 만료 전까지 캐시)
+def _token_username(token: str) -> str:
+    username = user_cache.get_username(token)
+    if username is not None:
+        return username
+
+    credentials_exception = _credentials_exception()
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -83,51 +175,86 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    user_cache.set_username(token, username, payload.get("exp"))
+    return username
+
+def _guest_user(username: str):
+    # 임시 유저 객체 생성 (id=-1)
+    return models.User(
+        id=-1, 
+        username=username, 
+        is_guest=True, 
+        created_at=datetime.utcnow(),
+        credits=0,
+        equipped_theme="default",
+        total_solved=0
+    )
+
+# 현재 로그인한 사용자 가져오기 (토큰 검증)
+# DB 조회가 있으므로 동기 함수로 두어 스레드풀에서 실행 (이벤트 루프에서 커넥션 대기로 멈추지 않도록)
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    username = _token_username(token)
     
     # 게스트 유저 처리 (DB 조회 안 함)
     if username.startswith("guest_"):
-        # 임시 유저 객체 생성 (id=-1)
-        return models.User(
-            id=-1, 
-            username=username, 
-            is_guest=True, 
-            created_at=datetime.utcnow(),
-            credits=0,
-            owned_themes="default",
-            equipped_theme="default",
-            total_solved=0
-        )
+        return _guest_user(username)
 
-    user = crud.get_user_by_username(db, username=username)
+    user = user_cache.get_user(db, username)
     if user is None:
-        raise credentials_exception
+        user = crud.get_authenticated_user(db, username)
+        if user is None:
+            raise _credentials_exception()
+        user_cache.set_user(user)
+    return user
+
+# 코루틴 엔드포인트용 (엔드포인트와 같은 get_request_db 세션 사용)
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db = Depends(get_request_db)):
+    username = _token_username(token)
+    if username.startswith("guest_"):
+        return _guest_user(username)
+
+    # 캐시 적중 시 merge(load=False)는 DB에 접근하지 않으므로 이벤트 루프에서 바로 처리
+    user = user_cache.get_user(db.sync_session if isinstance(db, AsyncSession) else db, username)
+    if user is None:
+        user = await crud.run_db(db, crud.get_authenticated_user, username)
+        if user is None:
+            raise _credentials_exception()
+        user_cache.set_user(user)
     return user
 
 # 인증 엔드포인트 (Auth Endpoints)
 # 회원가입
+# 비밀번호 해시는 프로세스 풀에서 처리하므로 코루틴으로 대기
 @app.post("/api/auth/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_username(db, username=user.username)
+async def register(user: schemas.UserCreate, db = Depends(get_request_db)):
+    db_user = await crud.run_db(db, crud.get_authenticated_user, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
+    hashed_password = await password_hasher.hash(user.password)
     try:
-        return crud.create_user(db=db, user=user)
+        return await crud.run_db(db, crud.create_user, user, hashed_password)
     except Exception as e:
         print(f"Registration error: {e}")
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 # 로그인 (토큰 발급)
 @app.post("/api/auth/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_username(db, username=form_data.username)
-    if not user or not crud.verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(get_request_db)):
+    # 조회 트랜잭션은 해시 검증 전에 종료
+    user = await crud.run_db(db, crud.get_authenticated_user, form_data.username)
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash is not None:
+        await crud.run_db(db, crud.update_password_hash, user.id, new_hash)
+        user_cache.invalidate(user.id)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -147,42 +274,87 @@ def guest_login(db: Session = Depends(get_db)):
 # 내 정보 조회
 @app.get("/api/users/me", response_model=schemas.UserResponse)
 def read_users_me(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # Calculate daily progress count
+    # Calculate daily progress count (클리어한 분야 비트 수)
     if current_user.id != -1:
         date = (datetime.utcnow() + timedelta(hours=9)).strftime("%Y-%m-%d")
         progress = crud.get_daily_progress(db, current_user.id, date)
-        if progress and progress.cleared_domains:
-            # Count non-empty domains
-            domains = [d for d in progress.cleared_domains.split(",") if d]
-            current_user.daily_progress_count = len(domains)
-        else:
-            current_user.daily_progress_count = 0
+        current_user.daily_progress_count = progress.cleared_count if progress else 0
+        current_user.owned_themes = ",".join(crud.get_owned_themes(db, current_user.id))
     else:
         current_user.daily_progress_count = 0
+        current_user.owned_themes = crud.DEFAULT_THEME
             
     return current_user
 
 # 문제 조회 엔드포인트
+# AI 생성을 기다리는 동안 스레드풀 워커를 점유하지 않도록 코루틴으로 처리
+# 재고 보충 작업이 실행 중이면 재고를 유지하는 분야는 DB 조회만 하고, 부족분은 백그라운드에서 채움
+# 그 외(category 없음, random 등)는 같은 세션이 문제를 모두 본 경우에도 응답이 계속 모자라지 않도록
+# 부족분 중 QUESTION_INLINE_GENERATION_MAX개까지만 즉시 생성
+# 문제 목록은 orjson으로 한 번에 직렬화한 응답을 그대로 반환 (response_model은 API 문서용)
+def _questions_response(questions) -> Response:
+    return Response(content=crud.questions_response_json(questions), media_type="application/json")
+
+QUESTION_INLINE_GENERATION_MAX = int(os.getenv("QUESTION_INLINE_GENERATION_MAX", "5"))
+
 @app.get("/api/questions", response_model=schemas.QuestionsResponse)
-def read_questions(category: Optional[str] = None, difficulty: int = 1, limit: int = 10, allow_generation: bool = True, db: Session = Depends(get_db)):
+async def read_questions(category: Optional[str] = None, difficulty: int = 1, limit: int = 10, allow_generation: bool = True, session_id: Optional[str] = None, db = Depends(get_request_db)):
     try:
         # print(f"DEBUG: read_questions called with category {category}") 
-        questions = crud.get_questions(db, category, limit, allow_generation=allow_generation)
-        return {"questions": questions}
+        # session_id가 있으면 같은 세션에서 이미 출제한 문제는 제외
+        inline_generation = allow_generation and not question_replenisher.stocks(category)
+        max_generated = QUESTION_INLINE_GENERATION_MAX if question_replenisher.running else None
+        questions = await crud.get_questions(
+            db, category, limit, allow_generation=inline_generation, session_id=session_id, max_generated=max_generated
+        )
+        if len(questions) < limit and question_replenisher.running:
+            question_replenisher.notify(category)
+        return _questions_response(questions)
     except Exception as e:
         print(f"ERROR in read_questions: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# 공유 조회 응답의 Cache-Control (max-age=0이면 매번 ETag로 재검증)
+DAILY_CACHE_MAX_AGE = int(os.getenv("DAILY_CACHE_MAX_AGE", "60"))
+RANKINGS_CACHE_MAX_AGE = int(os.getenv("RANKINGS_CACHE_MAX_AGE", "0"))
+
+def _cache_control(max_age: int) -> str:
+    return f"public, max-age={max_age}" if max_age > 0 else "public, no-cache"
+
+def _daily_cache_control() -> str:
+    # KST 자정을 넘겨 캐시되지 않도록
+    now_kst = datetime.utcnow() + timedelta(hours=9)
+    midnight_kst = datetime.combine(now_kst.date() + timedelta(days=1), datetime.min.time())
+    return _cache_control(min(DAILY_CACHE_MAX_AGE, int((midnight_kst - now_kst).total_seconds())))
+
 # 일일 문제 조회 엔드포인트
+# 분야 없는 조회는 모든 사용자가 같은 응답을 받으므로 직렬화된 바이트를 캐시 (새 문제 저장 시 무효화)
 @app.get("/api/questions/daily", response_model=schemas.QuestionsResponse)
-def read_daily_questions(category: str = None, db: Session = Depends(get_db)):
+async def read_daily_questions(request: Request, category: str = None, db = Depends(get_request_db)):
     try:
-        questions = crud.get_daily_questions(db, category=category)
-        return {"questions": questions}
+        if category:
+            questions = await crud.get_daily_questions(db, category=category)
+            return _questions_response(questions)
+
+        version = crud.daily_response_version()
+        entry = response_cache.get(crud.DAILY_RESPONSE_KEY, version)
+        if entry is None:
+            questions = await crud.get_daily_questions(db)
+            body = crud.questions_response_json(questions)
+            entry = response_cache.set(crud.DAILY_RESPONSE_KEY, version, body)
+        return response_cache.respond(request, entry, _daily_cache_control())
     except Exception as e:
         print(f"ERROR in read_daily_questions: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# 문제 통계 조회 (일별 시도/정답 수, 점수 히스토그램)
+@app.get("/api/questions/{question_id}/stats", response_model=schemas.QuestionStatsResponse)
+def read_question_stats(question_id: str, db: Session = Depends(get_db)):
+    stats = crud.get_question_stats(db, question_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return stats
+
 # 일일 진행 상황 조회
 @app.get("/api/daily-progress", response_model=schemas.DailyProgressResponse)
 def get_daily_progress(date: str, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -202,12 +374,15 @@ def update_daily_progress(update: schemas.DailyProgressUpdate, current_user: mod
         # 게스트는 서버 저장 안 함
         return {"date": update.date, "cleared_domains": update.domain, "id": -1, "user_id": -1}
         
-    progress, is_new = crud.update_daily_progress(db, current_user.id, update.date, update.domain)
+    try:
+        progress, is_new = crud.update_daily_progress(db, current_user.id, update.date, update.domain)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     credits_awarded = 0
     if is_new:
-        current_user.credits += 10
-        db.commit()
+        crud.add_credits(db, current_user.id, 10)
+        user_cache.invalidate(current_user.id)
         credits_awarded = 10
         
     # Pydantic 모델 반환을 위해 dict로 변환하거나 ORM 객체에 속성 추가
@@ -223,19 +398,66 @@ def update_daily_progress(update: schemas.DailyProgressUpdate, current_user: mod
 
 
 # 정답 확인 엔드포인트
+# LLM 판별 대기는 코루틴으로만 비용이 들고, 스레드풀은 다른 API(/api/rankings 등)가 사용
 @app.post("/api/verify", response_model=schemas.VerifyAnswerResponse)
-def verify_answer(request: schemas.VerifyAnswerRequest, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def verify_answer(request: schemas.VerifyAnswerRequest, current_user: models.User = Depends(get_current_user_async), db = Depends(get_request_db)):
     # 참고: 인증된 사용자의 경우 시도 기록을 사용자와 연결할 수 있습니다.
     # user_id 전달하여 통계 업데이트
-    result = crud.verify_answer(db, request.questionId, request.userAnswer, current_user.id)
+    result = await crud.verify_answer(db, request.questionId, request.userAnswer, current_user.id)
     if not result:
         raise HTTPException(status_code=404, detail="Question not found")
     return result
 
+# 정답 확인 스트리밍 엔드포인트 (Server-Sent Events)
+# 점수가 생성되는 즉시 score 이벤트, 피드백은 feedback 이벤트로 조금씩, 마지막에 result 이벤트 전송
+# score는 잠정값: result의 revised가 true면 (스트림 실패 후 간이 채점 등) result 값으로 덮어써야 함
+@app.post("/api/verify/stream")
+async def verify_answer_stream(request: schemas.VerifyAnswerRequest, current_user: models.User = Depends(get_current_user_async), db = Depends(get_request_db)):
+    events = await crud.verify_answer_stream(db, request.questionId, request.userAnswer, current_user.id)
+    if events is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+
+    async def event_stream():
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 여러 답안 일괄 확인 엔드포인트 (도전 모드 등)
+VERIFY_BATCH_MAX_ITEMS = int(os.getenv("VERIFY_BATCH_MAX_ITEMS", "50"))
+
+@app.post("/api/verify/batch", response_model=List[schemas.VerifyBatchItemResponse])
+async def verify_answers_batch(requests: List[schemas.VerifyAnswerRequest], current_user: models.User = Depends(get_current_user_async), db = Depends(get_request_db)):
+    if len(requests) > VERIFY_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many answers (max {VERIFY_BATCH_MAX_ITEMS})")
+    return await crud.verify_answers_batch(db, requests, current_user.id)
+
 # 랭킹 조회 엔드포인트
+# 랭킹이 바뀌지 않았으면 ETag로 304 응답
+_rankings_adapter = TypeAdapter(List[schemas.RankingEntry])
+
+# 랭킹은 방명록 점수가 갱신될 때만 바뀌므로 랭킹 버전(leaderboard.etag)이 같으면 캐시된 바이트를 사용
 @app.get("/api/rankings", response_model=List[schemas.RankingEntry])
-def read_rankings(db: Session = Depends(get_db)):
-    return crud.get_rankings(db)
+def read_rankings(request: Request, db: Session = Depends(get_db)):
+    leaderboard.ensure_loaded(db)
+    etag = leaderboard.etag
+    entry = response_cache.get("rankings", etag)
+    if entry is None:
+        rankings = _rankings_adapter.validate_python(crud.get_rankings(db))
+        entry = response_cache.set("rankings", etag, _rankings_adapter.dump_json(rankings), etag=etag)
+    return response_cache.respond(request, entry, _cache_control(RANKINGS_CACHE_MAX_AGE))
+
+# 닉네임의 현재 순위 조회
+@app.get("/api/rankings/{nickname}", response_model=schemas.RankingPosition)
+def read_ranking_position(nickname: str, db: Session = Depends(get_db)):
+    position = crud.get_ranking_position(db, nickname)
+    if position is None:
+        raise HTTPException(status_code=404, detail="Ranking not found")
+    return position
 
 # 방명록(랭킹) 저장 엔드포인트
 @app.post("/api/guestbook")
@@ -266,12 +488,19 @@ def create_note(note: schemas.WrongAnswerNoteCreate, current_user: models.User =
     return crud.create_note_entry(db, note, current_user.id)
 
 # 내 오답 노트 조회 엔드포인트 (인증 필요)
+# 최신순으로 limit개씩 반환하며, 다음 페이지가 있으면 X-Next-Cursor 헤더에 커서를 담아 보냄
 @app.get("/api/notes", response_model=List[schemas.WrongAnswerNoteResponse])
-def read_notes(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def read_notes(response: Response, cursor: Optional[str] = None, limit: Optional[int] = None, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     # 게스트는 오답노트 없음
     if current_user.id == -1:
         return []
-    return crud.get_user_notes(db, current_user.id)
+    try:
+        notes, next_cursor = crud.get_user_notes(db, current_user.id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return notes
 
 
 
@@ -288,18 +517,15 @@ def buy_theme(request: schemas.ShopPurchaseRequest, current_user: models.User =
     if current_user.credits < THEME_PRICE:
         raise HTTPException(status_code=400, detail="Not enough credits")
         
-    # Check if already owned
-    owned_list = current_user.owned_themes.split(",") if current_user.owned_themes else []
-    if theme_id in owned_list:
+    # Deduct credits and add theme (보유 여부 확인과 차감을 한 트랜잭션에서 조건부로 처리)
+    result = crud.purchase_theme(db, current_user.id, theme_id, THEME_PRICE)
+    if result == "already_owned":
         raise HTTPException(status_code=400, detail="Theme already owned")
-        
-    # Deduct credits and add theme
-    current_user.credits -= THEME_PRICE
-    owned_list.append(theme_id)
-    current_user.owned_themes = ",".join(owned_list)
-    db.commit()
+    if result == "not_enough_credits":
+        raise HTTPException(status_code=400, detail="Not enough credits")
+    user_cache.invalidate(current_user.id)
     
-    return {"message": f"Purchased {theme_id}", "credits": current_user.credits, "owned_themes": current_user.owned_themes}
+    return {"message": f"Purchased {theme_id}", "credits": current_user.credits, "owned_themes": ",".join(crud.get_owned_themes(db, current_user.id))}
 
 # 12-12 추가: 테마 장착
 @app.post("/api/user/equip")
@@ -308,13 +534,12 @@ def equip_theme(request: schemas.ThemeEquipRequest, current_user: models.User =
          raise HTTPException(status_code=400, detail="Guest cannot equip themes")
          
     theme_id = request.theme_id
-    owned_list = current_user.owned_themes.split(",") if current_user.owned_themes else []
-    
-    if theme_id not in owned_list and theme_id != 'default':
+    if not crud.owns_theme(db, current_user.id, theme_id):
         raise HTTPException(status_code=400, detail="Theme not owned")
         
     current_user.equipped_theme = theme_id
     db.commit()
+    user_cache.invalidate(current_user.id)
     
     return {"message": f"Equipped {theme_id}", "equipped_theme": current_user.equipped_theme}
 
@@ -334,3 +559,26 @@ from fastapi.responses import FileResponse
 @app.get("/")
 def read_root():
     return {"message": "Context Hunter Backend is running!"}
+
+# 운영 지표 조회 (문제 재고, 판정 캐시, 로컬 사전 판정 등)
+@app.get("/api/metrics")
+def read_metrics():
+    return {
+        "replenisher": question_replenisher.stats(),
+        "verdict_cache": verdict_cache.stats(),
+        "prescore": prescorer.stats(),
+        "daily_generation": daily_generation_flight.stats(),
+        "similarity_batcher": similarity_batcher.stats(),
+        "ai_breaker": ai_breaker.stats(),
+        "question_gate": question_gate.stats(),
+        "attempt_writer": attempt_writer.stats(),
+        "leaderboard": leaderboard.stats(),
+        "db_pool": database.pool_stats(),
+        "attempt_compactor": attempt_compactor.stats(),
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "response_cache": response_cache.stats(),
+        "startup": startup_metrics.stats(),
+    }
+
+startup_metrics.import_ms = elapsed_ms(_import_started)
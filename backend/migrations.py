@@ -0,0 +1,283 @@
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 적용된 마이그레이션 버전 기록 (create_all은 기존 테이블에 컬럼/인덱스를 추가하지 않으므로 별도 관리)
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+    mysql_charset="utf8mb4",
+)
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def _create_indexes(conn: Connection, table, names):
+    for index in table.indexes:
+        if index.name in names:
+            index.create(conn, checkfirst=True)
+
+
+def _random_expression(conn: Connection) -> str:
+    # 0.0 ~ 1.0 난수 (SQLite의 random()은 64비트 정수)
+    if conn.dialect.name == "sqlite":
+        return "(random() / 18446744073709551616.0 + 0.5)"
+    return "RAND()"
+
+
+def _m001_question_random_key(conn: Connection):
+    if not _has_column(conn, "questions", "random_key"):
+        conn.execute(text("ALTER TABLE questions ADD COLUMN random_key DOUBLE"))
+    conn.execute(text(f"UPDATE questions SET random_key = {_random_expression(conn)} WHERE random_key IS NULL"))
+    _create_indexes(conn, models.Question.__table__, {"ix_questions_category_random_key", "ix_questions_random_key"})
+
+
+def _m002_hot_lookup_indexes(conn: Connection):
+    # 유니크 인덱스를 만들기 전에 중복 행 정리
+    # daily_progress: 클리어한 분야를 합치고 가장 먼저 생긴 행만 남김
+    duplicates = conn.execute(text(
+        "SELECT user_id, date FROM daily_progress WHERE user_id IS NOT NULL "
+        "GROUP BY user_id, date HAVING COUNT(*) > 1"
+    )).fetchall()
+    for user_id, date in duplicates:
+        rows = conn.execute(text(
+            "SELECT id, cleared_domains, reward_claimed FROM daily_progress "
+            "WHERE user_id = :user_id AND date = :date ORDER BY id"
+        ), {"user_id": user_id, "date": date}).fetchall()
+        domains = []
+        for row in rows:
+            domains += [d for d in (row.cleared_domains or "").split(",") if d and d not in domains]
+        conn.execute(text(
+            "UPDATE daily_progress SET cleared_domains = :domains, reward_claimed = :claimed WHERE id = :id"
+        ), {"domains": ",".join(domains), "claimed": any(row.reward_claimed for row in rows), "id": rows[0].id})
+        conn.execute(text("DELETE FROM daily_progress WHERE user_id = :user_id AND date = :date AND id <> :id"),
+                     {"user_id": user_id, "date": date, "id": rows[0].id})
+
+    # wrong_answer_notes: 문제별 최신 오답노트만 남김
+    conn.execute(text(
+        "DELETE FROM wrong_answer_notes WHERE user_id IS NOT NULL AND id NOT IN ("
+        "SELECT id FROM (SELECT MAX(id) AS id FROM wrong_answer_notes GROUP BY user_id, question_id) AS keep)"
+    ))
+
+    _create_indexes(conn, models.Question.__table__, {"ix_questions_category_created_at"})
+    _create_indexes(conn, models.Attempt.__table__, {"ix_attempts_question_id"})
+    _create_indexes(conn, models.Guestbook.__table__, {"ix_guestbook_score_streak"})
+    _create_indexes(conn, models.DailyProgress.__table__, {"uq_daily_progress_user_date"})
+    _create_indexes(conn, models.WrongAnswerNote.__table__, {"uq_wrong_answer_notes_user_question"})
+
+
+def _m003_notes_keyset_index(conn: Connection):
+    _create_indexes(conn, models.WrongAnswerNote.__table__, {"ix_wrong_answer_notes_user_created"})
+
+
+def _m004_compact_domains_and_themes(conn: Connection):
+    # daily_progress.cleared_domains("Politics,Economy") -> cleared_mask 비트
+    if not _has_column(conn, "daily_progress", "cleared_mask"):
+        conn.execute(text("ALTER TABLE daily_progress ADD COLUMN cleared_mask INTEGER NOT NULL DEFAULT 0"))
+    if _has_column(conn, "daily_progress", "cleared_domains"):
+        rows = conn.execute(text(
+            "SELECT id, cleared_domains FROM daily_progress WHERE cleared_domains IS NOT NULL AND cleared_domains <> ''"
+        )).fetchall()
+        updates = []
+        for row in rows:
+            mask = 0
+            for domain in row.cleared_domains.split(","):
+                mask |= models.domain_bit(domain)
+            updates.append({"id": row.id, "mask": mask})
+        if updates:
+            conn.execute(text("UPDATE daily_progress SET cleared_mask = :mask WHERE id = :id"), updates)
+
+    # users.owned_themes("default,dark") -> user_themes 행 (기본 테마는 저장하지 않음)
+    models.UserTheme.__table__.create(conn, checkfirst=True)
+    if _has_column(conn, "users", "owned_themes"):
+        rows = conn.execute(text(
+            "SELECT id, owned_themes FROM users WHERE owned_themes IS NOT NULL AND owned_themes <> ''"
+        )).fetchall()
+        owned = []
+        for row in rows:
+            themes = {t.strip() for t in row.owned_themes.split(",")} - {"", "default"}
+            owned += [{"user_id": row.id, "theme_id": theme} for theme in sorted(themes)]
+        if owned:
+            conn.execute(models.UserTheme.__table__.insert(), owned)
+
+
+def _m005_attempt_rollups(conn: Connection):
+    models.QuestionDailyStat.__table__.create(conn, checkfirst=True)
+    models.AttemptArchive.__table__.create(conn, checkfirst=True)
+    _create_indexes(conn, models.Attempt.__table__, {"ix_attempts_timestamp"})
+
+
+def _m006_attempt_verdict_source(conn: Connection):
+    # 이전 기록은 판정 주체를 알 수 없으므로 NULL (임계값 조정에서 제외)
+    for table in ("attempts", "attempts_archive"):
+        if not _has_column(conn, table, "verdict_source"):
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN verdict_source VARCHAR(10)"))
+
+
+# (버전, 설명, 함수) - 순서대로 한 번씩만 적용됨
+MIGRATIONS = [
+    (1, "questions.random_key for indexed random sampling", _m001_question_random_key),
+    (2, "composite/unique indexes for hot lookups", _m002_hot_lookup_indexes),
+    (3, "wrong_answer_notes (user_id, created_at, id) for keyset pagination", _m003_notes_keyset_index),
+    (4, "daily_progress.cleared_mask bitmask and user_themes table", _m004_compact_domains_and_themes),
+    (5, "question_daily_stats rollup, attempts_archive and attempts.timestamp index", _m005_attempt_rollups),
+    (6, "attempts.verdict_source (llm/local/degraded)", _m006_attempt_verdict_source),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc()).limit(1)).scalar() or 0
+
+
+def applied_version(engine: Engine) -> int:
+    """
+    적용된 스키마 버전 (schema_version 테이블이 없으면 0). 서버 시작 시 검사용 (조회 한 번)
+    """
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_version.name):
+            return 0
+        return current_version(conn)
+
+
+def init_schema(engine: Engine):
+    # 테이블 생성 후 마이그레이션 적용 (python migrations.py 또는 DB_AUTO_MIGRATE=true인 서버 시작 시)
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+
+def run_migrations(engine: Engine):
+    """
+    아직 적용되지 않은 마이그레이션을 버전 순서대로 적용합니다. (각 버전은 하나의 트랜잭션)
+    여러 워커가 동시에 시작해도 버전 행의 기본키 충돌로 같은 버전은 한 번만 기록됩니다.
+    """
+    schema_version.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        version = current_version(conn)
+
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        try:
+            with engine.begin() as conn:
+                if current_version(conn) >= number:
+                    continue
+                logger.info(f"Applying migration {number}: {description}")
+                migrate(conn)
+                conn.execute(schema_version.insert().values(
+                    version=number, description=description, applied_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            logger.info(f"Migration {number} was applied by another worker")
+
+
+def _hot_queries(db: Session):
+    """
+    API가 사용하는 주요 조회 쿼리 (crud의 쿼리 생성 함수를 그대로 사용)
+    """
+    import crud
+    now = datetime.utcnow()
+    return {
+        "GET /api/questions (random)": crud._random_ids_query(db, None, 0.5, 10),
+        "GET /api/questions (category)": crud._random_ids_query(db, "Politics", 0.5, 10),
+        "GET /api/questions (category, wrap)": crud._random_ids_query(db, "Politics", 0.5, 10, wrap=True),
+        "GET /api/questions/daily (category)": crud._daily_questions_query(db, "Politics"),
+        "GET /api/questions/daily (all)": crud._daily_questions_query(db, None),
+        "POST /api/verify (question)": crud._get_question_query(db, "q"),
+        "POST /api/verify (verdict cache)": db.query(models.VerdictCacheEntry).filter(
+            models.VerdictCacheEntry.question_id == "q",
+            models.VerdictCacheEntry.answer_hash == "h",
+            models.VerdictCacheEntry.created_at >= now - timedelta(days=30)
+        ),
+        "attempts by question": db.query(models.Attempt).filter(models.Attempt.question_id == "q"),
+        "GET /api/questions/{id}/stats (rollup)": db.query(models.QuestionDailyStat).filter(
+            models.QuestionDailyStat.question_id == "q"
+        ),
+        "attempt compaction": db.query(models.Attempt.id).filter(models.Attempt.timestamp < now)
+            .order_by(models.Attempt.timestamp, models.Attempt.id).limit(5000),
+        "GET /api/daily-progress": crud._daily_progress_query(db, 1, "2025-01-01"),
+        "GET /api/notes": crud._user_notes_query(db, 1).limit(51),
+        "GET /api/notes (cursor)": crud._user_notes_query(db, 1, (now, 100)).limit(51),
+        "POST /api/notes": crud._note_query(db, 1, "q"),
+        "GET /api/rankings": db.query(models.Guestbook).order_by(
+            models.Guestbook.score.desc(), models.Guestbook.max_streak.desc()
+        ).limit(100),
+        "POST /api/guestbook": db.query(models.Guestbook).filter(models.Guestbook.nickname == "n"),
+        "POST /api/auth/token": db.query(models.User).filter(models.User.username == "u"),
+        "POST /api/shop/buy (owned)": crud._owned_theme_query(db, 1, "dark"),
+    }
+
+
+def _explain(conn: Connection, query):
+    compiled = query.statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.exec_driver_sql(f"EXPLAIN {compiled}", params).mappings().fetchall()
+    return [dict(row) for row in rows]
+
+
+def _uses_index(conn: Connection, plan) -> bool:
+    if conn.dialect.name == "sqlite":
+        # "SCAN questions" (인덱스 없는 전체 스캔)이나 "USE TEMP B-TREE FOR ORDER BY" (정렬)가 없어야 함
+        for detail in plan:
+            if detail.startswith("SCAN") and "USING" not in detail:
+                return False
+            if "TEMP B-TREE" in detail:
+                return False
+        return True
+    # MariaDB/MySQL: 전체 스캔(type=ALL)이나 filesort가 없어야 함
+    return all(row.get("type") != "ALL" and "filesort" not in (row.get("Extra") or "") for row in plan)
+
+
+def check_query_plans(engine: Engine) -> bool:
+    """
+    주요 조회 쿼리의 실행 계획을 확인하여 모두 인덱스를 사용하는지 검사합니다.
+    """
+    ok = True
+    db = Session(bind=engine)
+    try:
+        with engine.connect() as conn:
+            for name, query in _hot_queries(db).items():
+                plan = _explain(conn, query)
+                uses_index = _uses_index(conn, plan)
+                ok = ok and uses_index
+                print(f"[{'OK' if uses_index else 'FAIL'}] {name}")
+                for row in plan:
+                    print(f"       {row}")
+    finally:
+        db.close()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply schema migrations and verify query plans")
+    parser.add_argument("--check", action="store_true", help="주요 쿼리의 EXPLAIN 결과로 인덱스 사용 여부 검사")
+    args = parser.parse_args()
+
+    import database
+    init_schema(database.engine)
+    with database.engine.connect() as conn:
+        print(f"Schema version: {current_version(conn)}")
+
+    if args.check and not check_query_plans(database.engine):
+        raise SystemExit(1)
@@ -1,13 +1,27 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Float
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Float, Double, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
+import random
 import uuid
 
+# 정답률(%) 계산 (Question.success_rate와 컬럼만 조회한 행에서 함께 사용)
+def success_rate(correct_count, total_attempts) -> float:
+    if not total_attempts:
+        return 0.0
+    return round((correct_count / total_attempts) * 100, 1)
+
 # 문제 모델: 실제 게임에서 사용되는 문제 데이터
 class Question(Base):
     __tablename__ = "questions"
-    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    __table_args__ = (
+        # 무작위 출제용 인덱스 (ORDER BY RAND() 대신 random_key 범위 조회)
+        Index("ix_questions_category_random_key", "category", "random_key"),
+        Index("ix_questions_random_key", "random_key"),
+        # 일일 문제 조회 (분야 + 생성일 범위)
+        Index("ix_questions_category_created_at", "category", "created_at"),
+        {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
 
     id = Column(String(50), primary_key=True, index=True, default=lambda: str(uuid.uuid4())) # 예: "q1_1"
     
@@ -22,13 +36,12 @@ class Question(Base):
     correct_count = Column(Integer, default=0) # 정답 횟수
     total_attempts = Column(Integer, default=0) # 총 시도 횟수
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    random_key = Column(Double, default=random.random) # 무작위 출제용 키 (0.0 ~ 1.0, 생성 시 부여)
 
     # 정답률 계산 속성
     @property
     def success_rate(self):
-        if self.total_attempts == 0:
-            return 0.0
-        return round((self.correct_count / self.total_attempts) * 100, 1)
+        return success_rate(self.correct_count, self.total_attempts)
 
     @property
     def encoded(self):
@@ -44,17 +57,32 @@ class User(Base):
     hashed_password = Column(String(255), nullable=True) # 해시된 비밀번호
     is_guest = Column(Boolean, default=False) # 게스트 여부
     credits = Column(Integer, default=0) # 보유 크레딧
-    owned_themes = Column(Text, default="default") # 보유 테마 (쉼표로 구분)
+    # 보유 테마는 user_themes 테이블 (기본 테마 "default"는 모두 보유)
     equipped_theme = Column(String(50), default="default") # 장착 중인 테마
     total_solved = Column(Integer, default=0) # 총 정답 문제 수
     created_at = Column(DateTime(timezone=True), server_default=func.now()) # 생성일
 
     notes = relationship("WrongAnswerNote", back_populates="user")
 
+# 사용자별 보유 테마 (기본키 (user_id, theme_id)로 보유 여부를 인덱스 조회)
+class UserTheme(Base):
+    __tablename__ = "user_themes"
+    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    theme_id = Column(String(50), primary_key=True)
+    acquired_at = Column(DateTime(timezone=True), server_default=func.now())
+
 # 오답 노트 모델: 사용자가 저장한 틀린 문제
 class WrongAnswerNote(Base):
     __tablename__ = "wrong_answer_notes"
-    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    __table_args__ = (
+        # 사용자별 문제당 하나의 오답노트 (upsert 기준, user_id 단독 조회에도 사용)
+        Index("uq_wrong_answer_notes_user_question", "user_id", "question_id", unique=True),
+        # 오답노트 목록 키셋 페이지네이션 (user_id, created_at DESC, id DESC)
+        Index("ix_wrong_answer_notes_user_created", "user_id", "created_at", "id"),
+        {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -65,10 +93,18 @@ class WrongAnswerNote(Base):
     user = relationship("User", back_populates="notes")
     question = relationship("Question")
 
+# 판정 주체: AI 채점(캐시된 AI 판정 포함) / 로컬 사전 판정 / AI 장애 시 간이 채점
+VERDICT_SOURCES = ("llm", "local", "degraded")
+
 # 시도 기록 모델: 모든 문제 풀이 로그 (분석용)
 class Attempt(Base):
     __tablename__ = "attempts"
-    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    __table_args__ = (
+        Index("ix_attempts_question_id", "question_id"),
+        # 보존 기간이 지난 기록 조회 (compaction.py)
+        Index("ix_attempts_timestamp", "timestamp"),
+        {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     question_id = Column(String(50), ForeignKey("questions.id"))
@@ -76,13 +112,61 @@ class Attempt(Base):
     similarity_score = Column(Float, default=0.0) # 유사도 점수
     is_correct = Column(Boolean, default=False) # 정답 여부
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    verdict_source = Column(String(10), nullable=True) # 판정 주체 (VERDICT_SOURCES, 기록 이전 행은 NULL)
 
     question = relationship("Question", back_populates="attempts")
 
+# 보존 기간이 지난 시도 기록 (compaction.py가 attempts에서 옮김, id는 원래 attempts.id)
+class AttemptArchive(Base):
+    __tablename__ = "attempts_archive"
+    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    question_id = Column(String(50))
+    user_answer = Column(Text, nullable=False)
+    similarity_score = Column(Float, default=0.0)
+    is_correct = Column(Boolean, default=False)
+    timestamp = Column(DateTime(timezone=True))
+    verdict_source = Column(String(10), nullable=True)
+
+# similarity_score 히스토그램: 10점 단위 구간 (hist_9는 90~100점)
+HISTOGRAM_BUCKETS = 10
+
+def score_bucket(score: float) -> int:
+    return min(max(int((score or 0) // 10), 0), HISTOGRAM_BUCKETS - 1)
+
+# 문제별 일별 시도 통계 (보존 기간이 지난 시도 기록을 집계한 롤업)
+class QuestionDailyStat(Base):
+    __tablename__ = "question_daily_stats"
+    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+
+    question_id = Column(String(50), ForeignKey("questions.id"), primary_key=True)
+    day = Column(String(10), primary_key=True) # "YYYY-MM-DD" (UTC)
+    attempts = Column(Integer, nullable=False, default=0)
+    correct_count = Column(Integer, nullable=False, default=0)
+    hist_0 = Column(Integer, nullable=False, default=0)
+    hist_1 = Column(Integer, nullable=False, default=0)
+    hist_2 = Column(Integer, nullable=False, default=0)
+    hist_3 = Column(Integer, nullable=False, default=0)
+    hist_4 = Column(Integer, nullable=False, default=0)
+    hist_5 = Column(Integer, nullable=False, default=0)
+    hist_6 = Column(Integer, nullable=False, default=0)
+    hist_7 = Column(Integer, nullable=False, default=0)
+    hist_8 = Column(Integer, nullable=False, default=0)
+    hist_9 = Column(Integer, nullable=False, default=0)
+
+    @property
+    def histogram(self):
+        return [getattr(self, f"hist_{i}") for i in range(HISTOGRAM_BUCKETS)]
+
 # 방명록(랭킹) 모델: 도전 모드 결과 저장
 class Guestbook(Base):
     __tablename__ = "guestbook"
-    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    __table_args__ = (
+        # 랭킹 정렬 (score DESC, max_streak DESC)
+        Index("ix_guestbook_score_streak", "score", "max_streak"),
+        {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nickname = Column(String(50), unique=True, index=True, nullable=False) # 랭킹에 표시될 닉네임
@@ -91,16 +175,67 @@ class Guestbook(Base):
     difficulty = Column(Integer, default=1) # 플레이한 난이도
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
+# 일일 모드 분야 (순서가 cleared_mask의 비트 위치이므로 뒤에만 추가할 것)
+DAILY_DOMAINS = ["Politics", "Economy", "Society", "Life/Culture", "IT/Science", "World"]
+_DOMAIN_BITS = {domain.lower(): 1 << i for i, domain in enumerate(DAILY_DOMAINS)}
+
+def domain_bit(domain: str) -> int:
+    """
+    분야의 비트 값 (알 수 없는 분야면 0)
+    """
+    return _DOMAIN_BITS.get(domain.strip().lower(), 0)
+
+def domains_from_mask(mask: int):
+    return [domain for i, domain in enumerate(DAILY_DOMAINS) if mask & (1 << i)]
+
 # 일일 모드 진행 상황 모델
 class DailyProgress(Base):
     __tablename__ = "daily_progress"
-    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+    __table_args__ = (
+        # 사용자별 날짜당 하나의 진행 상황 (upsert 기준)
+        Index("uq_daily_progress_user_date", "user_id", "date", unique=True),
+        {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True) # 로그인 유저 (게스트는 로컬스토리지 관리라 DB 저장 안함)
     date = Column(String(10), nullable=False) # "YYYY-MM-DD"
-    # 클리어한 분야 목록을 쉼표로 구분하여 저장 (예: "politics,economy")
-    cleared_domains = Column(Text, default="") 
+    # 클리어한 분야를 DAILY_DOMAINS 순서의 비트로 저장 (예: Politics, Economy -> 0b11)
+    cleared_mask = Column(Integer, nullable=False, default=0, server_default="0")
     reward_claimed = Column(Boolean, default=False) # 일일 보상 수령 여부 
     
     user = relationship("User")
+
+    # API 응답용 쉼표 구분 문자열 (예: "Politics,Economy")
+    @property
+    def cleared_domains(self):
+        return ",".join(domains_from_mask(self.cleared_mask or 0))
+
+    @property
+    def cleared_count(self):
+        return bin(self.cleared_mask or 0).count("1")
+
+# AI 판정 캐시 모델: (문제, 정규화된 답안)별 check_similarity 결과
+class VerdictCacheEntry(Base):
+    __tablename__ = "verdict_cache"
+    __table_args__ = (
+        UniqueConstraint("question_id", "answer_hash", name="uq_verdict_cache_question_answer"),
+        {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(String(50), ForeignKey("questions.id"), nullable=False)
+    answer_hash = Column(String(64), nullable=False) # 정규화된 답안의 SHA-256
+    similarity_score = Column(Float, default=0.0)
+    is_correct = Column(Boolean, default=False)
+    feedback = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# 생성 작업 리스 모델: 여러 워커 중 하나만 같은 작업(예: 일일 문제 생성)을 수행하도록 잠금
+class GenerationLease(Base):
+    __tablename__ = "generation_leases"
+    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+
+    key = Column(String(100), primary_key=True) # 예: "daily:2025-01-01:Politics"
+    owner = Column(String(100), nullable=False) # 리스를 가진 워커 ID
+    expires_at = Column(DateTime, nullable=False) # 만료 시각 (UTC)
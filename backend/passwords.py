@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# passlib 기본값(29000)과 같게 두어 기존 해시는 그대로 사용
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+
+# Windows에서 바이너리 의존성 문제를 피하기 위해 pbkdf2_sha256 사용
+# 라운드 수가 PASSWORD_HASH_ROUNDS와 다른 해시는 로그인 시 verify_and_update가 새 해시를 돌려줌
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=PASSWORD_HASH_ROUNDS,
+)
+
+
+# 프로세스 풀에서 실행되는 함수 (pickle 가능하도록 모듈 최상위에 둠)
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_and_update(password: str, hashed_password: str):
+    """
+    (일치 여부, 새 해시 또는 None)을 반환합니다.
+    """
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    PBKDF2 해시/검증을 별도 프로세스 풀에서 실행합니다.
+    CPU를 오래 쓰는 작업이 서버 프로세스의 GIL을 잡지 않으므로, 로그인이 몰려도 다른 API가 느려지지 않습니다.
+    - 대기 중인 작업이 max_pending개를 넘으면 바로 PasswordHasherBusy (엔드포인트에서 503)
+    - workers=0이면 기존처럼 스레드풀에서 실행
+    프로세스 풀은 처음 사용할 때 spawn으로 생성합니다. (스레드가 있는 서버 프로세스를 fork하지 않도록)
+    """
+    def __init__(self, workers: int = 1, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = None
+
+        self.pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.total_ms = 0.0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"Password hasher pool started (workers={self.workers}, rounds={PASSWORD_HASH_ROUNDS})")
+        return self._pool
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self.pending += 1
+        started = time.monotonic()
+        try:
+            if not self.workers:
+                return await run_in_threadpool(fn, *args)
+            return await asyncio.get_running_loop().run_in_executor(self._executor(), fn, *args)
+        except BrokenProcessPool:
+            # 작업 프로세스가 죽으면 다음 요청에서 풀을 다시 생성
+            logger.error("Password hasher pool broken; recreating on next use")
+            self._pool = None
+            raise
+        finally:
+            self.pending -= 1
+            self.calls += 1
+            self.total_ms += (time.monotonic() - started) * 1000
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        verified, new_hash = await self._run(verify_and_update, password, hashed_password)
+        if new_hash is not None:
+            self.rehashed += 1
+        return verified, new_hash
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "rounds": PASSWORD_HASH_ROUNDS,
+            "pending": self.pending,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else None,
+        }
+
+
+# 싱글톤 인스턴스 생성 (main.py의 lifespan에서 종료)
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))),
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64")),
+)
@@ -0,0 +1,323 @@
+import argparse
+import logging
+import os
+import re
+
+import numpy as np
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 한글 음절 분해 상수 (U+AC00 ~ U+D7A3)
+HANGUL_BASE = 0xAC00
+HANGUL_LAST = 0xD7A3
+JUNGSEONG_COUNT = 21
+JONGSEONG_COUNT = 28
+CHOSEONG_START = 0x1100
+JUNGSEONG_START = 0x1161
+JONGSEONG_START = 0x11A7
+
+NGRAM_SIZE = 3
+
+# 한글 음절 또는 호환 자모 (한글이 전혀 없는 답안은 풀어 쓴 설명이 아님)
+HANGUL_PATTERN = re.compile(r"[\uac00-\ud7a3\u3131-\u318e]")
+
+
+def decompose_jamo(text: str) -> np.ndarray:
+    """
+    문자열을 자모 단위 코드 포인트 배열로 분해합니다. (공백 제외, 받침 없는 음절은 두 자모)
+    '교착' -> [ㄱ, ㅛ, ㅊ, ㅏ, ㄱ]
+    """
+    codes = np.frombuffer("".join((text or "").split()).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    if codes.size == 0:
+        return codes
+
+    is_syllable = (codes >= HANGUL_BASE) & (codes <= HANGUL_LAST)
+    offset = codes - HANGUL_BASE
+    jamo = np.full((codes.size, 3), -1, dtype=np.int64)
+    jamo[:, 0] = np.where(is_syllable, CHOSEONG_START + offset // (JUNGSEONG_COUNT * JONGSEONG_COUNT), codes)
+    jamo[:, 1] = np.where(is_syllable, JUNGSEONG_START + (offset // JONGSEONG_COUNT) % JUNGSEONG_COUNT, -1)
+    tail = offset % JONGSEONG_COUNT
+    jamo[:, 2] = np.where(is_syllable & (tail > 0), JONGSEONG_START + tail, -1)
+
+    flat = jamo.ravel()
+    return flat[flat >= 0]
+
+
+def _ngram_keys(jamo: np.ndarray, n: int = NGRAM_SIZE) -> np.ndarray:
+    """
+    자모 n-gram을 하나의 정수 키로 묶습니다. (코드 포인트는 21비트 이내이므로 n <= 3이면 int64에 들어감)
+    """
+    if jamo.size < n:
+        return jamo.copy()
+    keys = np.zeros(jamo.size - n + 1, dtype=np.int64)
+    for i in range(n):
+        keys = (keys << 21) | jamo[i:jamo.size - n + 1 + i]
+    return keys
+
+
+def ngram_similarity(a: str, b: str, n: int = NGRAM_SIZE) -> float:
+    """
+    자모 n-gram 다중집합의 Dice 계수 (0.0 ~ 1.0).
+    """
+    keys_a = _ngram_keys(decompose_jamo(a), n)
+    keys_b = _ngram_keys(decompose_jamo(b), n)
+    total = keys_a.size + keys_b.size
+    if total == 0:
+        return 0.0
+
+    uniq_a, count_a = np.unique(keys_a, return_counts=True)
+    uniq_b, count_b = np.unique(keys_b, return_counts=True)
+    _, idx_a, idx_b = np.intersect1d(uniq_a, uniq_b, assume_unique=True, return_indices=True)
+    overlap = np.minimum(count_a[idx_a], count_b[idx_b]).sum()
+    return float(2.0 * overlap / total)
+
+
+def _compact(text: str) -> str:
+    return "".join((text or "").split())
+
+
+def meaning_context(encoded_text: str, model_answer: str):
+    """
+    문제 문장과 모범 답안이 공유하는 앞/뒤 문맥을 떼어낸 (앞 문맥, 모범 답안의 풀이 부분, 뒤 문맥).
+    '…끝내 교착 상태에…' / '…끝내 꼼짝 못하는 상태에…' -> ('…끝내', '꼼짝못하는', '상태에…')
+    공유하는 문맥이 없으면 None
+    """
+    a, b = _compact(encoded_text), _compact(model_answer)
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    if prefix + suffix == 0 or prefix + suffix == len(b):
+        return None
+    return b[:prefix], b[prefix:len(b) - suffix], b[len(b) - suffix:]
+
+
+def span_similarity(user_answer: str, model_answer: str, encoded_text: str):
+    """
+    공유 문맥을 뺀 부분(바꿔 쓴 단어의 풀이)끼리의 자모 n-gram 유사도.
+    문장 전체 유사도는 공통 문맥이 대부분을 차지해, 반대 의미로 쓴 답도 높게 나오므로 정답 판정에는 이 값을 사용합니다.
+    답안이 같은 문맥으로 시작/끝나지 않아 비교할 부분을 특정할 수 없으면 None
+    """
+    context = meaning_context(encoded_text, model_answer)
+    if context is None:
+        return None
+    prefix, meaning, suffix = context
+    answer = _compact(user_answer)
+    if len(answer) < len(prefix) + len(suffix) or not answer.startswith(prefix) or not answer.endswith(suffix):
+        return None
+    return ngram_similarity(answer[len(prefix):len(answer) - len(suffix)], meaning)
+
+
+def is_trivially_invalid(user_answer: str, min_length: int = 2) -> bool:
+    # 공백 제외 min_length자 미만이거나 한글이 없는 답안
+    answer = _compact(user_answer)
+    return len(answer) < min_length or not HANGUL_PATTERN.search(answer)
+
+
+def contains_word(text: str, word: str) -> bool:
+    if not word or word == "Unknown":
+        return False
+    return "".join(word.split()) in "".join((text or "").split())
+
+
+class LexicalPrescorer:
+    """
+    LLM 호출 전에 명확한 정답/오답을 로컬에서 판정하는 단계.
+    - 답안이 문제 문장과 같은 문맥을 유지하고, 바꿔 쓴 부분이 모범 답안(correct_meaning)의 풀이 부분과
+      자모 n-gram 유사도 accept 이상이며, 어려운 단어(target_word)를 그대로 쓰지 않았으면 정답 (span_similarity)
+    - 한글이 없거나 min_length자 미만인 답안은 오답
+    - reject 임계값이 설정된 경우에만, 모범 답안과 문제 문장(encoded_text) 모두와의 문장 전체 유사도가 reject 이하이면 오답
+      (자기 말로 바꿔 쓴 정답은 겹치는 글자가 거의 없을 수 있으므로, 기록으로 조정하기 전에는 사용하지 않음)
+    - 그 외(경계 구간)는 None을 반환하여 check_similarity로 넘깁니다.
+    임계값은 Attempt.similarity_score 기록으로 `python prescore.py --tune` 을 실행해 조정합니다.
+    """
+    def __init__(self, accept_threshold: float = 0.85, reject_threshold: float = None, enabled: bool = True, min_length: int = 2):
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self.enabled = enabled
+        self.min_length = min_length
+
+        self.accepted = 0
+        self.rejected = 0
+        self.escalated = 0
+        self.degraded = 0
+
+    def score(self, user_answer: str, model_answer: str, encoded_text: str):
+        return ngram_similarity(user_answer, model_answer), ngram_similarity(user_answer, encoded_text)
+
+    def evaluate(self, user_answer: str, model_answer: str, encoded_text: str, target_word: str = None):
+        if not self.enabled:
+            return None
+
+        if is_trivially_invalid(user_answer, self.min_length):
+            self.rejected += 1
+            return {
+                "similarity_score": 0,
+                "is_correct": False,
+                "feedback": "문장의 의미를 한글로 풀어서 설명해주세요.",
+                "source": "local"
+            }
+
+        answer_sim, encoded_sim = self.score(user_answer, model_answer, encoded_text)
+        span_sim = span_similarity(user_answer, model_answer, encoded_text)
+
+        if span_sim is not None and span_sim >= self.accept_threshold and not contains_word(user_answer, target_word):
+            self.accepted += 1
+            return {
+                "similarity_score": int(round(span_sim * 100)),
+                "is_correct": True,
+                "feedback": "모범 답안과 같은 의미로 쉽게 풀어 썼습니다.",
+                "source": "local"
+            }
+
+        if self.reject_threshold is not None and max(answer_sim, encoded_sim) <= self.reject_threshold:
+            self.rejected += 1
+            return {
+                "similarity_score": int(round(max(answer_sim, encoded_sim) * 100)),
+                "is_correct": False,
+                "feedback": "문장의 의미와 관련 없는 답변입니다. 문장을 다시 읽고 풀어서 설명해주세요.",
+                "source": "local"
+            }
+
+        self.escalated += 1
+        return None
+
+    def degraded_verdict(self, user_answer: str, model_answer: str, encoded_text: str, target_word: str = None):
+        """
+        AI 채점을 사용할 수 없을 때(타임아웃, 차단기 열림) 쓰는 근사 채점.
+        모범 답안과의 유사도(가능하면 풀이 부분끼리)를 accept 임계값 기준으로 0~100에 맞추고, 어려운 단어를 그대로 쓰면 감점합니다.
+        """
+        answer_sim = span_similarity(user_answer, model_answer, encoded_text)
+        if answer_sim is None:
+            answer_sim, _ = self.score(user_answer, model_answer, encoded_text)
+        score = min(100, int(round(answer_sim / self.accept_threshold * 100))) if self.accept_threshold > 0 else 0
+        if contains_word(user_answer, target_word):
+            score = min(score, 40)
+        self.degraded += 1
+        return {
+            "similarity_score": score,
+            "is_correct": score >= 50,
+            "feedback": "AI 채점이 일시적으로 지연되어 간이 채점으로 평가했습니다.",
+            "degraded": True,
+            "source": "degraded"
+        }
+
+    def stats(self) -> dict:
+        decided = self.accepted + self.rejected
+        total = decided + self.escalated
+        return {
+            "enabled": self.enabled,
+            "accept_threshold": self.accept_threshold,
+            "reject_threshold": self.reject_threshold,
+            "min_length": self.min_length,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "escalated": self.escalated,
+            "degraded": self.degraded,
+            "short_circuit_rate": round(decided / total, 4) if total else 0.0,
+        }
+
+
+def tune_thresholds(rows, target_precision: float = 0.98, min_support: int = 20):
+    """
+    rows: [(user_answer, model_answer, encoded_text, similarity_score), ...] (AI가 판정한 과거 기록, load_attempt_history)
+    similarity_score >= 50 인 기록을 정답으로 봅니다. (check_similarity의 판정 규칙과 동일)
+    정답 판정 정밀도가 target_precision 이상을 유지하는 가장 낮은 accept 임계값과,
+    오답 판정 정밀도가 target_precision 이상을 유지하는 가장 높은 reject 임계값을 찾습니다.
+    """
+    if not rows:
+        return None
+
+    whole_sims = np.array([ngram_similarity(r[0], r[1]) for r in rows])
+    best_sims = np.maximum(whole_sims, np.array([ngram_similarity(r[0], r[2]) for r in rows]))
+    labels = np.array([(r[3] or 0) >= 50 for r in rows])
+    # accept는 evaluate와 같이 풀이 부분 유사도로 (특정할 수 없는 기록은 정답 판정 대상이 아니므로 -1)
+    answer_sims = np.array([
+        sim if sim is not None else -1.0
+        for sim in (span_similarity(r[0], r[1], r[2]) for r in rows)
+    ])
+
+    # accept: 유사도 내림차순 누적 정답 비율
+    order = np.argsort(-answer_sims)
+    support = np.arange(1, order.size + 1)
+    precision = np.cumsum(labels[order]) / support
+    ok = (precision >= target_precision) & (support >= min_support)
+    # 정밀도 조건을 처음 깨는 지점 직전까지가 허용 범위
+    broken = np.nonzero(~(precision >= target_precision) & (support >= min_support))[0]
+    limit = broken[0] if broken.size else order.size
+    accept_idx = np.nonzero(ok[:limit])[0]
+    accept = float(answer_sims[order][accept_idx[-1]]) if accept_idx.size else None
+
+    # reject: 유사도 오름차순 누적 오답 비율
+    order = np.argsort(best_sims)
+    precision = np.cumsum(~labels[order]) / support
+    ok = (precision >= target_precision) & (support >= min_support)
+    broken = np.nonzero(~(precision >= target_precision) & (support >= min_support))[0]
+    limit = broken[0] if broken.size else order.size
+    reject_idx = np.nonzero(ok[:limit])[0]
+    reject = float(best_sims[order][reject_idx[-1]]) if reject_idx.size else None
+
+    return {
+        "samples": len(rows),
+        "accept_threshold": accept,
+        "reject_threshold": reject,
+        "accept_coverage": float((answer_sims >= accept).mean()) if accept is not None else 0.0,
+        "reject_coverage": float((best_sims <= reject).mean()) if reject is not None else 0.0,
+    }
+
+
+def load_attempt_history(db, limit: int = 50000):
+    # 로컬 사전 판정/간이 채점 기록으로 조정하면 현재 임계값의 판정을 그대로 다시 학습하므로 AI 판정만 사용
+    import models
+    return db.query(
+        models.Attempt.user_answer,
+        models.Question.correct_meaning,
+        models.Question.encoded_text,
+        models.Attempt.similarity_score,
+    ).join(models.Question, models.Attempt.question_id == models.Question.id)\
+        .filter(models.Attempt.verdict_source == "llm")\
+        .order_by(models.Attempt.id.desc())\
+        .limit(limit)\
+        .all()
+
+
+# 싱글톤 인스턴스 생성 (PRESCORE_REJECT_THRESHOLD가 없으면 유사도로 오답 처리하지 않음)
+_reject_threshold = os.getenv("PRESCORE_REJECT_THRESHOLD")
+prescorer = LexicalPrescorer(
+    accept_threshold=float(os.getenv("PRESCORE_ACCEPT_THRESHOLD", "0.85")),
+    reject_threshold=float(_reject_threshold) if _reject_threshold else None,
+    enabled=os.getenv("PRESCORE_ENABLED", "true").lower() in ("1", "true", "yes", "on"),
+    min_length=int(os.getenv("PRESCORE_MIN_ANSWER_LENGTH", "2")),
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune lexical pre-scorer thresholds against logged attempts")
+    parser.add_argument("--tune", action="store_true", help="Attempt 기록으로 임계값 추천")
+    parser.add_argument("--precision", type=float, default=0.98)
+    parser.add_argument("--min-support", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=50000)
+    args = parser.parse_args()
+
+    if args.tune:
+        import database
+        db = database.SessionLocal()
+        try:
+            result = tune_thresholds(load_attempt_history(db, args.limit), args.precision, args.min_support)
+        finally:
+            db.close()
+        if not result:
+            print("No attempt history found.")
+        else:
+            print(result)
+            if result["accept_threshold"] is not None:
+                print(f"PRESCORE_ACCEPT_THRESHOLD={result['accept_threshold']:.3f}")
+            if result["reject_threshold"] is not None:
+                print(f"PRESCORE_REJECT_THRESHOLD={result['reject_threshold']:.3f}")
+    else:
+        parser.print_help()
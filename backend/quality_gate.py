@@ -0,0 +1,130 @@
+import logging
+import os
+import random
+import re
+from typing import Any, Dict, List
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+REQUIRED_KEYS = ("word_definition", "target_word", "encoded_sentence", "original_meaning")
+
+HANJA_PATTERN = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+HANGUL_PATTERN = re.compile(r"[가-힣ᄀ-ᇿ㄰-㆏]")
+# 문장부호/숫자/공백을 제외한 글자 (한글 비율 계산 대상)
+LETTER_PATTERN = re.compile(r"[^\W\d_]")
+MARKDOWN_PATTERN = re.compile(r"\*|`|__|^\s*#|\[[^\]]*\]\(")
+
+
+def validate_question(data: Dict[str, Any], min_length: int = 40, min_hangul_ratio: float = 0.9) -> List[str]:
+    """
+    생성된 문제를 로컬 규칙으로 검사하고, 통과하지 못한 항목 이름 목록을 반환합니다. (빈 목록이면 통과)
+    규칙은 문제 생성 프롬프트의 제약 조건과 같습니다.
+    """
+    if not isinstance(data, dict):
+        return ["not_object"]
+
+    missing = [k for k in REQUIRED_KEYS if not isinstance(data.get(k), str) or not data[k].strip()]
+    if missing:
+        return ["missing_keys"]
+
+    issues = []
+    encoded = data["encoded_sentence"]
+    original = data["original_meaning"]
+    target = data["target_word"].strip()
+    texts = [encoded, original, data["word_definition"]]
+
+    if any(HANJA_PATTERN.search(t) for t in texts):
+        issues.append("hanja")
+
+    letters = LETTER_PATTERN.findall(encoded + original)
+    hangul = [c for c in letters if HANGUL_PATTERN.match(c)]
+    if not letters or len(hangul) / len(letters) < min_hangul_ratio:
+        issues.append("hangul_ratio")
+
+    if target not in encoded:
+        issues.append("target_missing")
+    elif target in original:
+        issues.append("target_not_paraphrased")
+
+    if len(encoded.strip()) < min_length or len(original.strip()) < min_length:
+        issues.append("too_short")
+
+    if any(MARKDOWN_PATTERN.search(t) for t in texts + [target]):
+        issues.append("markdown")
+
+    return issues
+
+
+class QuestionQualityGate:
+    """
+    _verify_and_fix_question(편집자 LLM 호출)를 실행할지 결정합니다.
+    로컬 검사를 통과하지 못한 문제는 항상 편집자 단계를 거치고,
+    통과한 문제는 sample_rate 비율만 표본으로 편집자 단계를 거칩니다. (품질 모니터링용)
+    """
+    def __init__(self, sample_rate: float = 0.1, min_length: int = 40, min_hangul_ratio: float = 0.9, enabled: bool = True):
+        self.sample_rate = sample_rate
+        self.min_length = min_length
+        self.min_hangul_ratio = min_hangul_ratio
+        self.enabled = enabled
+
+        self.checked = 0
+        self.passed = 0
+        self.issues = {}
+        self.editor_runs = 0
+        self.editor_skipped = 0
+        self.editor_fixed = 0
+        self.editor_unfixed = 0
+
+    def check(self, data: Dict[str, Any]) -> List[str]:
+        return validate_question(data, self.min_length, self.min_hangul_ratio)
+
+    def needs_editor(self, data: Dict[str, Any]) -> bool:
+        if not self.enabled:
+            self.editor_runs += 1
+            return True
+
+        issues = self.check(data)
+        self.checked += 1
+        for issue in issues:
+            self.issues[issue] = self.issues.get(issue, 0) + 1
+
+        if not issues:
+            self.passed += 1
+            if random.random() >= self.sample_rate:
+                self.editor_skipped += 1
+                return False
+        self.editor_runs += 1
+        return True
+
+    def record_editor_result(self, data: Dict[str, Any]):
+        """
+        편집자 단계 이후 결과를 다시 검사하여, 편집자가 문제를 고쳤는지 기록합니다.
+        """
+        if self.check(data):
+            self.editor_unfixed += 1
+        else:
+            self.editor_fixed += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "checked": self.checked,
+            "pass_rate": round(self.passed / self.checked, 4) if self.checked else 0.0,
+            "issues": dict(self.issues),
+            "editor_runs": self.editor_runs,
+            "editor_skipped": self.editor_skipped,
+            "editor_fixed": self.editor_fixed,
+            "editor_unfixed": self.editor_unfixed,
+        }
+
+
+# 싱글톤 인스턴스 생성
+question_gate = QuestionQualityGate(
+    sample_rate=float(os.getenv("QUESTION_EDITOR_SAMPLE_RATE", "0.1")),
+    min_length=int(os.getenv("QUESTION_MIN_LENGTH", "40")),
+    min_hangul_ratio=float(os.getenv("QUESTION_MIN_HANGUL_RATIO", "0.9")),
+    enabled=os.getenv("QUESTION_GATE_ENABLED", "true").lower() in ("1", "true", "yes", "on"),
+)
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+
+import crud
+import database
+import models
+from ai import AIClient, ai_breaker
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 일일 문제는 "오늘 생성된 문제"로 선정되므로, 재고 보충 대상에서 제외해야 일일 문제 수가 늘어나지 않음
+DAILY_CATEGORIES = ["Politics", "Economy", "Society", "Life/Culture", "IT/Science", "World"]
+# 문제 생성 프롬프트가 어휘 목록을 가진 분야만 보충 대상 (요청의 category 값을 그대로 받으면 목록이 끝없이 늘어남)
+STOCK_CATEGORIES = [c for c in AIClient.WORD_DATABASE if c not in DAILY_CATEGORIES]
+
+
+class QuestionReplenisher:
+    """
+    (분야, 난이도)별로 아직 아무도 풀지 않은 문제(total_attempts == 0)의 재고를 유지하는 백그라운드 작업.
+    출제된 문제가 풀릴 때마다 재고가 줄고, low_water 아래로 떨어지면 target까지 AI로 채워 넣으므로
+    플레이가 계속되는 동안 문제 풀이 계속 늘어나고, /api/questions 는 DB 조회만으로 응답할 수 있습니다.
+    재고를 유지하지 않는 요청(category 없음, random, 보충 대상이 아닌 분야)이 모자라면 main.py에서 제한된 수만 즉시 생성합니다.
+    """
+    def __init__(self, categories, difficulties=(1, 2, 3), target: int = 20, low_water: int = 5, interval: float = 60.0):
+        ignored = [c for c in categories if c not in STOCK_CATEGORIES]
+        if ignored:
+            logger.warning(f"Ignoring unknown or daily question stock categories: {ignored}")
+        self.categories = [c for c in categories if c in STOCK_CATEGORIES]
+        self.difficulties = list(difficulties)
+        self.target = target
+        self.low_water = low_water
+        self.interval = interval
+
+        self._task = None
+        self._wakeup = None
+        self.stock = {}
+        self.generated = 0
+        self.failed = 0
+        self.paused = 0
+        self.last_run_at = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Question replenisher started (categories={self.categories}, target={self.target}, low_water={self.low_water})")
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def notify(self, category: str = None):
+        """
+        요청 처리 중 재고 부족을 발견했을 때 호출합니다. 다음 주기를 기다리지 않고 즉시 보충을 시작합니다.
+        보충 대상 분야(STOCK_CATEGORIES)가 아닌 category는 무시합니다.
+        """
+        if category in STOCK_CATEGORIES and category not in self.categories:
+            self.categories.append(category)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stocks(self, category: str = None) -> bool:
+        # 이 분야의 부족분을 백그라운드 보충으로 채우는지 여부
+        return self.running and category in self.categories
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "target": self.target,
+            "low_water": self.low_water,
+            "stock": {f"{c}:{d}": n for (c, d), n in self.stock.items()},
+            "generated": self.generated,
+            "failed": self.failed,
+            "paused": self.paused,
+            "last_run_at": self.last_run_at,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self.replenish_once()
+            except Exception as e:
+                logger.error(f"Question replenisher cycle failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def replenish_once(self):
+        self.last_run_at = time.time()
+        # AI 서버 장애 중에는 생성 요청을 보내지 않고 다음 주기에 다시 확인
+        if ai_breaker.is_open:
+            self.paused += 1
+            logger.warning("AI circuit breaker is open. Skipping replenish cycle.")
+            return
+        counts = await run_in_threadpool(self._count_stock)
+        for category in list(self.categories):
+            for difficulty in self.difficulties:
+                stock = counts.get((category, difficulty), 0)
+                self.stock[(category, difficulty)] = stock
+                if stock >= self.low_water:
+                    continue
+
+                needed = self.target - stock
+                logger.info(f"Stock for {category}/{difficulty} is low ({stock}). Generating {needed} questions...")
+                generated = await crud.generate_questions_concurrently([(category, difficulty)] * needed)
+                self.failed += needed - len(generated)
+                try:
+                    await run_in_threadpool(self._save, generated)
+                    self.generated += len(generated)
+                    self.stock[(category, difficulty)] += len(generated)
+                except Exception as e:
+                    logger.error(f"Failed to save replenished questions ({category}/{difficulty}): {e}")
+                    self.failed += len(generated)
+
+    def _count_stock(self):
+        db = database.SessionLocal()
+        try:
+            rows = db.query(models.Question.category, models.Question.difficulty, func.count(models.Question.id))\
+                .filter(models.Question.total_attempts == 0, models.Question.category.in_(self.categories))\
+                .group_by(models.Question.category, models.Question.difficulty)\
+                .all()
+            return {(category, difficulty): count for category, difficulty, count in rows}
+        finally:
+            db.close()
+
+    def _save(self, generated):
+        db = database.SessionLocal()
+        try:
+            # 재고 집계 키와 맞추기 위해 AI 응답의 분야/난이도 대신 요청한 값으로 저장
+            generated = [(dict(ai_data, difficulty_level=difficulty), category, difficulty) for ai_data, category, difficulty in generated]
+            crud.save_generated_questions(db, generated)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def _env_flag(name: str, default: str = "true") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+# 싱글톤 인스턴스 생성 (main.py의 lifespan에서 시작/종료)
+question_replenisher = QuestionReplenisher(
+    categories=[c.strip() for c in os.getenv("QUESTION_STOCK_CATEGORIES", "General").split(",") if c.strip()],
+    target=int(os.getenv("QUESTION_STOCK_TARGET", "20")),
+    low_water=int(os.getenv("QUESTION_STOCK_LOW_WATER", "5")),
+    interval=float(os.getenv("QUESTION_REPLENISH_INTERVAL", "60")),
+)
+REPLENISHER_ENABLED = _env_flag("QUESTION_REPLENISHER_ENABLED")
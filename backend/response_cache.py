@@ -0,0 +1,64 @@
+import hashlib
+import os
+from collections import namedtuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from cache import TTLCache
+
+CachedResponse = namedtuple("CachedResponse", ["version", "body", "etag"])
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    # 약한 비교 (W/ 접두사 무시)
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+class ResponseCache:
+    """
+    여러 사용자가 같은 내용을 받는 조회 API의 응답을 직렬화된 바이트로 캐시합니다.
+    - 항목은 (key, version)으로 찾고, 호출 측의 version(랭킹 버전, KST 날짜 등)이 바뀌면 다시 만듦
+    - ETag는 version과 본문 해시로 만들어, TTL이 지나 다시 만들어도 내용이 같으면 유지
+    - If-None-Match가 일치하면 본문 없이 304
+    쓰기 작업 후에는 invalidate(key)로 지웁니다. (다른 워커는 ttl 이내에 반영)
+    """
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def get(self, key: str, version: str):
+        entry = self._entries.get(key)
+        if entry is None or entry.version != version:
+            return None
+        return entry
+
+    def set(self, key: str, version: str, body: bytes, etag: str = None, ttl: float = None) -> CachedResponse:
+        if etag is None:
+            etag = f'"{key}-{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        entry = CachedResponse(version, body, etag)
+        self._entries.set(key, entry, ttl=ttl)
+        return entry
+
+    def invalidate(self, key: str):
+        if self._entries.pop(key) is not None:
+            self.invalidations += 1
+
+    def respond(self, request: Request, entry: CachedResponse, cache_control: str) -> Response:
+        headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+        if etag_matches(request, entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return dict(self._entries.stats(), not_modified=self.not_modified, invalidations=self.invalidations)
+
+
+# 싱글톤 인스턴스 생성
+response_cache = ResponseCache(ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60")))
@@ -75,6 +75,26 @@ class VerifyAnswerResponse(BaseModel):
     correctAnswer: Optional[str] = None
     similarity: float
     grade: Optional[str] = None
+    degraded: bool = False # AI 채점 장애 시 간이 채점으로 평가한 경우
+
+class VerifyBatchItemResponse(VerifyAnswerResponse):
+    questionId: str
+    error: Optional[str] = None # 문제를 찾지 못한 경우 등
+
+# 문제 통계 스키마 (histogram: similarity_score 10점 단위 구간별 시도 수)
+class QuestionDailyStats(BaseModel):
+    day: str
+    attempts: int
+    correct_count: int
+    histogram: List[int]
+
+class QuestionStatsResponse(BaseModel):
+    question_id: str
+    attempts: int
+    correct_count: int
+    success_rate: float
+    histogram: List[int]
+    daily: List[QuestionDailyStats]
 
 # 방명록/랭킹 스키마 (Guestbook/Ranking Schemas)
 class GuestbookBase(BaseModel):
@@ -92,6 +112,11 @@ class RankingEntry(GuestbookBase):
     class Config:
         from_attributes = True
 
+# 닉네임별 순위 조회 응답
+class RankingPosition(RankingEntry):
+    rank: int
+    total: int
+
 # 일일 진행 상황 스키마
 class DailyProgressBase(BaseModel):
     date: str
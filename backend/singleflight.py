@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 이 프로세스(uvicorn 워커)를 식별하는 리스 소유자 ID
+LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class SingleFlight:
+    """
+    같은 키에 대한 동시 작업을 하나로 합칩니다. (프로세스 내)
+    처음 들어온 요청이 작업을 Task로 실행하고, 이후 요청은 같은 Task의 결과를 기다립니다.
+    Task로 실행하므로 처음 요청이 끊겨도 작업은 끝까지 진행됩니다.
+    """
+    def __init__(self):
+        self._inflight = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
+
+
+# 워커 간 리스 (generation_leases 테이블)
+def try_acquire_lease(db: Session, key: str, ttl_seconds: float, owner: str = LEASE_OWNER) -> bool:
+    """
+    리스 행을 삽입해 획득합니다. 이미 있으면 만료된 경우에만 소유권을 가져옵니다.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    try:
+        db.add(models.GenerationLease(key=key, owner=owner, expires_at=expires_at))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+
+    taken = db.query(models.GenerationLease).filter(
+        models.GenerationLease.key == key,
+        models.GenerationLease.expires_at < now
+    ).update({"owner": owner, "expires_at": expires_at}, synchronize_session=False)
+    db.commit()
+    return taken == 1
+
+
+def release_lease(db: Session, key: str, owner: str = LEASE_OWNER):
+    db.query(models.GenerationLease).filter(
+        models.GenerationLease.key == key,
+        models.GenerationLease.owner == owner
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def lease_held(db: Session, key: str) -> bool:
+    return db.query(models.GenerationLease.key).filter(
+        models.GenerationLease.key == key,
+        models.GenerationLease.expires_at >= datetime.utcnow()
+    ).first() is not None
+
+
+# 싱글톤 인스턴스 생성
+daily_generation_flight = SingleFlight()
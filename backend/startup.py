@@ -0,0 +1,61 @@
+import time
+
+
+class StartupMetrics:
+    """
+    워커 시작 비용 (워커를 자주 재시작해도 되는지 판단용)
+    - import_ms: main 모듈 import (의존 모듈 포함)
+    - schema_check_ms / startup_ms: lifespan 시작 작업 중 스키마 확인 / 전체
+    - first_request_ms: 시작 후 첫 HTTP 요청 처리 시간
+    - warmup_ms: 시작 후 백그라운드로 AI 클라이언트 준비 (+AI_WARMUP=true면 모델 warm-up 요청)
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self.import_ms = None
+        self.schema_check_ms = None
+        self.startup_ms = None
+        self.first_request_ms = None
+        self.first_request_path = None
+        self.warmup_ms = None
+        self.warmup_error = None
+
+    def stats(self) -> dict:
+        return {
+            "started_at": self.started_at,
+            "import_ms": self.import_ms,
+            "schema_check_ms": self.schema_check_ms,
+            "startup_ms": self.startup_ms,
+            "first_request_ms": self.first_request_ms,
+            "first_request_path": self.first_request_path,
+            "warmup_ms": self.warmup_ms,
+            "warmup_error": self.warmup_error,
+        }
+
+
+class FirstRequestTimer:
+    """
+    첫 HTTP 요청의 처리 시간을 기록하는 ASGI 미들웨어. 이후 요청은 그대로 통과합니다.
+    """
+    def __init__(self, app, metrics: StartupMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.metrics.first_request_ms is not None:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if self.metrics.first_request_ms is None:
+                self.metrics.first_request_ms = round((time.perf_counter() - started) * 1000, 2)
+                self.metrics.first_request_path = scope.get("path")
+
+
+def elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+# 싱글톤 인스턴스 생성
+startup_metrics = StartupMetrics()
@@ -0,0 +1,124 @@
+import os
+import sys
+import tempfile
+
+# 모듈이 import 시점에 환경 변수를 읽으므로 다른 import보다 먼저 설정
+_tmp = tempfile.mkdtemp(prefix="context_hunter_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ.setdefault("DB_ASYNC", "false")
+os.environ["DB_AUTO_MIGRATE"] = "true"
+os.environ["QUESTION_REPLENISHER_ENABLED"] = "false"
+os.environ["ATTEMPT_COMPACTION_ENABLED"] = "false"
+os.environ["ATTEMPT_WRITE_BEHIND"] = "false"
+os.environ["ATTEMPT_SPILL_PATH"] = f"{_tmp}/attempts_spill.jsonl"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["AI_API_KEY"] = "test"
+os.environ["AI_MICROBATCH_WINDOW_MS"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+
+import pytest
+
+
+class FakeCompletions:
+    """
+    chat.completions.create를 대신하는 가짜 모델. 프롬프트 종류에 따라 고정된 JSON을 돌려줍니다.
+    hang=True면 취소될 때까지 응답하지 않습니다.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.hang = False
+        self.verdict = {"is_correct": True, "similarity_score": 90, "feedback": "좋아요"}
+
+    def _content(self, messages):
+        if "[Items]" in messages[1]["content"]:
+            n = messages[1]["content"].count('"index": ') - 1
+            return json.dumps({"results": [dict(self.verdict, index=i) for i in range(n)]}, ensure_ascii=False)
+        if "strict evaluator" in messages[0]["content"]:
+            return json.dumps(self.verdict, ensure_ascii=False)
+        return json.dumps({
+            "word_definition": "정의", "target_word": "교착",
+            "encoded_sentence": "노사 간의 협상이 오랜 기간 이어졌지만 끝내 교착 상태에 빠지면서 양측 모두 곤란한 처지에 놓이게 되었다.",
+            "original_meaning": "노사 간의 협상이 오랜 기간 이어졌지만 끝내 꼼짝 못하는 상태에 빠지면서 양측 모두 곤란한 처지에 놓이게 되었다.",
+            "difficulty_level": 2, "category": "Politics",
+        }, ensure_ascii=False)
+
+    async def create(self, model=None, messages=None, stream=False, **kwargs):
+        self.calls += 1
+        if self.hang:
+            await asyncio.Event().wait()
+        content = self._content(messages)
+
+        class Obj:
+            pass
+
+        if stream:
+            async def chunks():
+                for i in range(0, len(content), 8):
+                    chunk = Obj()
+                    chunk.choices = [Obj()]
+                    chunk.choices[0].delta = Obj()
+                    chunk.choices[0].delta.content = content[i:i + 8]
+                    yield chunk
+                    await asyncio.sleep(0)
+            return chunks()
+
+        response = Obj()
+        response.choices = [Obj()]
+        response.choices[0].message = Obj()
+        response.choices[0].message.content = content
+        return response
+
+
+class FakeClient:
+    def __init__(self):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = FakeCompletions()
+
+
+@pytest.fixture
+def fake_ai():
+    import ai
+    client = FakeClient()
+    ai.async_ai_client.client = client
+    ai.ai_breaker.state = "closed"
+    ai.ai_breaker.consecutive_failures = 0
+    ai.ai_breaker.release()
+    return client.chat.completions
+
+
+@pytest.fixture
+def db():
+    import database
+    import migrations
+    import models
+
+    migrations.init_schema(database.engine)
+    session = database.SessionLocal()
+    yield session
+    session.close()
+    # 테스트 간 데이터가 섞이지 않도록 모든 테이블 비우기
+    with database.engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def client(db, fake_ai):
+    from fastapi.testclient import TestClient
+    import main
+    from leaderboard import leaderboard
+    from response_cache import response_cache
+    from user_cache import user_cache
+    from verdict_cache import verdict_cache
+
+    leaderboard.loaded_at = None
+    verdict_cache.memory.clear()
+    response_cache._entries.clear()
+    user_cache.users.clear()
+    user_cache.tokens.clear()
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,61 @@
+import asyncio
+
+import ai
+from ai import AsyncAIClient, SimilarityMicroBatcher, batch_timeout
+
+
+def _client(fake_ai):
+    client = AsyncAIClient()
+    client.client = type("Client", (), {})()
+    client.client.chat = type("Chat", (), {})()
+    client.client.chat.completions = fake_ai
+    return client
+
+
+def test_batch_timeout_scales_with_batch_size():
+    assert batch_timeout(1) == ai.AI_TIMEOUT_SECONDS
+    assert batch_timeout(4) == ai.AI_TIMEOUT_SECONDS + 3 * ai.AI_BATCH_ITEM_TIMEOUT_SECONDS
+
+
+def test_batch_call_uses_scaled_timeout(fake_ai):
+    client = _client(fake_ai)
+    timeouts = []
+    create = client._create
+
+    async def recording_create(timeout, **kwargs):
+        timeouts.append(timeout)
+        return await create(timeout, **kwargs)
+
+    client._create = recording_create
+    items = [(f"답변 {i}입니다", "원문") for i in range(3)]
+    results = asyncio.run(client.check_similarity_batch(items))
+    assert len(results) == 3
+    assert timeouts == [batch_timeout(3)]
+
+
+def test_micro_batcher_combines_concurrent_requests(fake_ai):
+    batcher = SimilarityMicroBatcher(_client(fake_ai), window_ms=20, max_batch=8)
+
+    async def run():
+        return await asyncio.gather(*[batcher.submit(f"답변 {i}입니다", "원문") for i in range(3)])
+
+    results = asyncio.run(run())
+    assert [r["is_correct"] for r in results] == [True, True, True]
+    assert fake_ai.calls == 1
+    assert batcher.batches == 1
+
+
+def test_micro_batcher_keeps_running_tasks_and_drains_on_shutdown(fake_ai):
+    batcher = SimilarityMicroBatcher(_client(fake_ai), window_ms=1000, max_batch=8)
+
+    async def run():
+        pending = [asyncio.ensure_future(batcher.submit(f"답변 {i}입니다", "원문")) for i in range(2)]
+        await asyncio.sleep(0)
+        # 창이 끝나기 전에 종료해도 모으던 요청까지 처리
+        await batcher.shutdown()
+        assert not batcher._tasks
+        return await asyncio.gather(*pending)
+
+    results = asyncio.run(run())
+    assert [r["is_correct"] for r in results] == [True, True]
+    assert batcher.batches == 1
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from ai import AsyncAIClient, CircuitBreaker, CircuitOpenError
+
+
+def _opened_breaker():
+    # reset_timeout=0: 다음 allow()에서 바로 half-open 시험 호출 허용
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+
+def _client(fake_ai, breaker):
+    client = AsyncAIClient()
+    client.client = fake_ai_client(fake_ai)
+    client.breaker = breaker
+    return client
+
+
+def fake_ai_client(completions):
+    client = type("Client", (), {})()
+    client.chat = type("Chat", (), {})()
+    client.chat.completions = completions
+    return client
+
+
+def test_opens_after_threshold_and_closes_after_successful_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # 시험 호출이 끝나기 전에는 다른 호출 거부
+    assert not breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens():
+    breaker = _opened_breaker()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_slow_success_counts_as_failure():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_success(5.0, slow_threshold=1.0)
+    assert breaker.state == "open"
+    assert breaker.slow_calls == 1
+    assert not breaker.allow()
+
+
+def test_cancelled_half_open_trial_releases_breaker(fake_ai):
+    breaker = _opened_breaker()
+    client = _client(fake_ai, breaker)
+    fake_ai.hang = True
+
+    async def run():
+        task = asyncio.create_task(client._create(1.0, model="m", messages=[]))
+        await asyncio.sleep(0.01)
+        assert breaker._trial_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert not breaker._trial_in_flight
+    # 취소는 성공/실패로 기록하지 않음: 다음 호출이 다시 시험 호출이 됨
+    assert breaker.state == "half_open"
+    fake_ai.hang = False
+    asyncio.run(client._create(1.0, model="m", messages=[{"role": "system", "content": "strict evaluator"}, {"role": "user", "content": ""}]))
+    assert breaker.state == "closed"
+
+
+def test_closed_stream_releases_half_open_trial(fake_ai):
+    breaker = _opened_breaker()
+    client = _client(fake_ai, breaker)
+
+    async def run():
+        stream = client.stream_similarity("협상이 진전 없이 멈춘 상태", "교착 상태")
+        async for event, _ in stream:
+            if event != "result":
+                break
+        # SSE 클라이언트 연결이 끊긴 경우와 같이 스트림을 중간에 닫음
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert not breaker._trial_in_flight
+    assert breaker.allow()
+
+
+def test_open_breaker_rejects_without_calling_model(fake_ai):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+    client = _client(fake_ai, breaker)
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client._create(1.0, model="m", messages=[]))
+    assert fake_ai.calls == 0
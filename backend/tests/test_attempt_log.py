@@ -0,0 +1,95 @@
+import asyncio
+import os
+from datetime import datetime
+
+import models
+from attempt_log import AttemptWriter
+
+
+def _writer(tmp_path, **kwargs):
+    return AttemptWriter(flush_interval=0.01, spill_path=str(tmp_path / "attempts_spill.jsonl"), **kwargs)
+
+
+def _rows(question_id="q1", n=2):
+    attempts = [
+        {"question_id": question_id, "user_answer": f"답 {i}", "similarity_score": 90, "is_correct": True, "timestamp": datetime(2025, 1, 1)}
+        for i in range(n)
+    ]
+    return attempts, {question_id: (n, n)}, {1: n}
+
+
+def _failing(writer):
+    def fail(*args):
+        raise RuntimeError("db down")
+    writer._write = fail
+    return writer
+
+
+def _spill_files(tmp_path):
+    return sorted(p.name for p in tmp_path.iterdir())
+
+
+def test_spill_replays_each_attempt_once(tmp_path):
+    first = _writer(tmp_path)
+    first._merge(*_rows())
+    first._spill()
+    assert len(_spill_files(tmp_path)) == 1
+
+    # 다음 시작에서도 기록에 실패해 다시 spill: 가져온 기록이 두 번 남지 않아야 함
+    second = _failing(_writer(tmp_path))
+    second._load_spill()
+    assert second.pending == 2
+    assert not asyncio.run(second.flush())
+    second._spill()
+
+    third = _writer(tmp_path)
+    third._load_spill()
+    assert third.pending == 2
+    assert third._question_deltas == {"q1": (2, 2)}
+    assert third._user_deltas == {1: 2}
+
+
+def test_only_one_worker_claims_a_spill_file(tmp_path):
+    first = _writer(tmp_path)
+    first._merge(*_rows())
+    first._spill()
+
+    workers = [_writer(tmp_path), _writer(tmp_path)]
+    for worker in workers:
+        worker._load_spill()
+    assert sorted(worker.pending for worker in workers) == [0, 2]
+
+
+def test_legacy_spill_path_is_loaded(tmp_path):
+    writer = _writer(tmp_path)
+    writer._merge(*_rows())
+    writer._spill()
+    (spilled,) = _spill_files(tmp_path)
+    os.replace(tmp_path / spilled, tmp_path / "attempts_spill.jsonl")
+
+    replay = _writer(tmp_path)
+    replay._load_spill()
+    assert replay.pending == 2
+
+
+def test_replayed_attempts_are_written_and_file_removed(db, tmp_path):
+    db.add(models.Question(id="q1", encoded_text="문장", original_text="단어", correct_meaning="뜻", total_attempts=0, correct_count=0))
+    db.add(models.User(id=1, username="tester", total_solved=0))
+    db.commit()
+
+    spilled = _writer(tmp_path)
+    spilled._merge(*_rows())
+    spilled._spill()
+
+    writer = _writer(tmp_path)
+
+    async def run():
+        await writer.start()
+        await writer.stop()
+
+    asyncio.run(run())
+    assert _spill_files(tmp_path) == []
+    assert db.query(models.Attempt).count() == 2
+    question = db.get(models.Question, "q1")
+    assert (question.total_attempts, question.correct_count) == (2, 2)
+    assert db.get(models.User, 1).total_solved == 2
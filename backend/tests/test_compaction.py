@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import models
+from compaction import COMPACTION_LEASE_KEY, AttemptCompactor, compact_batch, rollup_rows
+from singleflight import try_acquire_lease
+
+
+def _attempt(question_id, score, is_correct, timestamp):
+    return models.Attempt(question_id=question_id, user_answer="답", similarity_score=score, is_correct=is_correct, timestamp=timestamp)
+
+
+def test_rollup_rows_groups_by_question_and_day():
+    day = datetime(2025, 1, 1, 10)
+    rollups = rollup_rows([
+        ("q1", 95, True, day),
+        ("q1", 40, False, day + timedelta(hours=5)),
+        ("q1", 100, True, day + timedelta(days=1)),
+        ("q2", 0, False, day),
+    ])
+    first = rollups[("q1", "2025-01-01")]
+    assert (first["attempts"], first["correct_count"]) == (2, 1)
+    assert first["hist_9"] == 1 and first["hist_4"] == 1
+    # 100점은 마지막 구간
+    assert rollups[("q1", "2025-01-02")]["hist_9"] == 1
+    assert rollups[("q2", "2025-01-01")]["hist_0"] == 1
+
+
+def test_compact_batch_moves_old_attempts_and_accumulates(db):
+    db.add(models.Question(id="q1", encoded_text="문장", original_text="단어", correct_meaning="뜻"))
+    old = datetime(2025, 1, 1, 9)
+    db.add_all([_attempt("q1", 90, True, old), _attempt("q1", 30, False, old), _attempt("q1", 80, True, old + timedelta(hours=1))])
+    db.add(_attempt("q1", 70, True, datetime.utcnow()))
+    db.commit()
+    cutoff = datetime.utcnow() - timedelta(days=1)
+
+    # 배치 크기보다 많으면 여러 번에 나눠 같은 (문제, 날짜) 행에 더함
+    assert compact_batch(db, cutoff, 2) == 2
+    assert compact_batch(db, cutoff, 2) == 1
+    assert compact_batch(db, cutoff, 2) == 0
+
+    stat = db.get(models.QuestionDailyStat, ("q1", "2025-01-01"))
+    assert (stat.attempts, stat.correct_count) == (3, 2)
+    assert stat.histogram == [0, 0, 0, 1, 0, 0, 0, 0, 1, 1]
+    assert db.query(models.AttemptArchive).count() == 3
+    # 보존 기간 이내 기록은 그대로
+    assert [a.similarity_score for a in db.query(models.Attempt)] == [70]
+
+
+def test_compact_once_skips_while_lease_is_held(db):
+    db.add(models.Question(id="q1", encoded_text="문장", original_text="단어", correct_meaning="뜻"))
+    db.add(_attempt("q1", 90, True, datetime(2025, 1, 1)))
+    db.commit()
+    compactor = AttemptCompactor(retention_days=1, interval=60, batch_size=10)
+
+    assert try_acquire_lease(db, COMPACTION_LEASE_KEY, 600, owner="other-worker")
+    assert asyncio.run(compactor.compact_once()) == 0
+    assert db.query(models.Attempt).count() == 1
+
+    db.query(models.GenerationLease).delete()
+    db.commit()
+    assert asyncio.run(compactor.compact_once()) == 1
+    assert compactor.compacted == 1
+    assert db.query(models.GenerationLease).count() == 0
+
+
+def test_question_stats_combine_rollups_and_recent_attempts(client, db):
+    db.add(models.Question(id="q1", encoded_text="문장", original_text="단어", correct_meaning="뜻"))
+    db.add_all([_attempt("q1", 90, True, datetime(2025, 1, 1, 9)), _attempt("q1", 30, False, datetime.utcnow())])
+    db.commit()
+    compact_batch(db, datetime.utcnow() - timedelta(days=1), 10)
+
+    response = client.get("/api/questions/q1/stats")
+    assert response.status_code == 200
+    stats = response.json()
+    assert (stats["attempts"], stats["correct_count"]) == (2, 1)
+    assert [day["attempts"] for day in stats["daily"]] == [1, 1]
+
+
+def test_question_stats_for_unknown_question_is_404(client):
+    assert client.get("/api/questions/missing/stats").status_code == 404
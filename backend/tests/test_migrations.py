@@ -0,0 +1,75 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+import crud
+import migrations
+import models
+
+
+def _legacy_engine(tmp_path):
+    # cleared_domains / owned_themes 문자열 컬럼을 쓰던 이전 스키마
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50), hashed_password VARCHAR(255), "
+            "is_guest BOOLEAN, credits INTEGER, owned_themes TEXT, equipped_theme VARCHAR(50), "
+            "total_solved INTEGER, created_at DATETIME)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE daily_progress (id INTEGER PRIMARY KEY, user_id INTEGER, date VARCHAR(10) NOT NULL, "
+            "cleared_domains TEXT, reward_claimed BOOLEAN)"
+        ))
+        conn.execute(text(
+            "INSERT INTO users (id, username, owned_themes, credits, total_solved) VALUES "
+            "(1, 'a', 'default,dark,ocean', 0, 0), (2, 'b', 'default', 0, 0), (3, 'c', NULL, 0, 0)"
+        ))
+        # 유니크 인덱스 이전에 생긴 같은 (user_id, date) 중복 행
+        conn.execute(text(
+            "INSERT INTO daily_progress (id, user_id, date, cleared_domains, reward_claimed) VALUES "
+            "(1, 1, '2025-01-01', 'Politics', 0), (2, 1, '2025-01-01', 'World,Politics', 1), "
+            "(3, 2, '2025-01-01', '', 0)"
+        ))
+    return engine
+
+
+def test_migrates_legacy_domains_and_themes(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    migrations.init_schema(engine)
+    assert migrations.applied_version(engine) == migrations.LATEST_VERSION
+
+    with Session(engine) as db:
+        rows = db.query(models.DailyProgress).order_by(models.DailyProgress.id).all()
+        assert [(r.user_id, r.cleared_domains, r.reward_claimed) for r in rows] == [
+            (1, "Politics,World", True),
+            (2, "", False),
+        ]
+        assert rows[0].cleared_mask == models.domain_bit("Politics") | models.domain_bit("World")
+
+        # 기본 테마는 저장하지 않고 항상 첫 번째로 반환
+        owned = crud.get_owned_themes(db, 1)
+        assert owned[0] == "default" and sorted(owned[1:]) == ["dark", "ocean"]
+        assert crud.get_owned_themes(db, 2) == ["default"]
+        assert crud.get_owned_themes(db, 3) == ["default"]
+
+    index_names = {index["name"] for index in inspect(engine).get_indexes("daily_progress")}
+    assert "uq_daily_progress_user_date" in index_names
+
+
+def test_migrations_are_applied_once(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    migrations.init_schema(engine)
+    migrations.init_schema(engine)
+    with engine.connect() as conn:
+        versions = [row[0] for row in conn.execute(text("SELECT version FROM schema_version ORDER BY version"))]
+        themes = conn.execute(text("SELECT COUNT(*) FROM user_themes")).scalar()
+    assert versions == [number for number, _, _ in migrations.MIGRATIONS]
+    assert themes == 2
+
+
+def test_domain_bitmask_round_trip():
+    mask = 0
+    for domain in ["World", "Politics", "IT/Science"]:
+        mask |= models.domain_bit(domain)
+    # DAILY_DOMAINS 순서로 복원
+    assert models.domains_from_mask(mask) == ["Politics", "IT/Science", "World"]
+    assert models.domain_bit("Nope") == 0
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import func
+
+import crud
+import models
+import schemas
+
+
+@pytest.fixture
+def user_with_notes(db):
+    user = models.User(id=1, username="tester")
+    db.add(user)
+    for i in range(7):
+        db.add(models.Question(id=f"q{i}", encoded_text=f"문장 {i}", original_text="단어", correct_meaning="뜻"))
+    db.commit()
+    # 앱과 같이 created_at은 서버 기본값으로 저장 (대부분 같은 초라 id로 순서가 정해져야 함)
+    for i in range(7):
+        crud.create_note_entry(db, schemas.WrongAnswerNoteCreate(question_id=f"q{i}", user_answer="오답"), user.id)
+    note = models.WrongAnswerNote
+    db.query(note).filter(note.question_id.in_(["q3", "q4"])).update(
+        {"created_at": func.datetime(note.created_at, "+1 second")}, synchronize_session=False)
+    db.query(note).filter(note.question_id == "q5").update(
+        {"created_at": func.datetime(note.created_at, "-1 day")}, synchronize_session=False)
+    db.commit()
+    expected = [n.id for n in db.query(note).order_by(note.created_at.desc(), note.id.desc())]
+    return user, expected
+
+
+def test_keyset_pages_cover_every_note_once(db, user_with_notes):
+    user, expected = user_with_notes
+    seen, cursor = [], None
+    while True:
+        notes, cursor = crud.get_user_notes(db, user.id, cursor=cursor, limit=2)
+        seen += [note.id for note in notes]
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+def test_last_page_has_no_cursor(db, user_with_notes):
+    user, expected = user_with_notes
+    notes, cursor = crud.get_user_notes(db, user.id, limit=len(expected))
+    assert len(notes) == len(expected)
+    assert cursor is None
+
+
+def test_notes_load_question_in_same_query(db, user_with_notes):
+    user, _ = user_with_notes
+    notes, _ = crud.get_user_notes(db, user.id, limit=3)
+    assert all(note.question.encoded_text.startswith("문장") for note in notes)
+
+
+def test_invalid_cursor_is_rejected(db):
+    with pytest.raises(ValueError):
+        crud.get_user_notes(db, 1, cursor="not-a-cursor")
+
@@ -0,0 +1,81 @@
+import models
+from attempt_log import attempt_rows, write_attempts
+from prescore import LexicalPrescorer, load_attempt_history, meaning_context, span_similarity
+
+ENCODED = "노사 간의 협상이 오랫동안 이어졌지만 끝내 교착 상태에 빠지면서 양측 모두 곤란한 처지에 놓이게 되었다."
+MEANING = "노사 간의 협상이 오랫동안 이어졌지만 끝내 꼼짝 못하는 상태에 빠지면서 양측 모두 곤란한 처지에 놓이게 되었다."
+
+
+def _evaluate(answer):
+    return LexicalPrescorer().evaluate(answer, MEANING, ENCODED, "교착")
+
+
+def test_meaning_context_strips_shared_sentence():
+    prefix, span, suffix = meaning_context(ENCODED, MEANING)
+    assert span == "꼼짝못하는"
+    assert prefix.endswith("끝내")
+    assert suffix.startswith("상태에")
+
+
+def test_opposite_meaning_in_same_sentence_is_not_accepted():
+    # 문장 전체 유사도는 0.85 이상이지만 바꿔 쓴 부분은 반대 의미
+    answer = MEANING.replace("꼼짝 못하는", "순조로운")
+    assert span_similarity(answer, MEANING, ENCODED) < 0.1
+    verdict = _evaluate(answer)
+    assert verdict is None or not verdict["is_correct"]
+
+
+def test_same_paraphrase_is_accepted():
+    verdict = _evaluate(MEANING.replace("꼼짝 못하는", "꼼짝 못 하는"))
+    assert verdict["is_correct"]
+
+
+def test_answer_keeping_target_word_is_not_accepted():
+    assert _evaluate(ENCODED) is None
+
+
+def test_restructured_answer_escalates_to_llm():
+    answer = "오래 이어진 노사 협상이 결국 아무 진전 없이 멈춰 버려 양쪽 다 난처해졌다."
+    assert span_similarity(answer, MEANING, ENCODED) is None
+    assert _evaluate(answer) is None
+
+
+def test_low_overlap_paraphrases_reach_llm_by_default():
+    # 자기 말로 바꿔 쓴 정답은 글자가 거의 겹치지 않음
+    for answer in ["노동자와 회사의 대화가 진전 없이 멈췄다", "회사랑 직원들 얘기가 안 풀려서 멈춤", "오늘 점심은 김밥을 먹었다"]:
+        assert _evaluate(answer) is None
+
+
+def test_trivially_invalid_answers_are_rejected():
+    for answer in ["", "   ", "멈", "deadlock", "?!?!", "123 456"]:
+        verdict = _evaluate(answer)
+        assert verdict is not None and not verdict["is_correct"], answer
+
+
+def test_configured_reject_threshold_rejects_unrelated_answer():
+    prescorer = LexicalPrescorer(reject_threshold=0.1)
+    verdict = prescorer.evaluate("오늘 점심은 김밥을 먹었다", MEANING, ENCODED, "교착")
+    assert verdict is not None and not verdict["is_correct"]
+
+
+def test_degraded_verdict_scores_changed_span():
+    prescorer = LexicalPrescorer()
+    wrong = prescorer.degraded_verdict(MEANING.replace("꼼짝 못하는", "순조로운"), MEANING, ENCODED, "교착")
+    right = prescorer.degraded_verdict(MEANING, MEANING, ENCODED, "교착")
+    assert not wrong["is_correct"]
+    assert right["is_correct"]
+
+
+def test_tuning_history_only_uses_llm_verdicts(db):
+    db.add(models.Question(id="q1", encoded_text=ENCODED, original_text="교착", correct_meaning=MEANING))
+    db.commit()
+    prescorer = LexicalPrescorer()
+    records = [
+        (db.get(models.Question, "q1"), "노동자와 회사의 대화가 진전 없이 멈췄다", {"similarity_score": 85, "is_correct": True}),
+        (db.get(models.Question, "q1"), "deadlock", prescorer.evaluate("deadlock", MEANING, ENCODED, "교착")),
+        (db.get(models.Question, "q1"), "순조로운 상태", prescorer.degraded_verdict("순조로운 상태", MEANING, ENCODED, "교착")),
+    ]
+    write_attempts(db, *attempt_rows(records, -1))
+
+    assert sorted(a.verdict_source for a in db.query(models.Attempt)) == ["degraded", "llm", "local"]
+    assert [row.user_answer for row in load_attempt_history(db)] == ["노동자와 회사의 대화가 진전 없이 멈췄다"]
@@ -0,0 +1,68 @@
+import pytest
+
+import main
+import models
+from replenisher import QuestionReplenisher, STOCK_CATEGORIES
+
+
+def _question(category, difficulty, total_attempts=0):
+    return models.Question(
+        encoded_text="문장", original_text="단어", correct_meaning="뜻",
+        category=category, difficulty=difficulty, total_attempts=total_attempts,
+    )
+
+
+def test_stock_categories_exclude_daily_and_unknown():
+    replenisher = QuestionReplenisher(categories=["General", "Politics", "Nope"])
+    assert replenisher.categories == ["General"]
+    assert "Politics" not in STOCK_CATEGORIES
+
+
+def test_notify_ignores_client_supplied_categories():
+    replenisher = QuestionReplenisher(categories=[])
+    for category in ["Nope", "random", None, "Politics", "x" * 1000]:
+        replenisher.notify(category)
+    assert replenisher.categories == []
+
+    replenisher.notify("General")
+    replenisher.notify("General")
+    assert replenisher.categories == ["General"]
+
+
+def test_stock_counts_unattempted_questions(db):
+    # 풀린 문제는 재고에서 빠지므로 플레이가 계속되면 다시 low_water 아래로 내려감
+    db.add_all([
+        _question("General", 1),
+        _question("General", 1, total_attempts=3),
+        _question("General", 2, total_attempts=1),
+        _question("Politics", 1),
+    ])
+    db.commit()
+
+    replenisher = QuestionReplenisher(categories=["General"])
+    assert replenisher._count_stock() == {("General", 1): 1}
+
+
+class _RunningTask:
+    def done(self):
+        return False
+
+
+@pytest.fixture
+def running_replenisher(monkeypatch):
+    monkeypatch.setattr(main.question_replenisher, "_task", _RunningTask())
+    monkeypatch.setattr(main.question_replenisher, "categories", ["General"])
+    monkeypatch.setattr(main, "QUESTION_INLINE_GENERATION_MAX", 2)
+    return main.question_replenisher
+
+
+def test_short_random_request_generates_bounded_inline(client, running_replenisher):
+    response = client.get("/api/questions", params={"category": "random", "limit": 5})
+    assert response.status_code == 200
+    assert len(response.json()["questions"]) == 2
+
+
+def test_short_stocked_request_waits_for_replenisher(client, running_replenisher):
+    response = client.get("/api/questions", params={"category": "General", "limit": 5})
+    assert response.status_code == 200
+    assert response.json()["questions"] == []
@@ -0,0 +1,54 @@
+import crud
+
+
+def _guestbook(client, nickname, score):
+    response = client.post("/api/guestbook", json={"nickname": nickname, "score": score, "max_streak": 1, "difficulty": 1})
+    assert response.status_code == 200
+
+
+def test_rankings_revalidate_with_etag(client):
+    _guestbook(client, "alice", 10)
+    first = client.get("/api/rankings")
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, no-cache"
+    etag = first.headers["etag"]
+    assert [entry["nickname"] for entry in first.json()] == ["alice"]
+
+    cached = client.get("/api/rankings", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    # 점수가 바뀌면 새 ETag로 전체 응답
+    _guestbook(client, "bob", 20)
+    changed = client.get("/api/rankings", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert [entry["nickname"] for entry in changed.json()] == ["bob", "alice"]
+
+
+def test_weak_and_listed_etags_match(client):
+    _guestbook(client, "alice", 10)
+    etag = client.get("/api/rankings").headers["etag"]
+    assert client.get("/api/rankings", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get("/api/rankings", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_daily_questions_are_cached_until_new_questions(client, db, fake_ai):
+    first = client.get("/api/questions/daily")
+    assert first.status_code == 200
+    assert first.headers["cache-control"].startswith("public")
+    etag = first.headers["etag"]
+    calls = fake_ai.calls
+
+    cached = client.get("/api/questions/daily", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    # 캐시된 응답은 DB 조회나 AI 생성을 거치지 않음
+    assert fake_ai.calls == calls
+
+    # 새 문제를 저장하면 무효화되어 다시 만든 응답에 포함
+    crud.save_generated_questions(db, [({"encoded_sentence": "새 문장", "target_word": "단어", "original_meaning": "뜻"}, "Politics", 1)])
+    refreshed = client.get("/api/questions/daily", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert "새 문장" in [q["encoded"] for q in refreshed.json()["questions"]]
@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import models
+from singleflight import SingleFlight, lease_held, release_lease, try_acquire_lease
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    runs = 0
+
+    async def work():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        return runs
+
+    async def run():
+        return await asyncio.gather(*[flight.do("daily:Politics", work) for _ in range(5)])
+
+    assert asyncio.run(run()) == [1] * 5
+    assert runs == 1
+    assert (flight.leaders, flight.followers) == (1, 4)
+    assert flight.stats()["inflight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    flight = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.02)
+        finished.append(True)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+    assert finished == [True]
+
+
+def test_failed_run_is_not_cached():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("generation failed")
+        return "ok"
+
+    async def run():
+        try:
+            await flight.do("key", work)
+        except RuntimeError:
+            pass
+        return await flight.do("key", work)
+
+    assert asyncio.run(run()) == "ok"
+    assert calls == 2
+
+
+def test_lease_is_exclusive_until_released(db):
+    assert try_acquire_lease(db, "daily:2025-01-01:Politics", 60, owner="a")
+    assert not try_acquire_lease(db, "daily:2025-01-01:Politics", 60, owner="b")
+    assert lease_held(db, "daily:2025-01-01:Politics")
+
+    # 다른 소유자는 해제할 수 없음
+    release_lease(db, "daily:2025-01-01:Politics", owner="b")
+    assert lease_held(db, "daily:2025-01-01:Politics")
+
+    release_lease(db, "daily:2025-01-01:Politics", owner="a")
+    assert not lease_held(db, "daily:2025-01-01:Politics")
+    assert try_acquire_lease(db, "daily:2025-01-01:Politics", 60, owner="b")
+
+
+def test_expired_lease_can_be_taken_over(db):
+    db.add(models.GenerationLease(key="daily:x", owner="crashed", expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+    assert try_acquire_lease(db, "daily:x", 60, owner="b")
+    assert db.get(models.GenerationLease, "daily:x").owner == "b"
@@ -0,0 +1,42 @@
+import pytest
+
+import crud
+import models
+import schemas
+
+
+@pytest.fixture
+def user(db):
+    user = models.User(id=1, username="tester")
+    db.add(user)
+    db.add(models.Question(id="q1", encoded_text="문장", original_text="단어", correct_meaning="뜻"))
+    db.commit()
+    return user
+
+
+def test_note_upsert_keeps_one_note_per_question(db, user):
+    first = crud.create_note_entry(db, schemas.WrongAnswerNoteCreate(question_id="q1", user_answer="오답"), user.id)
+    second = crud.create_note_entry(db, schemas.WrongAnswerNoteCreate(question_id="q1", user_answer="새 오답"), user.id)
+    assert first.id == second.id
+    assert db.query(models.WrongAnswerNote).count() == 1
+    assert db.query(models.WrongAnswerNote).one().user_answer == "새 오답"
+
+
+def test_daily_progress_reports_new_clear_once(db, user):
+    progress, is_new = crud.update_daily_progress(db, user.id, "2025-01-01", "Politics")
+    assert is_new
+    assert progress.cleared_domains == "Politics"
+
+    _, is_new = crud.update_daily_progress(db, user.id, "2025-01-01", "Politics")
+    assert not is_new
+
+    progress, is_new = crud.update_daily_progress(db, user.id, "2025-01-01", "Economy")
+    assert is_new
+    assert progress.cleared_domains == "Politics,Economy"
+    assert progress.cleared_count == 2
+    assert db.query(models.DailyProgress).count() == 1
+
+
+def test_daily_progress_rejects_unknown_domain(db, user):
+    with pytest.raises(ValueError):
+        crud.update_daily_progress(db, user.id, "2025-01-01", "Nope")
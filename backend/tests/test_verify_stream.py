@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import models
+
+
+def _events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def question(db):
+    db.add(models.Question(
+        id="q1", original_text="교착",
+        encoded_text="노사 간의 협상이 오랫동안 이어졌지만 끝내 교착 상태에 빠지면서 양측 모두 곤란한 처지에 놓이게 되었다.",
+        correct_meaning="노사 간의 협상이 오랫동안 이어졌지만 끝내 꼼짝 못하는 상태에 빠지면서 양측 모두 곤란한 처지에 놓이게 되었다.",
+    ))
+    db.commit()
+
+
+def _verify(client):
+    token = client.post("/api/auth/guest").json()["access_token"]
+    return client.post(
+        "/api/verify/stream",
+        json={"questionId": "q1", "userAnswer": "노동자와 회사의 대화가 진전 없이 멈췄다"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+def test_stream_result_matches_early_score(client, question):
+    events = _events(_verify(client))
+    assert events[0] == ("score", {"similarity": 90.0, "isCorrect": True})
+    event, result = events[-1]
+    assert event == "result"
+    assert result["similarity"] == 90.0 and not result["degraded"]
+    assert result["revised"] is False
+
+
+def test_stream_failure_after_score_marks_result_revised(client, question, fake_ai):
+    create = fake_ai.create
+
+    async def failing_create(**kwargs):
+        chunks = await create(**kwargs)
+
+        async def broken():
+            # 점수가 나간 뒤 피드백 도중 끊김
+            received = ""
+            async for chunk in chunks:
+                yield chunk
+                received += chunk.choices[0].delta.content
+                if '"feedback"' in received:
+                    raise TimeoutError("stream stalled")
+        return broken()
+
+    fake_ai.create = failing_create
+    events = _events(_verify(client))
+    assert events[0] == ("score", {"similarity": 90.0, "isCorrect": True})
+    event, result = events[-1]
+    assert event == "result"
+    # 간이 채점은 글자가 거의 겹치지 않는 답안을 오답으로 보므로, 먼저 보낸 score와 다름
+    assert result["degraded"] and not result["isCorrect"]
+    assert result["revised"] is True
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+import models
+from cache import TTLCache
+
+_USER_COLUMNS = [column.key for column in models.User.__table__.columns]
+
+
+class UserCache:
+    """
+    get_current_user의 토큰 디코딩과 users 조회 결과를 짧게 캐시합니다.
+    - tokens: 토큰 -> 사용자 이름 (토큰 만료 시각을 넘겨서 캐시하지 않음)
+    - users: 사용자 이름 -> users 행의 컬럼 값
+    사용자 정보를 바꾸는 쓰기(크레딧, 테마, 정답 수 등) 후에는 invalidate(user_id)로 지워야 합니다.
+    다른 워커에서의 변경은 user_ttl 이내에 반영됩니다.
+    """
+    def __init__(self, maxsize: int = 10000, user_ttl: float = 30.0, token_ttl: float = 300.0):
+        self.tokens = TTLCache(maxsize=maxsize, ttl=token_ttl)
+        self.users = TTLCache(maxsize=maxsize, ttl=user_ttl)
+        self._names = {}
+        self._lock = threading.Lock()
+        self.invalidations = 0
+
+    def get_username(self, token: str):
+        return self.tokens.get(token)
+
+    def set_username(self, token: str, username: str, expires_at: float = None):
+        ttl = None
+        if expires_at is not None:
+            ttl = min(self.tokens.ttl, expires_at - time.time())
+            if ttl <= 0:
+                return
+        self.tokens.set(token, username, ttl=ttl)
+
+    def get_user(self, db: Session, username: str):
+        """
+        캐시된 행이 있으면 DB 조회 없이 세션에 붙인 User 객체를 반환합니다. (이후 수정/커밋 가능)
+        """
+        values = self.users.get(username)
+        if values is None:
+            return None
+        user = models.User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def set_user(self, user: models.User):
+        values = {key: getattr(user, key) for key in _USER_COLUMNS}
+        with self._lock:
+            self._names[user.id] = user.username
+        self.users.set(user.username, values)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            username = self._names.pop(user_id, None)
+        if username is not None and self.users.pop(username) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "tokens": self.tokens.stats(),
+            "users": self.users.stats(),
+            "invalidations": self.invalidations,
+        }
+
+
+# 싱글톤 인스턴스 생성
+user_cache = UserCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    user_ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+    token_ttl=float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300")),
+)
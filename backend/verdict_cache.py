@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from cache import TTLCache
+
+# 로거 설정
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def normalize_answer(text: str) -> str:
+    """
+    같은 답안으로 취급할 수 있도록 유니코드 정규화, 공백 정리, 끝 문장부호 제거를 수행합니다.
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    text = re.sub(r"\s+", " ", text).strip().lower()
+    return text.rstrip(".!?~。 ")
+
+
+class VerdictCache:
+    """
+    check_similarity 결과를 (question_id, 정규화된 답안) 기준으로 캐시합니다.
+    1단계는 프로세스 내 LRU(TTL), 2단계는 verdict_cache 테이블이며,
+    2단계에서 찾은 결과는 1단계로 다시 올립니다.
+    """
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0, db_ttl_days: int = 30):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.db_ttl_days = db_ttl_days
+
+        self.db_hits = 0
+        self.db_misses = 0
+        self.stores = 0
+
+    def _key(self, question_id: str, user_answer: str):
+        answer_hash = hashlib.sha256(normalize_answer(user_answer).encode("utf-8")).hexdigest()
+        return question_id, answer_hash
+
+    def get(self, question_id: str, user_answer: str):
+        """
+        메모리 캐시만 조회합니다. (이벤트 루프에서 바로 호출 가능)
+        """
+        return self.memory.get(self._key(question_id, user_answer))
+
+    def load(self, db: Session, question_id: str, user_answer: str):
+        """
+        DB 캐시를 조회하고, 찾으면 메모리 캐시에 적재합니다.
+        """
+        key = self._key(question_id, user_answer)
+        query = db.query(models.VerdictCacheEntry).filter(
+            models.VerdictCacheEntry.question_id == key[0],
+            models.VerdictCacheEntry.answer_hash == key[1]
+        )
+        if self.db_ttl_days:
+            query = query.filter(models.VerdictCacheEntry.created_at >= datetime.utcnow() - timedelta(days=self.db_ttl_days))
+        entry = query.first()
+        if entry is None:
+            self.db_misses += 1
+            return None
+
+        self.db_hits += 1
+        verdict = {
+            "similarity_score": entry.similarity_score,
+            "is_correct": entry.is_correct,
+            "feedback": entry.feedback,
+        }
+        self.memory.set(key, verdict)
+        return verdict
+
+    def store(self, db: Session, question_id: str, user_answer: str, verdict: dict):
+        key = self._key(question_id, user_answer)
+        verdict = {
+            "similarity_score": verdict["similarity_score"],
+            "is_correct": verdict["is_correct"],
+            "feedback": verdict.get("feedback"),
+        }
+        self.memory.set(key, verdict)
+        try:
+            db.add(models.VerdictCacheEntry(question_id=key[0], answer_hash=key[1], **verdict))
+            db.commit()
+            self.stores += 1
+        except IntegrityError:
+            # 동시에 같은 답안이 저장된 경우 (다른 워커 등) 기존 항목 유지
+            db.rollback()
+        except Exception as e:
+            logger.error(f"Failed to persist verdict cache entry: {e}")
+            db.rollback()
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + self.db_hits + self.db_misses
+        return {
+            "memory": memory,
+            "db_hits": self.db_hits,
+            "db_misses": self.db_misses,
+            "stores": self.stores,
+            "hit_rate": round((memory["hits"] + self.db_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# 싱글톤 인스턴스 생성
+verdict_cache = VerdictCache(
+    maxsize=int(os.getenv("VERDICT_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("VERDICT_CACHE_TTL", "3600")),
+    db_ttl_days=int(os.getenv("VERDICT_CACHE_DB_TTL_DAYS", "30")),
+)